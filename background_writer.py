@@ -0,0 +1,152 @@
+"""Background thread that writes sweep output."""
+# coding:utf-8
+# Author: Shun Arahata
+import atexit
+import queue
+import threading
+
+QUEUE_SIZE = 64  # queueに入れておけるbatchの数.これ以上たまったら評価側を待たせる(back-pressure)
+BATCH_SIZE = 256  # この数の呼び出しをまとめて1つのbatchとしてqueueに入れる
+_STOP = object()
+
+
+class BackgroundWriter(object):
+    """
+    ResultsSink,ResultStore,DesignDatabaseへの書き込みを別threadで行うもの.
+
+    writerow,append,resetは呼ばれた順にbatchにためてすぐに戻り,batchは上限つきのqueueに入れる.
+    書き込み用のthreadが順番に元のsinkに渡す.
+    queueが一杯なら空くまで待つので,ディスクが遅くてもメモリは増え続けない.
+    flushはqueueが空になるまで待ってから元のsinkをflushする.
+    with文を抜けるとき(またはプロセスの終了時)にflushして元のsinkを閉じる.
+    書き込み用のthreadで起きた例外は次に呼んだときに投げ直す.例外が起きた後の書き込みは捨てるが,
+    元のsinkは必ず閉じる.
+    """
+
+    def __init__(self, sink, maxsize=QUEUE_SIZE, batch_size=BATCH_SIZE):
+        """Constructor.
+
+        :param sink:ResultsSink,ResultStore,DesignDatabaseなど
+        :param maxsize:queueに入れておけるbatchの数
+        :param batch_size:1つのbatchにまとめる呼び出しの数
+        """
+        self.sink = sink
+        self.batch_size = batch_size
+        self._batch = []
+        self._queue = queue.Queue(maxsize)
+        self._error = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="BackgroundWriter", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP:
+                    self._close_sink()
+                    return
+                if self._error is None:
+                    for name, args in item:
+                        getattr(self.sink, name)(*args)
+            except BaseException as error:  # 評価側のthreadで投げ直す
+                self._error = error
+            finally:
+                self._queue.task_done()
+
+    def _close_sink(self):
+        """書き込みで例外が起きていても元のsinkを閉じる(先に起きた例外の方を投げ直す)."""
+        try:
+            self.sink.close()
+        except BaseException as error:
+            if self._error is None:
+                self._error = error
+
+    def _put(self, name, args):
+        self._raise_error()
+        if self._closed:
+            raise ValueError("BackgroundWriter is closed")
+        self._batch.append((name, args))
+        if len(self._batch) >= self.batch_size:
+            self._send()
+
+    def _send(self):
+        """ためている呼び出しをqueueに入れる(一杯なら待つ)."""
+        if self._batch:
+            self._queue.put(self._batch)
+            self._batch = []
+
+    def _raise_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def writerow(self, table, row, rounded=False):
+        """ResultsSink.writerow(rowは書き出すまで変更しないこと)."""
+        self._put("writerow", (table, row, rounded))
+
+    def append(self, rib, ms_list, mass):
+        """ResultStore.append,DesignDatabase.append(ribは書き出すまで変更しないこと)."""
+        self._put("append", (rib, ms_list, mass))
+
+    def reset(self):
+        """ResultsSink.reset."""
+        self._put("reset", ())
+
+    def flush(self):
+        """queueに入っている分を全て書き出すまで待つ."""
+        self._put("flush", ())
+        self._send()
+        self._queue.join()
+        self._raise_error()
+
+    def close(self):
+        """書き出して元のsinkを閉じ,threadを止める(2回目以降は何もしない)."""
+        if self._closed:
+            return
+        try:
+            self._send()
+        finally:  # 元のsinkは_STOPを受け取ったthreadが閉じる
+            self._closed = True
+            self._queue.put(_STOP)
+            self._thread.join()
+            atexit.unregister(self.close)
+        self._raise_error()
+
+    def __len__(self):
+        self.flush()
+        return len(self.sink)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+
+def main():
+    """Test Function."""
+    import tempfile
+    import time
+    from optimizer import DesignSpace, optimize, print_result
+    from result_store import ResultStore
+    space = DesignSpace(3, 1.60, 5, 1.80, [13 + i for i in range(10)], [10 + 2 * i for i in range(10)],
+                        [4 + i for i in range(5)], 22.5, [14 + 2 * i for i in range(10)],
+                        [4 + i for i in range(5)], 22.5, [14 + 2 * i for i in range(10)],
+                        3.175, 3.175, 6, 2)
+    for background in (False, True):
+        store = ResultStore(tempfile.mkdtemp(), block_size=1024)
+        if background:
+            store = BackgroundWriter(store)
+        start = time.perf_counter()
+        with store:
+            result = optimize(space, store=store)
+        print("background" if background else "inline", "{0} rows, {1:.2f} s".format(
+            len(store.sink if background else store), time.perf_counter() - start))
+    print_result(result)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""Streaming evaluation of bay designs from JSONL."""
+# coding:utf-8
+# Author: Shun Arahata
+import argparse
+import collections
+import json
+import sys
+import time
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor
+from evaluation import evaluate_rib, json_safe, INPUT_ERRORS
+
+CHUNK_SIZE = 1024  # まとめて1つのworkerに渡す行数
+PENDING_PER_JOB = 2  # workerごとに先読みしておくchunkの数(これ以上は読まないのでメモリは一定)
+
+
+def read_chunks(lines, chunk_size=CHUNK_SIZE):
+    """
+    空行を飛ばしてchunk_size行ずつにまとめる.
+    :param lines:文字列のiterator(ファイルやsys.stdin)
+    :return: (行番号, 文字列)のlistのgenerator
+    """
+    chunk = []
+    for number, line in enumerate(lines, 1):
+        if line.strip():
+            chunk.append((number, line))
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def evaluate_line(number, line, full=False):
+    """
+    1つの設計を計算して結果の1行にする.
+    :param number:入力の行番号
+    :param line:設計(evaluation.build_stationの引数)のjson.
+        "id"があれば結果にそのまま書く
+    :param full:Trueなら途中の値(各csvの表の値)も書く
+    :return: 改行なしのjson文字列
+    """
+    try:
+        design = json.loads(line)
+        result = evaluate_rib(design, with_rows=full).to_dict()
+        if not full:
+            del result["tables"]
+    except INPUT_ERRORS as error:  # 結果の行にerrorを書いて続ける
+        design = None
+        result = {"error": "{0}: {1}".format(type(error).__name__, error)}
+    output = {"line": number}
+    if isinstance(design, dict) and "id" in design:
+        output["id"] = design["id"]
+    output.update(result)
+    return json.dumps(json_safe(output), ensure_ascii=False)
+
+
+def evaluate_chunk(chunk, full=False):
+    """
+    workerの中でchunkをまとめて計算する.
+    :param chunk:read_chunksの1つ
+    :return: 結果の行をつなげた文字列(各行の末尾に改行)
+    """
+    with redirect_stdout(sys.stderr):  # 計算中の表示で結果のjsonlを壊さない
+        return "".join(evaluate_line(number, line, full) + "\n" for number, line in chunk)
+
+
+def stream(source, destination, chunk_size=CHUNK_SIZE, jobs=1, full=False):
+    """
+    sourceの設計を1行ずつ計算してdestinationに入力と同じ順で1行ずつ書く.
+    どれだけ大きなファイルでも,メモリに載るのは先読みしたchunkだけ.
+    :param source:jsonlの行のiterator
+    :param destination:書き込み先(write)
+    :param chunk_size:1つのchunkの行数
+    :param jobs:processの数(1なら今のprocessで計算する)
+    :param full:Trueなら途中の値も書く
+    :return: 書いた行数
+    """
+    count = 0
+    chunks = read_chunks(source, chunk_size)
+    if jobs == 1:
+        for chunk in chunks:
+            destination.write(evaluate_chunk(chunk, full))
+            count += len(chunk)
+        return count
+    pending = collections.deque()  # (行数, future)を入力の順に
+    with ProcessPoolExecutor(jobs) as executor:
+        for chunk in chunks:
+            pending.append((len(chunk), executor.submit(evaluate_chunk, chunk, full)))
+            if len(pending) >= jobs * PENDING_PER_JOB:
+                size, future = pending.popleft()
+                destination.write(future.result())
+                count += size
+        while pending:
+            size, future = pending.popleft()
+            destination.write(future.result())
+            count += size
+    return count
+
+
+def main(argv=None):
+    """
+    python batch_eval.py designs.jsonl -o results.jsonl -j 4
+    generate_designs.py | python batch_eval.py | jq ...
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("input", nargs="?", default="-", help="設計のjsonl(-ならstdin)")
+    parser.add_argument("-o", "--output", default="-", help="結果のjsonl(-ならstdout)")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="processの数")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="まとめて計算する行数")
+    parser.add_argument("--full", action="store_true", help="途中の値(各csvの表の値)も書く")
+    args = parser.parse_args(argv)
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    destination = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    start = time.perf_counter()
+    try:
+        count = stream(source, destination, args.chunk_size, args.jobs, args.full)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if destination is not sys.stdout:
+            destination.close()
+    elapsed = time.perf_counter() - start
+    print("{0} designs, {1:.1f} s, {2:.0f} designs/s".format(count, elapsed, count / elapsed if elapsed else 0),
+          file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Shear buckling coefficient of web panels."""
+# coding:utf-8
+# Author: Shun Arahata
+import bisect
+import math
+import numpy as np
+from unit_convert import is_scalar
+
+# ウェブ剪断座屈係数のグラフ(Fscr = k E (t/b)^2, a/bは長辺/短辺)
+CHART_ASPECT_RATIO = np.array([1, 1.2, 1.5, 2, 3, 4, 5, 8, 12])
+CHART_K = np.array([8, 7, 6.2, 5.8, 5.3, 5.1, 5, 4.8, 4.8])
+POISSON_RATIO = 0.33
+# 平板の剪断座屈 k_s = k_inf + c/(a/b)^2 (Timoshenko) を Fscr = k E (t/b)^2 の形に直す係数
+PLATE_FACTOR = math.pi ** 2 / (12 * (1 - POISSON_RATIO ** 2))
+EDGE_COEFFICIENTS = {
+    "simply_supported": (PLATE_FACTOR * 5.35, PLATE_FACTOR * 4.0),
+    "clamped": (PLATE_FACTOR * 8.98, PLATE_FACTOR * 5.6),
+}
+
+
+def _fit_chart():
+    """グラフの点に k = k_inf + c/(a/b)^2 を最小二乗で合わせた(k_inf, c)."""
+    design = np.column_stack([np.ones_like(CHART_ASPECT_RATIO, dtype=float), CHART_ASPECT_RATIO ** -2.0])
+    k_inf, c = np.linalg.lstsq(design, CHART_K, rcond=None)[0]
+    return k_inf.item(), c.item()
+
+
+CHART_FIT = _fit_chart()
+# グラフの右端で連続につながるように,グラフより先は当てはめた式をこの比で縮める
+_CHART_END_SCALE = CHART_K[-1] / (CHART_FIT[0] + CHART_FIT[1] / CHART_ASPECT_RATIO[-1] ** 2)
+_CHART_ASPECT_RATIO = CHART_ASPECT_RATIO.tolist()
+_CHART_K = CHART_K.tolist()
+EDGES = ("chart",) + tuple(EDGE_COEFFICIENTS)
+
+
+def get_shear_buckling_k(aspect_ratio, edge="chart"):
+    """
+    ウェブ剪断座屈係数k.
+
+    a/bは1未満なら逆数にする(長辺/短辺).
+    "chart"はグラフの範囲ではグラフを線形補間し,その先はグラフに合わせた k_inf + c/(a/b)^2 で延長する.
+    "simply_supported","clamped"は周辺単純支持,周辺固定の平板の式.
+    どれもa/bが大きくなるとk_infに近づき,nanにはならない.
+    :param aspect_ratio:a/b(配列可)
+    :param edge:EDGESのどれか
+    :return: k
+    """
+    if edge not in EDGES:
+        raise ValueError("unknown edge condition: {0}".format(edge))
+    if is_scalar(aspect_ratio):
+        # スカラーはnumpyを通さない方が速い
+        r = aspect_ratio if aspect_ratio >= 1 else 1 / aspect_ratio
+        if edge != "chart":
+            k_inf, c = EDGE_COEFFICIENTS[edge]
+            return k_inf + c / r ** 2
+        if r <= _CHART_ASPECT_RATIO[-1]:
+            j = max(bisect.bisect_right(_CHART_ASPECT_RATIO, r) - 1, 0)
+            j = min(j, len(_CHART_ASPECT_RATIO) - 2)
+            x0, x1 = _CHART_ASPECT_RATIO[j], _CHART_ASPECT_RATIO[j + 1]
+            return _CHART_K[j] + (_CHART_K[j + 1] - _CHART_K[j]) / (x1 - x0) * (r - x0)
+        return _CHART_END_SCALE * (CHART_FIT[0] + CHART_FIT[1] / r ** 2)
+    r = np.asarray(aspect_ratio, dtype=float)
+    r = np.where(r >= 1, r, 1 / r)
+    if edge != "chart":
+        k_inf, c = EDGE_COEFFICIENTS[edge]
+        return k_inf + c / r ** 2
+    extended = _CHART_END_SCALE * (CHART_FIT[0] + CHART_FIT[1] / r ** 2)
+    return np.where(r <= CHART_ASPECT_RATIO[-1], np.interp(r, CHART_ASPECT_RATIO, CHART_K), extended)
+
+
+def get_chart_error(edge):
+    """
+    グラフの点での式の相対誤差(検証用).
+    :param edge:"simply_supported","clamped",またはグラフに当てはめた式なら"fit"
+    :return: CHART_ASPECT_RATIOの各点での(式 - グラフ)/グラフ
+    """
+    if edge == "fit":
+        k = CHART_FIT[0] + CHART_FIT[1] / CHART_ASPECT_RATIO ** 2
+    else:
+        k = get_shear_buckling_k(CHART_ASPECT_RATIO, edge)
+    return (k - CHART_K) / CHART_K
+
+
+def main():
+    """Test Function."""
+    print("fit k = {0:.3f} + {1:.3f}/(a/b)^2".format(*CHART_FIT))
+    for edge in ("fit",) + EDGES[1:]:
+        print(edge, "max error vs chart {0:.1%}".format(np.abs(get_chart_error(edge)).max()))
+    r = np.array([0.5, 1, 2, 5, 12, 20, 100])
+    for edge in EDGES:
+        print(edge, np.round(get_shear_buckling_k(r, edge), 3))
+
+
+if __name__ == '__main__':
+    main()
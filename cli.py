@@ -0,0 +1,197 @@
+"""Unified command line interface."""
+# coding:utf-8
+# Author: Shun Arahata
+import argparse
+import os
+import runpy
+import subprocess
+import sys
+
+PACKAGE_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+OPT_DIRECTORY = os.path.join(PACKAGE_DIRECTORY, 'opt')
+HEAVY_MODULES = ("scipy", "matplotlib")
+# subcommand -> (読み込むmodule, 読み込んでよい重いmodule, import時間の上限[ms])
+# 上限はnumpy(約100ms)を含めて計測した値の2倍くらい
+COMMANDS = {
+    "loads": (("sandm",), ("scipy",), 1500),
+    "size": (("main",), (), 300),
+    "optimize": (("optimizer", "kill_stats", "results_sink", "result_store", "design_db", "background_writer"),
+                 (), 300),
+    "stiffness": (("stiffness",), (), 300),
+    "fatigue": (("compression_flange", "tension_flange"), (), 300),
+    "spacing": (("spacing", "main"), (), 300),
+    "serve": (("sizing_server",), (), 300),
+    "batch": (("batch_eval",), (), 300),
+}
+_MEASURE = """
+import sys, time
+start = time.perf_counter()
+for name in sys.argv[2:]:
+    __import__(name)
+print((time.perf_counter() - start) * 1000, *[name for name in sys.argv[1].split(",") if name in sys.modules])
+"""
+
+
+def run_loads(argv):
+    """荷重(sandm)."""
+    import sandm
+    sandm.main(argv)
+
+
+def run_size(argv):
+    """STA区間の寸法からM.S.と質量を計算する(main.py)."""
+    import main
+    main.main(argv)
+
+
+def run_optimize(argv):
+    """
+    opt/opt<STA>.pyを実行する.
+    python cli.py optimize 2000 --direct
+    """
+    parser = argparse.ArgumentParser(prog="cli.py optimize", add_help=False)
+    parser.add_argument("sta", type=int, help="リブ左端のSTA[mm]")
+    args, rest = parser.parse_known_args(argv)
+    path = os.path.join(OPT_DIRECTORY, "opt{0}.py".format(args.sta))
+    if not os.path.exists(path):
+        parser.error("no optimizer for STA{0}".format(args.sta))
+    sys.argv = [path] + rest
+    runpy.run_path(path, run_name="__main__")
+
+
+def run_stiffness(argv):
+    """EIを計算する(stiffness.py)."""
+    import stiffness
+    stiffness.main(argv)
+
+
+def run_fatigue(argv):
+    """フランジの疲労寿命を計算してresults/*_fatigue.csvに書き直す."""
+    parser = argparse.ArgumentParser(prog="cli.py fatigue")
+    parser.add_argument("--stress", type=float, default=260, help="LMTの応力[MPa]")
+    parser.add_argument("--flange", choices=("compression", "tension", "both"), default="both")
+    args = parser.parse_args(argv)
+    from results_sink import ResultsSink
+    with ResultsSink() as sink:
+        for name in ("compression", "tension"):
+            if args.flange in (name, "both"):
+                module = __import__(name + "_flange")
+                print(name + " flange")
+                sink.reset([name + "_flange_fatigue.csv"])  # 追記しない
+                module.make_fatigue_header(sink)
+                module.write_fatigue_row(args.stress, sink)
+
+
+def run_spacing(argv):
+    """
+    stations.jsonの各STA区間で等分と不等間隔のstiffener配置の最軽量を比べて
+    results/spacing.csvに書き直す(stiffener断面,フランジ,リベットはjsonのもの).
+    """
+    parser = argparse.ArgumentParser(prog="cli.py spacing")
+    parser.add_argument("config", nargs="?", help="STA区間の寸法を書いたjson(省略するとstations.json)")
+    parser.add_argument("--max-division", type=int, default=15, help="パネル数の上限")
+    parser.add_argument("--time", type=float, help="STA区間ごとの計算時間の上限[s]")
+    args = parser.parse_args(argv)
+    import spacing
+    from main import DEFAULT_CONFIG, load_config
+    from evaluation import build_station
+    from results_sink import ResultsSink
+    with ResultsSink() as sink:
+        sink.reset(["spacing.csv"])  # 追記しない
+        spacing.make_spacing_header(sink)
+        for config in load_config(args.config or DEFAULT_CONFIG)["stations"]:
+            sta = build_station(config)
+            sta.set_he()
+            uniform, nonuniform, saved = spacing.make_spacing_row(sta, range(1, args.max_division + 1),
+                                                                  time_budget=args.time, sink=sink)
+            if nonuniform is None:
+                print("STA{0} no feasible spacing".format(sta.y_left))
+            else:
+                print("STA{0} non-uniform t={1} n={2} {3:.4f} kg, saved {4:.4f} kg".format(
+                    sta.y_left, nonuniform.thickness, nonuniform.division, nonuniform.mass, saved))
+
+
+def run_serve(argv):
+    """sizing serviceを立てる(sizing_server.py)."""
+    import sizing_server
+    sizing_server.main(argv)
+
+
+def run_batch(argv):
+    """jsonlの設計を1行ずつ計算する(batch_eval.py)."""
+    import batch_eval
+    batch_eval.main(argv)
+
+
+def measure_import_time(command, repeat=3):
+    """
+    新しいprocessでsubcommandのmoduleを読み込む時間を測る(repeat回のうち最短).
+    :param command:COMMANDSのkey
+    :return: (時間[ms], 読み込まれた重いmoduleのlist)
+    """
+    modules = COMMANDS[command][0]
+    environ = dict(os.environ, PYTHONPATH=PACKAGE_DIRECTORY)
+    best = None
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", _MEASURE, ",".join(HEAVY_MODULES)] + list(modules),
+                                env=environ, stdout=subprocess.PIPE, check=True, universal_newlines=True).stdout
+        words = output.split()
+        if best is None or float(words[0]) < best[0]:
+            best = float(words[0]), words[1:]
+    return best
+
+
+def check_import_budget(repeat=3):
+    """
+    全てのsubcommandのimport時間と重いmoduleを表示する.
+    :return: 全て上限以内で余計な重いmoduleを読み込んでいなければTrue
+    """
+    ok = True
+    for command, (modules, allowed, budget) in COMMANDS.items():
+        elapsed, heavy = measure_import_time(command, repeat)
+        extra = [name for name in heavy if name not in allowed]
+        passed = elapsed <= budget and not extra
+        ok = ok and passed
+        print("{0:10s} {1:7.1f} ms / {2} ms  {3}{4}".format(command, elapsed, budget, "ok" if passed else "OVER",
+                                                          "  (imports {0})".format(", ".join(extra)) if extra else ""))
+    return ok
+
+
+HANDLERS = {
+    "loads": run_loads,
+    "size": run_size,
+    "optimize": run_optimize,
+    "stiffness": run_stiffness,
+    "fatigue": run_fatigue,
+    "spacing": run_spacing,
+    "serve": run_serve,
+    "batch": run_batch,
+}
+
+
+def main(argv=None):
+    """
+    python cli.py loads 625 2000
+    python cli.py size stations.json -j 4
+    python cli.py optimize 2000 --direct
+    python cli.py stiffness --plot results/stiffness.pgf
+    python cli.py fatigue --stress 260
+    python cli.py spacing --max-division 15
+    python cli.py serve --port 8765 --jobs 4
+    python cli.py batch designs.jsonl -o results.jsonl -j 4
+    python cli.py --import-time         subcommandごとのimport時間を上限と比べる
+    """
+    parser = argparse.ArgumentParser(prog="cli.py", description="subcommandの後の引数はそのまま各moduleに渡す")
+    parser.add_argument("--import-time", action="store_true", help="subcommandごとのimport時間を測る")
+    parser.add_argument("command", nargs="?", choices=sorted(HANDLERS))
+    parser.add_argument("args", nargs=argparse.REMAINDER)
+    args = parser.parse_args(argv)
+    if args.import_time:
+        sys.exit(0 if check_import_budget() else 1)
+    if args.command is None:
+        parser.error("a command is required")
+    HANDLERS[args.command](args.args)
+
+
+if __name__ == '__main__':
+    main()
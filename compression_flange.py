@@ -1,17 +1,23 @@
 """Flange(compression) implementation."""
 # coding:utf-8
 # Author: Hirotaka Kondo
-import numpy as np
-import math
-from scipy.interpolate import interp1d
-from unit_convert import ksi2Mpa, mm2inch, mpa2Ksi, round_sig
+from unit_convert import ksi2Mpa, mpa2Ksi
 from flange import Flange
-import csv
+from material import EXTRUSION_7075
+from crippling import get_x_of_graph, get_crippling_stress
+from results_sink import write_row
+
+
+# csvの列ごとの有効数字(Noneはそのまま)
+CFLANGE_ROW_SIG = (None,) * 8 + (3,) * 5
 
 
 class CompressionFlange(Flange):
     """Flange (Compression) Class."""
 
+    __slots__ = ("web",)
+    E = ksi2Mpa(10.3 * 10 ** 3)
+
     def __init__(self, thickness, b_bottom, b_height, web):
         """ Constructor.
 
@@ -21,23 +27,15 @@ class CompressionFlange(Flange):
         :param web:このflangeが属するwebのクラス
         """
         super().__init__(thickness, b_bottom, b_height)
-        self.E = ksi2Mpa(10.3 * 10 ** 3)
         self.web = web
 
     def get_fcy(self):
         """
         Get fcy of 7075.
         p.25の表参照
-        :return:[MPa]
+        :return:[MPa] 表の範囲外ならnan
         """
-        thickness_in_inch = mm2inch(self.thickness)
-
-        if thickness_in_inch < 0.499:
-            return ksi2Mpa(68)
-        elif thickness_in_inch < 5.000:
-            return ksi2Mpa(69)
-        else:
-            return math.nan
+        return EXTRUSION_7075.F_cy(self.thickness)
 
     def get_b_per_t(self):
         """Get b/t."""
@@ -45,40 +43,34 @@ class CompressionFlange(Flange):
 
     def get_x_of_graph(self):
         """X axis of graph."""
-        return np.sqrt(self.get_fcy() / self.E) * self.get_b_per_t()
+        return get_x_of_graph(self.get_fcy(), self.E, self.get_b_per_t())
 
     def get_fcc(self):
         """
         7075 graph in page 12.
         :return:[MPa]
         """
-        right_axis = self.get_x_of_graph()
-
-        if right_axis < 0.1:
-            return math.nan
-        elif right_axis < 0.1 * 5 ** (27 / 33):
-            # 一定部分
-            # print("フランジ 直線部分")
-            left_axis = 0.5 * 2 ** (2.2 / 1.5)
-        elif right_axis < 10:
-            left_axis = 10 ** (-0.20761) * right_axis ** (-0.78427)
-        else:
-            return math.nan
-        lower = mpa2Ksi(self.get_fcy())  # 分母
-        upper = left_axis * lower  # 分子
-        fcc = ksi2Mpa(upper)
-
-        return fcc
+        return get_crippling_stress(self.get_fcy(), self.E, self.get_b_per_t())
 
     def get_ms(self, momentum, h_e):
         """M.S. = Fcc/fc -1."""
         ms = self.get_fcc() / self.get_stress_force(momentum, h_e, self.web.thickness) - 1
         return ms
 
-    def make_row(self, momentum, h_e):
+    def make_row(self, momentum, h_e, sink=None):
+        """
+        :param momentum:前桁分担曲げモーメント[N*m]
+        :param h_e:桁フランジ断面重心距離[mm]
+        :param sink:ResultsSink(Noneならその場でcsvに追記する)
+        """
+        write_row(sink, *self.get_row(momentum, h_e))
+
+    def get_row(self, momentum, h_e):
         """
+        csvの1行(ファイルには書かない).
         :param momentum:前桁分担曲げモーメント[N*m]
         :param h_e:桁フランジ断面重心距離[mm]
+        :return: (表の名前, 値のlist, rounded)
         """
         fcc = self.get_fcc()
         ms = self.get_ms(momentum, h_e)
@@ -87,11 +79,8 @@ class CompressionFlange(Flange):
         fc = self.get_stress_force(momentum, h_e, self.web.thickness)
         sqrt = self.get_x_of_graph()  # p12グラフのx軸の値
         value = [self.web.y_left, self.web.y_right, self.web.thickness, momentum, self.thickness,
-                 self.b_bottom, self.b_height, int(p), round_sig(a), round_sig(fc), round_sig(sqrt), round_sig(fcc),
-                 round_sig(ms)]
-        with open('results/compression_flange.csv', 'a', encoding="utf-8") as f:
-            writer = csv.writer(f)
-            writer.writerow(value)
+                 self.b_bottom, self.b_height, int(p), a, fc, sqrt, fcc, ms]
+        return 'compression_flange.csv', value, CFLANGE_ROW_SIG
 
 
 def read_sn_graph(maximum_stress):
@@ -100,6 +89,7 @@ def read_sn_graph(maximum_stress):
     :param maximum_stress: 最大応力[MPa]
     :return fatigue_life:繰り返し回数
     """
+    from scipy.interpolate import interp1d  # 疲労の計算のときだけscipyを読み込む
     maximum_stress_ksi = mpa2Ksi(maximum_stress)
     # print(maximum_stress_ksi)
     y = [7, 6, 5, 4, 3.3]  # 上面フランジ(edited by knd)
@@ -111,40 +101,35 @@ def read_sn_graph(maximum_stress):
     return fatigue_life
 
 
-def make_cflange_header():
+def make_cflange_header(sink=None):
     header = ["左端STA[mm]", "右端STA[mm]", "web thickness[mm]", "Momentum[N*m]",
               "$t_f$[mm]", "b bottom f1[mm]", "b height f2[mm]", "P[N]", "A[${mm}^2$]", "fc[MPa]", "√(Fcy/E)(b/t)",
               "$F_{cc}$[MPa]", "M.S."]
-    with open('results/compression_flange.csv', 'a', encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow(header)
+    write_row(sink, 'compression_flange.csv', header)
 
 
-def make_fatigue_header():
+def make_fatigue_header(sink=None):
     """
     Make Header of csv.
+    :param sink:ResultsSink(Noneならその場でcsvに追記する)
     """
     header = ["荷重[LMT]", "応力[MPa]", "n[1/khr]", "N[回]", "n/N"]
-    with open('results/compression_flange_fatigue.csv', 'a', encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow(header)
+    write_row(sink, 'compression_flange_fatigue.csv', header)
 
 
-def write_fatigue_row(maximum_stress):
+def write_fatigue_row(maximum_stress, sink=None):
     """
     write row of csv
     :param maximum_stress:LMT[MPa]
+    :param sink:ResultsSink(Noneならその場でcsvに追記する)
     """
     accumulated_loss = 0  # 累積損失
-    with open('results/compression_flange_fatigue.csv', 'a', encoding="utf-8") as f:
-        writer = csv.writer(f)
-        for (lmt, n) in zip([40, 50, 60, 70, 80, 90, 100], [20000, 6000, 2000, 600, 200, 60, 20]):
-            stress = maximum_stress * lmt / 100
-            N = read_sn_graph(stress)
-            value = [lmt, stress, n, N, n / N]
-            round_value = map(lambda x: round_sig(x), value)
-            writer.writerow(round_value)
-            accumulated_loss = accumulated_loss + n / N
+    for (lmt, n) in zip([40, 50, 60, 70, 80, 90, 100], [20000, 6000, 2000, 600, 200, 60, 20]):
+        stress = maximum_stress * lmt / 100
+        N = read_sn_graph(stress)
+        value = [lmt, stress, n, N, n / N]
+        write_row(sink, 'compression_flange_fatigue.csv', value, True)
+        accumulated_loss = accumulated_loss + n / N
 
     print("累積損失", accumulated_loss)
     h = 1000 / accumulated_loss
@@ -0,0 +1,64 @@
+"""Crippling stress of 7075 (graph in page 12)."""
+# coding:utf-8
+# Author: Shun Arahata
+import math
+import numpy as np
+from unit_convert import is_scalar
+
+X_MIN = 0.1  # グラフの横軸の下限
+X_FLAT = 0.1 * 5 ** (27 / 33)  # これより左はFcc/Fcyが一定
+X_MAX = 10  # グラフの横軸の上限
+FLAT_RATIO = 0.5 * 2 ** (2.2 / 1.5)  # 一定部分のFcc/Fcy
+POWER_COEFFICIENT = 10 ** (-0.20761)  # Fcc/Fcy = POWER_COEFFICIENT * x ** POWER_EXPONENT
+POWER_EXPONENT = -0.78427
+
+
+def get_x_of_graph(fcy, E, b_per_t):
+    """
+    グラフの横軸 √(Fcy/E)(b/t).
+    :param fcy:F_cy[MPa](配列可)
+    :param E:ヤング率[MPa](配列可)
+    :param b_per_t:b/t(配列可)
+    """
+    if is_scalar(fcy) and is_scalar(E) and is_scalar(b_per_t):
+        return math.sqrt(fcy / E) * b_per_t
+    return np.sqrt(np.asarray(fcy) / E) * b_per_t
+
+
+def get_crippling_stress(fcy, E, b_per_t):
+    """
+    クリップリング応力Fcc.
+
+    Fcc/Fcyは横軸が X_FLAT までは一定,そこから X_MAX までは冪乗則.
+    Fcc/Fcyは無次元なのでksiに直さずにMPaのまま掛ける.
+    配列を渡せばまとめて計算する(stiffenerとフランジで共通).
+    :param fcy:F_cy[MPa](配列可)
+    :param E:ヤング率[MPa](配列可)
+    :param b_per_t:b/t(配列可)
+    :return: Fcc[MPa] グラフの範囲外(またはfcyがnan)ならnan
+    """
+    x = get_x_of_graph(fcy, E, b_per_t)
+    if is_scalar(x):
+        # スカラーはnumpyを通さない方が速い
+        if x < X_MIN:
+            return math.nan
+        elif x < X_FLAT:
+            return FLAT_RATIO * fcy
+        elif x < X_MAX:
+            return POWER_COEFFICIENT * x ** POWER_EXPONENT * fcy
+        return math.nan  # nanもここ
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ratio = np.where(x < X_FLAT, FLAT_RATIO, POWER_COEFFICIENT * x ** POWER_EXPONENT)
+        inside = (x >= X_MIN) & (x < X_MAX)
+    return np.where(inside, ratio * fcy, np.nan)
+
+
+def main():
+    """Test Function."""
+    from unit_convert import ksi2Mpa
+    b_per_t = np.array([0.5, 2, 5, 10, 20, 50, 200])
+    print(get_crippling_stress(ksi2Mpa(64), ksi2Mpa(10.3 * 1000), b_per_t))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+"""SQLite database of evaluated designs."""
+# coding:utf-8
+# Author: Shun Arahata
+import argparse
+import re
+import sqlite3
+from rib import LEFT_ARRAY, get_failures
+from optimizer import DESIGN_VARIABLES
+from design_record import get_design_values, build_rib
+from result_store import MS_COLUMNS
+
+BATCH_SIZE = 10000  # この行数ごとに1つのtransactionでまとめてinsertする
+# 行の並び.staはリブ左端のSTA[mm],feasibleはrib.get_failuresが空なら1
+COLUMNS = ("y_index", "sta") + DESIGN_VARIABLES + MS_COLUMNS + ("he", "mass", "feasible")
+INTEGER_COLUMNS = ("y_index", "sta", "division", "rivet_n", "feasible")
+# 型を宣言しない列は入れた値をそのまま持つ(REALだと13が13.0になり,作り直したRibの部品とcsvの表記が変わる)
+UNTYPED_COLUMNS = tuple(name for name in DESIGN_VARIABLES if name not in INTEGER_COLUMNS)
+# 「STAごとに条件を満たす最軽量」を引くためのindex
+INDEXES = {
+    "designs_sta_mass": ("sta", "feasible", "mass"),
+    "designs_mass": ("mass",),
+    "designs_web": ("sta", "web_thickness"),
+    "designs_division": ("sta", "division"),
+    "designs_stiffener": ("sta", "stiffener_thickness"),
+    "designs_rivet_flange": ("sta", "rivet_n", "rivet_flange_d"),
+}
+OPERATORS = ("=", "!=", "<", "<=", ">", ">=")
+_CONDITION = re.compile(r"^\s*(\w+)\s*(!=|<=|>=|=|<|>)\s*(\S+)\s*$")
+
+
+class DesignDatabase(object):
+    """
+    評価した候補をSQLiteに入れるもの.
+
+    ResultStoreと同じくoptimize(store=...)に渡せる.
+    行はBATCH_SIZEごとに1つのtransactionでexecutemanyする.
+    同じ寸法の候補をもう一度入れると新しい結果で置き換える.
+    M.S.のnanはSQLiteではNULLになる.
+    """
+
+    def __init__(self, path, batch_size=BATCH_SIZE):
+        """Constructor.
+
+        :param path:データベースのファイル(なければ作る)
+        :param batch_size:まとめてinsertする行数
+        """
+        # BackgroundWriterのthreadからも使う(同時には使わない)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.batch_size = batch_size
+        self._rows = []
+        definitions = ", ".join(name if name in UNTYPED_COLUMNS else
+                                "{0} {1}".format(name, "INTEGER" if name in INTEGER_COLUMNS else "REAL")
+                                for name in COLUMNS)
+        with self.connection:
+            self.connection.execute("CREATE TABLE IF NOT EXISTS designs ({0})".format(definitions))
+            # 同じ寸法は1行だけにする
+            self.connection.execute("CREATE UNIQUE INDEX IF NOT EXISTS designs_key ON designs ({0})".format(
+                ", ".join(("y_index",) + DESIGN_VARIABLES)))
+            for name, columns in INDEXES.items():
+                self.connection.execute("CREATE INDEX IF NOT EXISTS {0} ON designs ({1})".format(
+                    name, ", ".join(columns)))
+        self._insert = "INSERT OR REPLACE INTO designs VALUES ({0})".format(", ".join("?" * len(COLUMNS)))
+
+    def __len__(self):
+        self.flush()
+        return self.connection.execute("SELECT COUNT(*) FROM designs").fetchone()[0]
+
+    def append(self, rib, ms_list, mass):
+        """
+        評価した候補を1行追加する(ResultStore.appendと同じ).
+        :param rib:全ての部品を追加してset_he済みのRib
+        :param ms_list:rib.get_all_ms()
+        :param mass:質量[kg]
+        """
+        feasible = 0 if get_failures(ms_list) else 1
+        self._rows.append((rib.y_index, rib.y_left) + get_design_values(rib)
+                          + tuple(float(ms) for ms in ms_list) + (float(rib.he), float(mass), feasible))
+        if len(self._rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """ためている行を1つのtransactionでinsertする."""
+        if not self._rows:
+            return
+        with self.connection:
+            self.connection.executemany(self._insert, self._rows)
+        self._rows = []
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def get_lightest(self, sta, conditions=(), feasible=True, limit=1):
+        """
+        STAごとの条件を満たす軽い順の設計.
+        :param sta:リブ左端のSTA[mm](LEFT_ARRAYの値)
+        :param conditions:(列の名前, 演算子, 値)のlist 例えば[("web_thickness", ">=", 1.6), ("rivet_n", "=", 1)]
+        :param feasible:Trueなら成立するものだけ
+        :param limit:個数
+        :return: 列の名前 -> 値の辞書のlist
+        """
+        clauses = ["sta = ?"]
+        params = [sta]
+        if feasible:
+            clauses.append("feasible = 1")
+        for name, operator, value in conditions:
+            if name not in COLUMNS or operator not in OPERATORS:
+                raise ValueError("invalid condition: {0} {1} {2}".format(name, operator, value))
+            clauses.append("{0} {1} ?".format(name, operator))
+            params.append(value)
+        self.flush()
+        cursor = self.connection.execute("SELECT * FROM designs WHERE {0} ORDER BY mass LIMIT ?".format(
+            " AND ".join(clauses)), params + [limit])
+        return [dict(zip(COLUMNS, row)) for row in cursor]
+
+
+def build_rib_from_row(row):
+    """
+    get_lightestの行からRibを作り直す.
+    :param row:列の名前 -> 値の辞書
+    :return: set_he済みのRib
+    """
+    return build_rib(row["y_index"], tuple(row[name] for name in DESIGN_VARIABLES))
+
+
+def parse_condition(text):
+    """
+    "web_thickness>=1.6"のような文字列を(列の名前, 演算子, 値)にする.
+    :param text:条件
+    :return: tuple
+    """
+    match = _CONDITION.match(text)
+    if match is None:
+        raise ValueError("invalid condition: {0}".format(text))
+    name, operator, value = match.groups()
+    return name, operator, float(value)
+
+
+def main():
+    """
+    Test Function.
+    python design_db.py designs.db --sta 2000 --where "web_thickness>=1.6" --where "rivet_n=1"
+    """
+    import time
+    parser = argparse.ArgumentParser()
+    parser.add_argument("path", help="データベースのファイル(opt/*.py --db で作る)")
+    parser.add_argument("--sta", type=int, default=LEFT_ARRAY[3], help="リブ左端のSTA[mm]")
+    parser.add_argument("--where", action="append", default=[], help="条件(例: web_thickness>=1.6)")
+    parser.add_argument("--limit", type=int, default=1, help="個数")
+    args = parser.parse_args()
+    conditions = [parse_condition(text) for text in args.where]
+    with DesignDatabase(args.path) as database:
+        start = time.perf_counter()
+        rows = database.get_lightest(args.sta, conditions, limit=args.limit)
+        elapsed = time.perf_counter() - start
+        for row in rows:
+            print(", ".join("{0}={1}".format(name, row[name]) for name in DESIGN_VARIABLES + ("mass",)))
+        print("{0} rows, {1:.2f} ms".format(len(rows), elapsed * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+"""Array-backed storage of many rib designs."""
+# coding:utf-8
+# Author: Shun Arahata
+import numpy as np
+from rib import Rib
+from optimizer import DESIGN_VARIABLES
+
+# 1設計あたり1行(117byte).寸法はfloat64(1.6などをfloat32にすると別のWebになってしまう)
+# int_maskはfloat64の列に入れた値のうちintだったもののbit(13と13.0は別の部品でcsvの表記も違うので戻せるように)
+RECORD_DTYPE = np.dtype([("y_index", np.int8)]
+                        + [(name, np.int8 if name in ("division", "rivet_n") else np.float64)
+                           for name in DESIGN_VARIABLES]
+                        + [("int_mask", np.uint16), ("mass", np.float64)])
+INITIAL_CAPACITY = 1024
+
+
+def get_int_mask(values):
+    """
+    :param values:DESIGN_VARIABLESの順の値
+    :return: intの値のbitを立てた整数(i番目の値ならbit i)
+    """
+    mask = 0
+    for i, value in enumerate(values):
+        if isinstance(value, (int, np.integer)):
+            mask |= 1 << i
+    return mask
+
+
+def restore_types(values, mask):
+    """
+    get_int_maskで記録したintの値をintに戻す(get_int_maskの逆).
+    :param values:DESIGN_VARIABLESの順の値
+    :param mask:get_int_maskの値
+    :return: tuple
+    """
+    return tuple(int(value) if mask >> i & 1 else value for i, value in enumerate(values))
+
+
+def get_design_values(rib):
+    """
+    RibからDESIGN_VARIABLESの順の設計変数の値を取り出す(DesignSpace.build_ribの逆).
+    :param rib:全ての部品を追加したRib
+    :return: tuple
+    """
+    return (rib.web.thickness, rib.web.division,
+            rib.stiffener.thickness, rib.stiffener.bs1_bottom, rib.stiffener.bs2_height,
+            rib.cflange.thickness, rib.cflange.b_bottom, rib.cflange.b_height,
+            rib.tflange.thickness, rib.tflange.b_bottom, rib.tflange.b_height,
+            rib.rivet_stiffener.D, rib.rivet_flange.D, rib.rivet_flange.pd_ratio, rib.rivet_flange.N)
+
+
+def build_rib(y_index, values):
+    """
+    設計変数の値からRibを作る(get_design_valuesの逆).
+    :param y_index:リブ左端位置のindex
+    :param values:DESIGN_VARIABLESの順の値
+    :return: set_he済みのRib
+    """
+    (web_t, div, ts, bs1, bs2, ct, cb, ch, tt, tb, th,
+     rivet_stiffener_d, rivet_flange_d, pd_ratio, rivet_n) = values
+    rib = Rib(y_index)
+    rib.add_web(web_t, div)
+    rib.add_stiffener(ts, bs1, bs2)
+    rib.add_compression_flange(ct, cb, ch)
+    rib.add_tension_flange(tt, tb, th)
+    rib.add_rivet_stiffener(rivet_stiffener_d)
+    rib.add_rivet_flange(rivet_flange_d, pd_ratio, rivet_n)
+    rib.set_he()
+    return rib
+
+
+class DesignRecords(object):
+    """
+    Ribの代わりに設計変数と質量だけをnumpyの構造化配列で持つ.
+
+    Pareto解析やtop-kのために大量の設計を残すときに使う.
+    必要になったらbuild_ribでRibに戻す.
+    """
+
+    __slots__ = ("data", "count")
+
+    def __init__(self, capacity=INITIAL_CAPACITY):
+        """Constructor.
+
+        :param capacity:最初に確保する行数(足りなくなれば倍にする)
+        """
+        self.data = np.zeros(capacity, dtype=RECORD_DTYPE)
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, rib, mass=None):
+        """
+        Ribを1行として追加する.
+        :param rib:全ての部品を追加したRib
+        :param mass:質量[kg] 省略すればrib.get_total_mass()
+        """
+        if self.count == len(self.data):
+            self.data = np.resize(self.data, 2 * len(self.data))
+        if mass is None:
+            mass = rib.get_total_mass()
+        values = get_design_values(rib)
+        self.data[self.count] = (rib.y_index,) + values + (get_int_mask(values), mass)
+        self.count += 1
+
+    def get_records(self):
+        """:return: 使っている行の構造化配列(view)"""
+        return self.data[:self.count]
+
+    def get_values(self, index):
+        """
+        :param index:行番号
+        :return: DESIGN_VARIABLESの順の値のtuple(appendしたときのintはint)
+        """
+        record = self.data[index]
+        return restore_types((record[name].item() for name in DESIGN_VARIABLES), int(record["int_mask"]))
+
+    def build_rib(self, index):
+        """
+        行からRibを作り直す.
+        :param index:行番号
+        :return: set_he済みのRib
+        """
+        return build_rib(self.data[index]["y_index"].item(), self.get_values(index))
+
+    def get_lightest(self, k):
+        """
+        :param k:個数
+        :return: 軽い順のk個の行番号
+        """
+        mass = self.get_records()["mass"]
+        k = min(k, self.count)
+        if k == 0:
+            return np.array([], dtype=int)
+        index = np.argpartition(mass, k - 1)[:k]
+        return index[np.argsort(mass[index], kind="stable")]
+
+    def get_nbytes(self):
+        """:return: 使っている行のbyte数"""
+        return self.count * RECORD_DTYPE.itemsize
+
+
+def measure_memory(space, count):
+    """
+    Ribのまま持つ場合とDesignRecordsに持つ場合の1設計あたりのメモリを測る.
+    :param space:optimizer.DesignSpace
+    :param count:測る設計の数(空間から等間隔に取る)
+    :return: (Ribのbyte/設計, DesignRecordsのbyte/設計)
+    """
+    import gc
+    import tracemalloc
+    indices = range(0, space.size, max(space.size // count, 1))
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    ribs = [space.build_rib(index) for index in indices]
+    rib_bytes = (tracemalloc.get_traced_memory()[0] - before) / len(ribs)
+    records = DesignRecords(len(ribs))
+    for rib in ribs:
+        records.append(rib)
+    del ribs
+    gc.collect()
+    tracemalloc.stop()
+    return rib_bytes, records.get_nbytes() / len(records)
+
+
+def main():
+    """Test Function."""
+    from optimizer import DesignSpace
+    space = DesignSpace(3, 1.60, 5, 1.80, [13 + i for i in range(10)], [10 + 2 * i for i in range(10)],
+                        [4 + i for i in range(5)], 22.5, [14 + 2 * i for i in range(10)],
+                        [4 + i for i in range(5)], 22.5, [14 + 2 * i for i in range(10)],
+                        3.175, 3.175, 6, 2)
+    rib_bytes, record_bytes = measure_memory(space, 10000)
+    print("Rib {0:.0f} byte/design, DesignRecords {1:.0f} byte/design".format(rib_bytes, record_bytes))
+    records = DesignRecords()
+    for index in range(0, space.size, 97):
+        records.append(space.build_rib(index))
+    for index in records.get_lightest(3):
+        print(records.get_values(index), records.get_records()["mass"][index])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,224 @@
+"""Evaluation of a rib design without any file output."""
+# coding:utf-8
+# Author: Shun Arahata
+import math
+import numpy as np
+from rib import Rib, MS_NAMES, get_failures, get_ms_messages
+from optimizer import DESIGN_VARIABLES
+from design_record import get_design_values
+from result_store import STORE_DTYPE
+from joint_design import design_joints
+from results_sink import write_row
+
+# 設計の入力の誤り(build_stationやDesignSpaceに渡した値がおかしい)として扱う例外
+INPUT_ERRORS = (ValueError, KeyError, TypeError, IndexError, AttributeError, ArithmeticError)
+
+
+def _to_python(value):
+    """numpyの数値をjsonにできるpythonの数値にする."""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def json_safe(value):
+    """
+    jsonにはnanとinfがないのでNoneにする(辞書とlistの中も).
+    :param value:to_dictの返り値など
+    """
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: json_safe(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [json_safe(item) for item in value]
+    return value
+
+
+class RibResult(object):
+    """
+    1つのSTA区間の計算結果.ファイルにもstdoutにも何も書かない.
+
+    Attributes:
+        y_index:リブ左端位置のindex
+        y_left:リブ左端座標[mm]
+        y_right:リブ右端座標[mm]
+        design:DESIGN_VARIABLES -> 値 の辞書
+        hf:前桁高さ[mm]
+        he:桁フランジ断面重心距離[mm]
+        sf:前桁の分担荷重[N]
+        mf:前桁分担曲げモーメント[N*m]
+        ms:MS_NAMES -> M.S. の辞書
+        failures:成立していないM.S.の名前のlist(get_failures)
+        mass:質量[kg]
+        warnings:リベットを打てるかどうかの警告のlist
+        rows:途中の値.csvの表ごとに(表の名前, 値のlist, rounded)のlist(Rib.get_rows.計算しなければ空)
+    """
+
+    __slots__ = ("y_index", "y_left", "y_right", "design", "hf", "he", "sf", "mf", "ms", "failures", "mass",
+                 "warnings", "rows")
+
+    def __init__(self, rib, with_rows=True):
+        """Constructor.
+
+        :param rib:全ての部品を追加したRib(heはここで計算する)
+        :param with_rows:Falseなら途中の値(rows)は計算しない(M.S.と質量だけなら1.5倍くらい速い)
+        """
+        rib.set_he()
+        ms_list = rib.get_all_ms()
+        self.y_index = rib.y_index
+        self.y_left = rib.y_left
+        self.y_right = rib.y_right
+        self.design = dict(zip(DESIGN_VARIABLES, get_design_values(rib)))
+        self.hf = float(rib.hf)
+        self.he = float(rib.he)
+        self.sf = rib.sf
+        self.mf = rib.mf
+        self.ms = dict(zip(MS_NAMES, (float(ms) for ms in ms_list)))
+        self.failures = get_failures(ms_list)
+        self.mass = float(rib.get_total_mass())
+        self.warnings = rib.get_rivet_warnings()
+        self.rows = rib.get_rows() if with_rows else []
+
+    @property
+    def feasible(self):
+        """全てのM.S.が成立していればTrue."""
+        return not self.failures
+
+    def get_ms_messages(self):
+        """:return: Rib.decide_msで表示するM.S.の確認の文字列のlist"""
+        return get_ms_messages([self.ms[name] for name in MS_NAMES])
+
+    def get_table(self, table):
+        """
+        :param table:csvのファイル名(例えば'web.csv')
+        :return: その表の値のlist
+        """
+        for name, row, _ in self.rows:
+            if name == table:
+                return row
+        raise KeyError(table)
+
+    def to_dict(self):
+        """:return: jsonにできる辞書(M.S.のnanはそのままfloat('nan').厳密なjsonにするならjson_safeを通す)"""
+        return {"y_index": self.y_index, "y_left": self.y_left, "y_right": self.y_right,
+                "design": {name: _to_python(value) for name, value in self.design.items()},
+                "hf": self.hf, "he": self.he, "sf": self.sf, "mf": self.mf, "ms": self.ms,
+                "failures": self.failures, "feasible": self.feasible, "mass": self.mass,
+                "warnings": self.warnings,
+                "tables": {table: [_to_python(value) for value in row] for table, row, _ in self.rows}}
+
+    def to_record(self):
+        """:return: ResultStoreと同じ列(STORE_DTYPE)のnumpyの1行"""
+        return np.array((self.y_index,) + tuple(self.design[name] for name in DESIGN_VARIABLES)
+                        + tuple(self.ms[name] for name in MS_NAMES) + (self.he, self.mass), dtype=STORE_DTYPE)[()]
+
+
+def _check_positive(name, values):
+    """
+    寸法などが全て正か確認する(0や負の値はM.S.の計算で0除算などになる).
+    :param name:入力の名前
+    :param values:値のlist
+    """
+    for value in values:
+        if not value > 0:  # nanもここで弾く
+            raise ValueError("{0} must be positive: {1}".format(name, values))
+
+
+def build_station(config):
+    """
+    1つのSTA区間の部品を追加したRib.
+    :param config:{"y_index": 0, "web": [厚さ, 分割数], "stiffener": [...], "compression_flange": [...],
+        "tension_flange": [...], "rivet_stiffener": 径, "rivet_flange": [径, ピッチの倍率, 列数]}
+        "rivet_stiffener"と"rivet_flange"を両方省くと,リベットはjoint_design.design_jointsで最も軽いものにする
+    寸法,分割数,リベット径,列数が正でないとき,ピッチの倍率が1以下(p <= d)のときはValueError
+    :return: Rib instance
+    """
+    for name in ("web", "stiffener", "compression_flange", "tension_flange"):
+        _check_positive(name, config[name])
+    sta = Rib(config["y_index"])
+    sta.add_web(*config["web"])
+    sta.add_stiffener(*config["stiffener"])
+    sta.add_compression_flange(*config["compression_flange"])
+    sta.add_tension_flange(*config["tension_flange"])
+    if "rivet_stiffener" not in config and "rivet_flange" not in config:
+        sta.set_he()
+        missing = design_joints(sta)
+        if missing:
+            raise ValueError("no rivet joint satisfies the M.S. at STA{0}: {1}".format(sta.y_left,
+                                                                                       ", ".join(missing)))
+        return sta
+    _check_positive("rivet_stiffener", [config["rivet_stiffener"]])
+    _check_positive("rivet_flange", config["rivet_flange"])
+    if not config["rivet_flange"][1] > 1:
+        raise ValueError("pitch of rivet_flange must be larger than its diameter: {0}".format(
+            config["rivet_flange"]))
+    sta.add_rivet_stiffener(config["rivet_stiffener"])
+    sta.add_rivet_flange(*config["rivet_flange"])
+    return sta
+
+
+def evaluate(rib):
+    """
+    :param rib:全ての部品を追加したRib
+    :return: RibResult
+    """
+    return RibResult(rib)
+
+
+def evaluate_rib(config, with_rows=True):
+    """
+    寸法の辞書からM.S.,途中の値,質量を計算する(ファイルには何も書かない).
+    :param config:build_stationの引数(stations.jsonの1区間)
+    :param with_rows:Falseなら途中の値は計算しない
+    :return: RibResult
+    """
+    return RibResult(build_station(config), with_rows)
+
+
+def write_csv(result, sink=None):
+    """
+    結果をmain.pyと同じ各csvに1行ずつ書く.
+    :param result:RibResult
+    :param sink:ResultsSink(Noneならその場でcsvに追記する)
+    """
+    for table, row, rounded in result.rows:
+        write_row(sink, table, row, rounded)
+
+
+def print_messages(result):
+    """
+    main.pyと同じ警告(Rib.could_be_hit)とM.S.の確認(Rib.decide_ms)を表示する.
+    :param result:RibResult
+    """
+    for message in result.warnings:
+        print(message)
+    for message in result.get_ms_messages():
+        print(message)
+
+
+def main():
+    """Test Function."""
+    import json
+    import time
+    config = {"y_index": 3, "web": [1.6, 5], "stiffener": [1.8, 17, 17], "compression_flange": [4, 18, 17],
+              "tension_flange": [5, 23, 25], "rivet_stiffener": 3.96875, "rivet_flange": [3.96875, 6, 1]}
+    result = evaluate_rib(config)
+    print("mass", result.mass, "feasible", result.feasible, "he", result.he)
+    for name, ms in result.ms.items():
+        print(name, ms)
+    print("web.csv", result.get_table("web.csv"))
+    print(result.to_record())
+    start = time.perf_counter()
+    for _ in range(10000):
+        evaluate_rib(config)
+    print("{0:.1f} us / evaluate_rib".format((time.perf_counter() - start) * 100))
+    # 0除算になる入力はbatch_evalで止まらずにerrorの行になる
+    from batch_eval import evaluate_line
+    for key, value in (("web", [1.6, 0]), ("web", [0, 5]), ("rivet_flange", [3.96875, 6, 0]),
+                       ("compression_flange", [0, 18, 17]), ("rivet_flange", [3.96875, 1, 1])):
+        bad = dict(config)
+        bad[key] = value
+        print(evaluate_line(1, json.dumps(bad)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+"""Fast feasibility screening of rib design."""
+# coding:utf-8
+# Author: Shun Arahata
+import math
+from rib import MS_NAMES
+from panels import get_critical_stress
+
+# M.S.1つあたりの相対的な計算コスト(MS_NAMESの順,実測の目安)
+# web と 2つのweb hole lossは F_scr を共有するので,最初に評価したものだけが重い
+COSTS = (6, 3, 3, 2, 1, 5, 1, 5)
+REORDER_INTERVAL = 256  # 何回評価するごとに順番を見直すか
+
+
+class _Intermediate(object):
+    """
+    1つのRibの評価の間で共有する中間量(web剪断応力と許容応力).
+    panelsがTrueならM.S.が最小のパネルの値(Rib.get_all_ms(panels=True)と同じ).
+    """
+
+    __slots__ = ("rib", "panels", "fs", "allowable")
+
+    def __init__(self, rib, panels=False):
+        self.rib = rib
+        self.panels = panels
+        self.fs = None
+        self.allowable = None
+
+    def _set_critical_stress(self):
+        self.fs, self.allowable = get_critical_stress(self.rib)
+
+    def get_fs(self):
+        """f_s[MPa]."""
+        if self.fs is None:
+            if self.panels:
+                self._set_critical_stress()
+            else:
+                self.fs = self.rib.web.get_shear_force(self.rib.sf, self.rib.he)
+        return self.fs
+
+    def get_allowable(self):
+        """min(F_su, F_scr)[MPa] (Web.get_msと同じ順番で評価する)."""
+        if self.allowable is None and self.panels:
+            self._set_critical_stress()
+        if self.allowable is None:
+            web = self.rib.web
+            f_scr = web.get_buckling_shear_force()
+            f_su = web.get_fsu()
+            self.allowable = min(f_su, f_scr)
+        return self.allowable
+
+
+def _web_ms(rib, shared):
+    return shared.get_allowable() / shared.get_fs() - 1
+
+
+def _stiffener_ms(rib, shared):
+    return rib.stiffener.get_ms(rib.he)
+
+
+def _cflange_ms(rib, shared):
+    return rib.cflange.get_ms(rib.mf, rib.he)
+
+
+def _tflange_ms(rib, shared):
+    return rib.tflange.get_ms(rib.mf, rib.he)
+
+
+def _rivet_stiffener_ms(rib, shared):
+    return rib.rivet_stiffener.get_ms()
+
+
+def _hole_loss_ms(rivet, shared):
+    """Web.get_web_hole_loss_msと同じ式で,中間量だけ共有する."""
+    p = rivet.rivet_pitch
+    return shared.get_allowable() / (shared.get_fs() * p / (p - rivet.D)) - 1
+
+
+def _rivet_stiffener_hole_ms(rib, shared):
+    return _hole_loss_ms(rib.rivet_stiffener, shared)
+
+
+def _rivet_flange_ms(rib, shared):
+    return rib.rivet_flange.get_ms(rib.sf, rib.he)
+
+
+def _rivet_flange_hole_ms(rib, shared):
+    return _hole_loss_ms(rib.rivet_flange, shared)
+
+
+# MS_NAMESの順
+CHECKS = (_web_ms, _stiffener_ms, _cflange_ms, _tflange_ms, _rivet_stiffener_ms, _rivet_stiffener_hole_ms,
+          _rivet_flange_ms, _rivet_flange_hole_ms)
+
+
+class FeasibilityKernel(object):
+    """
+    M.S.が全て正かどうかだけを判定する.
+
+    Rib.decide_msと同じ判定をするが,printせず,最初にM.S.<0になった時点で打ち切る.
+    M.S.は(不成立になる割合)/(計算コスト)の大きい順に評価し,
+    その割合は評価しながら数えて定期的に順番を見直す.
+    """
+
+    def __init__(self, reorder_interval=REORDER_INTERVAL, panels=False):
+        """Constructor.
+
+        :param reorder_interval:何回評価するごとに順番を見直すか
+        :param panels:Trueならwebとweb hole lossはM.S.が最小のパネルで判定する(Rib.get_all_ms(panels=True))
+        """
+        self.reorder_interval = reorder_interval
+        self.panels = panels
+        self.order = sorted(range(len(MS_NAMES)), key=lambda i: COSTS[i])
+        self.evaluations = [0] * len(MS_NAMES)
+        self.failures = [0] * len(MS_NAMES)
+        self.count = 0
+
+    def get_first_failure(self, rib):
+        """
+        最初に見つかった不成立のM.S.の名前.
+        :param rib:set_he済みのRib
+        :return: MS_NAMESの名前,全て成立すればNone
+        """
+        shared = _Intermediate(rib, self.panels)
+        failure = None
+        for i in self.order:
+            self.evaluations[i] += 1
+            ms = CHECKS[i](rib, shared)
+            if not ms >= 0 and not (i == 1 and math.isnan(ms)):  # stiffenerのnanは成立とみなす
+                self.failures[i] += 1
+                failure = MS_NAMES[i]
+                break
+        self.count += 1
+        if self.count % self.reorder_interval == 0:
+            self._reorder()
+        return failure
+
+    def is_feasible(self, rib):
+        """
+        :param rib:set_he済みのRib
+        :return: 全てのM.S.が成立すればTrue
+        """
+        return self.get_first_failure(rib) is None
+
+    def _reorder(self):
+        """不成立になりやすく安いものから評価するよう並べ替える."""
+        def priority(i):
+            rate = (self.failures[i] + 1) / (self.evaluations[i] + 2)
+            return rate / COSTS[i]
+
+        self.order = sorted(range(len(MS_NAMES)), key=priority, reverse=True)
+
+
+def main():
+    """Test Function."""
+    import timeit
+    from optimizer import DesignSpace
+    space = DesignSpace(3, 1.60, 5, 1.80, [13 + i for i in range(10)], [10 + 2 * i for i in range(10)],
+                        [4 + i for i in range(5)], 22.5, [14 + 2 * i for i in range(10)],
+                        [4 + i for i in range(5)], 22.5, [14 + 2 * i for i in range(10)],
+                        3.175, 3.175, 6, 2)
+    ribs = [space.build_rib(index) for index in range(0, space.size, space.size // 2000)]
+    kernel = FeasibilityKernel()
+    for rib in ribs:
+        kernel.is_feasible(rib)
+    t_kernel = timeit.timeit(lambda: [kernel.is_feasible(rib) for rib in ribs], number=3)
+    t_all = timeit.timeit(lambda: [rib.get_all_ms() for rib in ribs], number=3)
+    print("order", [MS_NAMES[i] for i in kernel.order])
+    print("get_all_ms {0:.3f} s, kernel {1:.3f} s ({2:.1f}x)".format(t_all, t_kernel, t_all / t_kernel))
+
+
+if __name__ == '__main__':
+    main()
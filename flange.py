@@ -1,16 +1,18 @@
 """Flange Base Class."""
 
-from scipy.interpolate import interp1d
 from unit_convert import mpa2Ksi
+from flyweight import Frozen
 
 
 # coding:utf-8
 # Author: Hirotaka Kondo
 
 
-class Flange:
+class Flange(Frozen):
     """Flange Base Class."""
 
+    __slots__ = ("thickness", "b_bottom", "b_height")
+
     def __init__(self, thickness, b_bottom, b_height):
         """Constructor.
 
@@ -0,0 +1,89 @@
+"""Immutable flyweight base of structural components."""
+# coding:utf-8
+# Author: Shun Arahata
+import threading
+import weakref
+
+
+class FlyweightMeta(type):
+    """
+    同じ引数で作られたインスタンスを共有するmetaclass.
+
+    インスタンスは引数をkeyとして弱参照で持ち,どこからも使われなくなれば消える.
+    webなどの部品を引数にとるものは部品そのもの(flyweightなので同じ寸法なら同じobject)をkeyにする.
+    Lockを取るのでthread poolから同時に作っても同じ引数なら同じインスタンスになる.
+    """
+
+    def __init__(cls, name, bases, namespace):
+        super().__init__(name, bases, namespace)
+        cls._instances = weakref.WeakValueDictionary()
+        cls._lock = threading.Lock()
+
+    def __call__(cls, *args):
+        key = args + tuple(map(type, args))  # 1と1.0を区別する(csvの表記が変わるので)
+        with cls._lock:
+            instance = cls._instances.get(key)
+        if instance is not None:
+            return instance
+        instance = super().__call__(*args)
+        object.__setattr__(instance, "_args", args)
+        with cls._lock:
+            # 他のthreadが先に作っていればそちらを使う
+            return cls._instances.setdefault(key, instance)
+
+    def clear_instances(cls):
+        """共有しているインスタンスを忘れる(作ったときの前桁高さなどが変わったとき)."""
+        with cls._lock:
+            cls._instances.clear()
+
+
+class Frozen(object, metaclass=FlyweightMeta):
+    """
+    変更できない部品の基底クラス.
+
+    __init__の中で属性を決めたあとは代入も削除もできない.
+    サブクラスは自分の属性を__slots__に列挙する.
+    """
+
+    __slots__ = ("_args", "__weakref__")
+
+    def __setattr__(self, name, value):
+        if hasattr(self, "_args"):
+            raise AttributeError("{0} is immutable".format(type(self).__name__))
+        object.__setattr__(self, name, value)
+
+    def __delattr__(self, name):
+        raise AttributeError("{0} is immutable".format(type(self).__name__))
+
+    def __reduce__(self):
+        """pickleしても同じ引数のインスタンスに戻す(process poolに渡せるように)."""
+        return type(self), self._args
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __repr__(self):
+        return "{0}{1}".format(type(self).__name__, self._args)
+
+
+def main():
+    """Test Function."""
+    import pickle
+    from concurrent.futures import ThreadPoolExecutor
+    from web import Web
+    from stiffener import Stiffener
+    webs = list(ThreadPoolExecutor(8).map(lambda _: Web(625, 1000, 3, 2.03), range(100)))
+    print("shared", all(web is webs[0] for web in webs))
+    stiffener = Stiffener(2.29, 22, 19.0, webs[0])
+    print("pickle", pickle.loads(pickle.dumps(stiffener)) is stiffener)
+    try:
+        stiffener.thickness = 3
+    except AttributeError as error:
+        print(error)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+"""Spar geometry (front spar height profile)."""
+# coding:utf-8
+# Author: Shun Arahata
+import bisect
+import json
+import os
+from functools import lru_cache
+import numpy as np
+
+HALF_SPAN = 5000  # [mm](sandm.HALF_SPAN)
+C_ROOT = 2.13 * 1000  # rootのchord長[mm](sandm.C_ROOT)
+C_TIP = 1.07 * 1000  # tipのchord長[mm](sandm.C_TIP)
+# 今までの前桁高さ(STA625で320mm,STA5000で130mmの直線)
+DEFAULT_HF_STA = (625, 5000)
+DEFAULT_HF_VALUE = (320, 130)
+HF_CACHE_SIZE = 4096  # スカラーで問い合わせたSTAを覚えておく数
+PROFILE_ENVIRON = "WING_HF_PROFILE"  # 前桁高さの設定ファイル(json)を指定する環境変数
+
+
+class TabulatedProfile(object):
+    """
+    STAと前桁高さの表を線形補間する(2点なら直線).
+    表の範囲外はValueError(今までのinterp1dと同じ).
+    """
+
+    __slots__ = ("sta", "height", "_sta", "_height")
+
+    def __init__(self, sta, height):
+        """Constructor.
+
+        :param sta:STA[mm](昇順)
+        :param height:前桁高さ[mm]
+        """
+        self.sta = np.asarray(sta, dtype=float)
+        self.height = np.asarray(height, dtype=float)
+        if len(self.sta) < 2 or len(self.sta) != len(self.height) or np.any(np.diff(self.sta) <= 0):
+            raise ValueError("sta must be increasing and have the same length as height")
+        self._sta = self.sta.tolist()
+        self._height = self.height.tolist()
+
+    def __call__(self, sta):
+        """
+        :param sta:STA[mm](配列可)
+        :return: 前桁高さ[mm]
+        """
+        if isinstance(sta, (int, float)):
+            if not self._sta[0] <= sta <= self._sta[-1]:
+                raise ValueError("STA {0} is out of the spar height table".format(sta))
+            j = min(bisect.bisect_right(self._sta, sta) - 1, len(self._sta) - 2)
+            x0, x1, y0, y1 = self._sta[j], self._sta[j + 1], self._height[j], self._height[j + 1]
+            return y0 + (y1 - y0) / (x1 - x0) * (sta - x0)
+        sta = np.asarray(sta, dtype=float)
+        if sta.size and (sta.min() < self._sta[0] or sta.max() > self._sta[-1]):
+            raise ValueError("STA is out of the spar height table")
+        return np.interp(sta, self.sta, self.height)
+
+    def to_dict(self):
+        return {"type": "tabulated", "sta": self._sta, "height": self._height}
+
+
+def LinearProfile(sta_root, height_root, sta_tip, height_tip):
+    """2点を結ぶ直線の前桁高さ."""
+    return TabulatedProfile([sta_root, sta_tip], [height_root, height_tip])
+
+
+class AirfoilProfile(object):
+    """
+    翼弦長と翼厚比から求める前桁高さ.
+
+    翼弦長はrootからtipまで直線テーパー,翼厚比もrootとtipの間を線形に変える.
+    前桁高さ = depth_ratio * 翼厚比 * 翼弦長 (depth_ratioは前桁位置での翼厚/最大翼厚).
+    """
+
+    __slots__ = ("thickness_ratio_root", "thickness_ratio_tip", "depth_ratio", "chord_root", "chord_tip",
+                 "half_span")
+
+    def __init__(self, thickness_ratio_root, thickness_ratio_tip=None, depth_ratio=1.0, chord_root=C_ROOT,
+                 chord_tip=C_TIP, half_span=HALF_SPAN):
+        """Constructor.
+
+        :param thickness_ratio_root:rootの翼厚比
+        :param thickness_ratio_tip:tipの翼厚比(Noneならrootと同じ)
+        :param depth_ratio:前桁位置での翼厚/最大翼厚
+        :param chord_root:rootの翼弦長[mm]
+        :param chord_tip:tipの翼弦長[mm]
+        :param half_span:半翼幅[mm]
+        """
+        self.thickness_ratio_root = thickness_ratio_root
+        self.thickness_ratio_tip = thickness_ratio_root if thickness_ratio_tip is None else thickness_ratio_tip
+        self.depth_ratio = depth_ratio
+        self.chord_root = chord_root
+        self.chord_tip = chord_tip
+        self.half_span = half_span
+
+    def __call__(self, sta):
+        """
+        :param sta:STA[mm](配列可)
+        :return: 前桁高さ[mm]
+        """
+        if not isinstance(sta, (int, float)):
+            sta = np.asarray(sta, dtype=float)
+        eta = sta / self.half_span
+        chord = self.chord_root + (self.chord_tip - self.chord_root) * eta
+        ratio = self.thickness_ratio_root + (self.thickness_ratio_tip - self.thickness_ratio_root) * eta
+        return self.depth_ratio * ratio * chord
+
+    def to_dict(self):
+        return {"type": "airfoil", "thickness_ratio_root": self.thickness_ratio_root,
+                "thickness_ratio_tip": self.thickness_ratio_tip, "depth_ratio": self.depth_ratio,
+                "chord_root": self.chord_root, "chord_tip": self.chord_tip, "half_span": self.half_span}
+
+
+def make_profile(config):
+    """
+    設定の辞書から前桁高さを作る.
+    {"type": "linear", "sta": [625, 5000], "height": [320, 130]}
+    {"type": "tabulated", "sta": [...], "height": [...]}
+    {"type": "airfoil", "thickness_ratio_root": 0.16, ...}(AirfoilProfileの引数)
+    :param config:辞書
+    :return: profile
+    """
+    config = dict(config)
+    kind = config.pop("type")
+    if kind in ("linear", "tabulated"):
+        if kind == "linear" and len(config["sta"]) != 2:
+            raise ValueError("linear profile needs exactly two points")
+        return TabulatedProfile(config["sta"], config["height"])
+    if kind == "airfoil":
+        return AirfoilProfile(**config)
+    raise ValueError("unknown spar height profile type: {0}".format(kind))
+
+
+def load_profile(path):
+    """jsonファイルから前桁高さを読む."""
+    with open(path, encoding="utf-8") as f:
+        return make_profile(json.load(f))
+
+
+_profile = None
+_listeners = []
+
+
+def _get_hf_cached(sta):
+    return _profile(sta)
+
+
+def get_profile():
+    """:return: 今の前桁高さ"""
+    return _profile
+
+
+def set_profile(profile):
+    """
+    前桁高さを差し替える.
+    STAごとのキャッシュを捨て,on_profile_changeで登録した関数を呼ぶ
+    (前桁高さを持っているWebなどのflyweightを作り直すため).
+    :param profile:TabulatedProfile,AirfoilProfileなど,STAを渡すと高さを返すもの
+    """
+    global _profile, _get_hf_cached
+    _profile = profile
+    _get_hf_cached = lru_cache(maxsize=HF_CACHE_SIZE)(profile)
+    for listener in _listeners:
+        listener()
+
+
+def on_profile_change(listener):
+    """
+    前桁高さが差し替えられたときに呼ぶ関数を登録する.
+    :param listener:引数なしの関数
+    """
+    _listeners.append(listener)
+
+
+def get_hf(sta):
+    """
+    前桁高さ.
+    スカラーはSTAごとにキャッシュし,配列は1回でまとめて計算する.
+    :param sta:STA[mm](配列可)
+    :return: hf[mm]
+    """
+    if isinstance(sta, (int, float)):
+        return _get_hf_cached(sta)
+    return _profile(np.asarray(sta, dtype=float))
+
+
+if os.environ.get(PROFILE_ENVIRON):
+    set_profile(load_profile(os.environ[PROFILE_ENVIRON]))
+else:
+    set_profile(TabulatedProfile(DEFAULT_HF_STA, DEFAULT_HF_VALUE))
+
+
+def main():
+    """Test Function."""
+    sta = np.array([625, 1000, 2000, 3000, 4000, 5000])
+    print("default", get_hf(sta))
+    print("airfoil", AirfoilProfile(0.16, 0.12)(sta))
+
+
+if __name__ == '__main__':
+    main()
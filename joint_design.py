@@ -0,0 +1,123 @@
+"""Automatic design of rivet joints."""
+# coding:utf-8
+# Author: Shun Arahata
+from collections import namedtuple
+import numpy as np
+from rib import STIFFENER_RIVET_RATIO, FLANGE_RIVET_RATIO
+from rivet_web_flange import RIVET_F_SU as FLANGE_RIVET_F_SU
+from rivet_web_stiffener import RIVET_F_SU as STIFFENER_RIVET_F_SU, RIVET_LOAD_K, solve_rivet_pitch
+
+RIVET_DICT = {3: 2.38125, 4: 3.175, 5: 3.96875, 6: 4.7625, 8: 6.35}  # リベット径[mm]の候補辞書(keyは呼び番号)
+PD_RATIO_LIST = (4, 5, 6)  # リベットピッチ/鋲径,一般に4D~6Dとすることが多い
+ROW_COUNT_LIST = tuple(sorted(FLANGE_RIVET_RATIO))  # リベット列数
+
+# weight: 単位長さあたりのリベットの体積の目安 N*D^2/p [mm] (小さいほど軽い)
+StiffenerJoint = namedtuple("StiffenerJoint", ["D", "rivet_pitch", "ms", "web_hole_loss_ms", "weight"])
+FlangeJoint = namedtuple("FlangeJoint", ["D", "pd_ratio", "N", "ms", "web_hole_loss_ms", "weight"])
+
+
+def _get_web_hole_loss_ms(rib, pitch, D):
+    """Web.get_web_hole_loss_msを配列で計算する."""
+    allowable = min(rib.web.get_fsu(), rib.web.get_buckling_shear_force())
+    fs = rib.web.get_shear_force(rib.sf, rib.he)
+    return allowable / (fs * pitch / (pitch - D)) - 1
+
+
+def design_stiffener_joints(rib, rivets=RIVET_DICT):
+    """
+    ウェブとスティフナーを結合するリベットの候補を全て調べる.
+
+    ピッチは鋲径ごとにsolve_rivet_pitchでまとめて決め,
+    Rib.could_be_hitの幾何的な条件(bs1,bf2 >= 4D)は拘束条件として扱う.
+    :param rib:web,stiffener,フランジを追加してset_he済みのRib
+    :param rivets:リベット径[mm]の候補辞書
+    :return: 全てのM.S.が正のStiffenerJointのlist(軽い順)
+    """
+    D = np.array(sorted(rivets.values()), dtype=float)
+    pitch = solve_rivet_pitch(D, rib.web.thickness, rib.stiffener.get_clippling_stress())
+    p_allow = np.pi / 4 * D ** 2 * STIFFENER_RIVET_F_SU
+    rivet_load = RIVET_LOAD_K * rib.stiffener.get_area() / rib.web.width_b * pitch
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ms = p_allow / rivet_load - 1
+        hole_ms = _get_web_hole_loss_ms(rib, pitch, D)
+        weight = D ** 2 / pitch
+    width = STIFFENER_RIVET_RATIO * D
+    fit = ((rib.stiffener.bs1_bottom >= width) & (rib.cflange.b_height >= width)
+           & (rib.tflange.b_height >= width))
+    ok = fit & (ms >= 0) & (hole_ms >= 0)
+    joints = [StiffenerJoint(*values) for values in zip(D[ok].tolist(), pitch[ok].tolist(), ms[ok].tolist(),
+                                                         hole_ms[ok].tolist(), weight[ok].tolist())]
+    return sorted(joints, key=lambda joint: joint.weight)
+
+
+def design_flange_joints(rib, rivets=RIVET_DICT, pd_ratios=PD_RATIO_LIST, row_counts=ROW_COUNT_LIST):
+    """
+    ウェブとフランジを結合するリベットの(鋲径,ピッチ比,列数)を全て調べる.
+
+    Rib.could_be_hitの幾何的な条件(bf1 >= (縁距離+千鳥間隔)D + t/2)は拘束条件として扱う.
+    :param rib:web,stiffener,フランジを追加してset_he済みのRib
+    :param rivets:リベット径[mm]の候補辞書
+    :param pd_ratios:ピッチ比の候補
+    :param row_counts:列数の候補
+    :return: 全てのM.S.が正のFlangeJointのlist(軽い順)
+    """
+    # pd_ratioとNは与えられた型のまま(intならcsvも6のまま)
+    D, pd_ratio, N = np.meshgrid(np.array(sorted(rivets.values()), dtype=float),
+                                 np.asarray(pd_ratios), np.asarray(row_counts), indexing="ij")
+    D, pd_ratio, N = D.ravel(), pd_ratio.ravel(), N.ravel()
+    pitch = D * pd_ratio
+    p_allow = np.pi / 4 * D ** 2 * FLANGE_RIVET_F_SU
+    ps = rib.sf / rib.he * pitch / N
+    ms = p_allow / ps - 1
+    hole_ms = _get_web_hole_loss_ms(rib, pitch, D)
+    weight = N * D ** 2 / pitch
+    ratio = np.array([FLANGE_RIVET_RATIO[n] for n in N.tolist()])
+    fit = ((rib.tflange.b_bottom >= ratio * D + rib.tflange.thickness / 2)
+           & (rib.cflange.b_bottom >= ratio * D + rib.cflange.thickness / 2))
+    ok = fit & (ms >= 0) & (hole_ms >= 0)
+    joints = [FlangeJoint(*values) for values in zip(D[ok].tolist(), pd_ratio[ok].tolist(), N[ok].tolist(),
+                                                      ms[ok].tolist(), hole_ms[ok].tolist(), weight[ok].tolist())]
+    return sorted(joints, key=lambda joint: joint.weight)
+
+
+def design_joints(rib, rivets=RIVET_DICT, pd_ratios=PD_RATIO_LIST, row_counts=ROW_COUNT_LIST):
+    """
+    最も軽いリベットをRibに追加する(見つからなかったリベットは追加しない).
+    :param rib:web,stiffener,フランジを追加してset_he済みのRib
+    :return: 見つからなかったリベットのM.S.の名前(rib.MS_NAMESの"rivet stiffener","rivet flange")のlist
+    """
+    missing = []
+    stiffener_joints = design_stiffener_joints(rib, rivets)
+    if stiffener_joints:
+        rib.add_rivet_stiffener(stiffener_joints[0].D)
+    else:
+        missing.append("rivet stiffener")
+    flange_joints = design_flange_joints(rib, rivets, pd_ratios, row_counts)
+    if flange_joints:
+        joint = flange_joints[0]
+        rib.add_rivet_flange(joint.D, joint.pd_ratio, joint.N)
+    else:
+        missing.append("rivet flange")
+    return missing
+
+
+def main():
+    """Test Function."""
+    from rib import Rib
+    sta = Rib(3)
+    sta.add_web(1.6, 5)
+    sta.add_stiffener(1.8, 17, 17)
+    sta.add_compression_flange(4, 18, 17)
+    sta.add_tension_flange(5, 23, 25)
+    sta.set_he()
+    for joint in design_stiffener_joints(sta):
+        print(joint)
+    for joint in design_flange_joints(sta):
+        print(joint)
+    print(design_joints(sta), sta.rivet_stiffener.D, sta.rivet_flange.D, sta.rivet_flange.pd_ratio,
+          sta.rivet_flange.N)
+    sta.decide_ms()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+"""Constraint-kill statistics of design sweeps."""
+# coding:utf-8
+# Author: Shun Arahata
+import csv
+import json
+import os
+import numpy as np
+from rib import Rib, MS_NAMES
+from web import Web
+from optimizer import DESIGN_VARIABLES, DesignSpace
+from sizing import get_flange_pairs
+
+DEAD_MIN_EVALUATIONS = 100  # 一度も成立しない値を後回しにするのに必要な評価回数
+# get_section_feasibleが調べる軸(web厚さ,分割数,フランジ)
+SECTION_AXES = (0, 1, 5, 6, 7, 8, 9, 10)
+
+
+class KillStats(object):
+    """
+    どのM.S.がどの設計変数の値の候補を落としたかを数える.
+
+    設計変数の値ごとに評価回数,成立回数,M.S.ごとの不成立回数を持つ.
+    十分評価されたのに一度も成立しなかった値は以降のsweepで後回しにする(get_suspect_mask).
+    optimizeは軽い順に評価するので,軽い相手とばかり組み合わされた値は最適解に含まれていても
+    一度も成立しないことがある.なので候補から外すのは,web,フランジのM.S.が依存する軸の
+    全ての組み合わせで成立しないことを確かめられた値だけにする(trim).
+
+    Attributes:
+        y_index:リブ左端位置のindex
+        counts:{変数名: {値: [評価回数, 成立回数, M.S.ごとの不成立回数...]}}
+    """
+
+    def __init__(self, y_index):
+        """Constructor.
+
+        :param y_index:リブ左端位置のindex
+        """
+        self.y_index = y_index
+        self.counts = {name: {} for name in DESIGN_VARIABLES}
+
+    def record(self, values, failures):
+        """
+        評価結果を1つ記録する.
+        :param values:DESIGN_VARIABLESの順の設計変数の値
+        :param failures:rib.get_failuresで得られる不成立のM.S.の名前のlist
+        """
+        for name, value in zip(DESIGN_VARIABLES, values):
+            count = self.counts[name].setdefault(value, [0, 0] + [0] * len(MS_NAMES))
+            count[0] += 1
+            if not failures:
+                count[1] += 1
+            for failure in failures:
+                count[2 + MS_NAMES.index(failure)] += 1
+
+    def get_dead_values(self, min_evaluations=DEAD_MIN_EVALUATIONS):
+        """
+        一度も成立しなかった値を返す.
+        :param min_evaluations:これ以上評価された値だけを対象にする
+        :return:{変数名: set(値)}
+        """
+        dead = {}
+        for name, value_counts in self.counts.items():
+            values = {value for value, count in value_counts.items()
+                      if count[0] >= min_evaluations and count[1] == 0}
+            if values:
+                dead[name] = values
+        return dead
+
+    def get_suspect_mask(self, space, min_evaluations=DEAD_MIN_EVALUATIONS):
+        """
+        一度も成立しなかった値を含む候補.optimizeはこれを暫定解探し(dive)で後回しにするだけで,
+        質量順の評価からは外さないので最適性の判定はそのまま正しい.
+        :param space:DesignSpace
+        :param min_evaluations:get_dead_values参照
+        :return: space.shapeのbool配列
+        """
+        if space.y_index != self.y_index:
+            raise ValueError("KillStats of y_index {0} cannot be used for y_index {1}".format(
+                self.y_index, space.y_index))
+        dead = self.get_dead_values(min_evaluations)
+        mask = np.zeros(space.shape, dtype=bool)
+        for axis, (name, candidate) in enumerate(zip(DESIGN_VARIABLES, space.candidates)):
+            values = dead.get(name)
+            if values:
+                shape = [1] * len(space.shape)
+                shape[axis] = len(candidate)
+                mask |= np.array([value in values for value in candidate.tolist()]).reshape(shape)
+        return mask
+
+    def trim(self, space, panels=False, min_evaluations=DEAD_MIN_EVALUATIONS):
+        """
+        一度も成立しなかった値のうち,成立しないことが確かめられたものを候補から外す.
+        web,フランジのM.S.はweb厚さ,分割数,フランジの軸だけで決まるので,その軸の全ての組み合わせ
+        (get_section_feasible)で成立しない値はどの候補でも成立しない.質量順の評価の下界と最適性はそのまま正しい.
+        それ以外の値(stiffenerやリベットで落ちたものなど)はget_suspect_maskで後回しにするだけにする.
+        :param space:DesignSpace
+        :param panels:optimizeのpanels(Trueならwebのパネルごとの判定は確かめずフランジだけで確かめる)
+        :param min_evaluations:get_dead_values参照
+        :return: (DesignSpace, {変数名: 外した値のlist})
+        """
+        dead = self.get_dead_values(min_evaluations)
+        if not any(DESIGN_VARIABLES[axis] in dead for axis in SECTION_AXES):
+            return space, {}
+        feasible = get_section_feasible(space, panels)
+        candidates = list(space.candidates)
+        trimmed = {}
+        for position, axis in enumerate(SECTION_AXES):
+            name = DESIGN_VARIABLES[axis]
+            values = dead.get(name, ())
+            if not values:
+                continue
+            alive = np.moveaxis(feasible, position, 0).reshape(len(candidates[axis]), -1).any(axis=1)
+            removed = [value for value, ok in zip(candidates[axis].tolist(), alive.tolist())
+                       if value in values and not ok]
+            if removed:
+                candidates[axis] = np.array([value for value in candidates[axis].tolist() if value not in removed])
+                trimmed[name] = removed
+        if not trimmed:
+            return space, {}
+        return DesignSpace(space.y_index, *candidates), trimmed
+
+    def print_report(self):
+        """M.S.ごとの不成立回数と,一度も成立しなかった値を表示する."""
+        total = sum(count[0] for count in self.counts[DESIGN_VARIABLES[0]].values())
+        print("evaluations", total)
+        for i, ms_name in enumerate(MS_NAMES):
+            failures = sum(count[2 + i] for count in self.counts[DESIGN_VARIABLES[0]].values())
+            print("{0}: {1}".format(ms_name, failures))
+        for name, values in self.get_dead_values().items():
+            print("dead {0}: {1}".format(name, sorted(values)))
+
+    def write_csv(self, path):
+        """
+        変数の値ごとの集計をcsvに書き出す.
+        :param path:出力先
+        """
+        header = ["変数", "値", "評価回数", "成立回数"] + list(MS_NAMES)
+        with open(path, 'w', encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            for name, value_counts in self.counts.items():
+                for value in sorted(value_counts):
+                    writer.writerow([name, value] + value_counts[value])
+
+    def save(self, path):
+        """
+        jsonに保存する.
+        :param path:保存先
+        """
+        counts = {name: [[value] + count for value, count in value_counts.items()]
+                  for name, value_counts in self.counts.items()}
+        with open(path, 'w', encoding="utf-8") as f:
+            json.dump({"y_index": self.y_index, "ms_names": MS_NAMES, "counts": counts}, f)
+
+
+def get_section_feasible(space, panels=False):
+    """
+    web,圧縮側フランジ,引張側フランジのM.S.が全て成立するか(他の軸によらない).
+    :param space:DesignSpace
+    :param panels:Trueならwebは見ない(Rib.get_all_ms(panels=True)のwebはパネルごとに判定するので)
+    :return: SECTION_AXESの軸の長さのbool配列
+    """
+    rib = Rib(space.y_index)
+    web_t, division = space.candidates[0], space.candidates[1]
+    cflange_candidates, tflange_candidates = space.candidates[5:8], space.candidates[8:11]
+    shape = tuple(len(space.candidates[axis]) for axis in SECTION_AXES)
+    feasible = np.empty((len(web_t), len(division), int(np.prod(shape[2:5])), int(np.prod(shape[5:]))), dtype=bool)
+    for i, thickness in enumerate(web_t.tolist()):
+        web = Web(rib.y_left, rib.y_right, division[0].item(), thickness)
+        _, _, he, _, flange_ok = get_flange_pairs(rib.hf, rib.mf, web, cflange_candidates, tflange_candidates)
+        for j, value in enumerate(division.tolist()):
+            feasible[i, j] = flange_ok
+            if not panels:
+                with np.errstate(invalid="ignore"):
+                    feasible[i, j] &= Web(rib.y_left, rib.y_right, value, thickness).get_ms(rib.sf, he) >= 0
+    return feasible.reshape(shape)
+
+
+def load_kill_stats(path, y_index):
+    """
+    保存されたKillStatsを読む.なければ空のものを作る.
+    :param path:KillStats.saveの保存先
+    :param y_index:リブ左端位置のindex
+    :return: KillStats
+    """
+    stats = KillStats(y_index)
+    if not os.path.exists(path):
+        return stats
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if data["y_index"] != y_index or tuple(data["ms_names"]) != MS_NAMES:
+        raise ValueError("{0} is not kill stats of y_index {1}".format(path, y_index))
+    for name, rows in data["counts"].items():
+        stats.counts[name] = {row[0]: row[1:] for row in rows}
+    return stats
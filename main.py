@@ -2,181 +2,181 @@
 
 # -*- coding: utf-8 -*-
 # Author: Shun Arahata,Hirotaka Kondo
+import argparse
+import io
+import json
 import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from functools import partial
+import geometry
 from web import make_web_header
 from stiffener import make_stiffener_header
 from tension_flange import make_tflange_header
 from compression_flange import make_cflange_header
 from rivet_web_stiffener import rivet_ws_make_all_header
 from rivet_web_flange import rivet_wf_make_all_header
-from rib import Rib, make_rib_header
+from rib import make_rib_header
+from evaluation import build_station, evaluate, write_csv, print_messages
 from stiffness import calc_stiffness
+from results_sink import RESULTS_DIRECTORY, ResultsSink, RowCollector, write_row
+from background_writer import BackgroundWriter
+from run_cache import RunCache, RecordingSink, get_bay_key
 
+DEFAULT_CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stations.json')
 
-def init_header():
-    directory = 'results/'
-    test = os.listdir(directory)
-    for item in test:
-        if item.endswith(".csv"):
-            os.remove(os.path.join(directory, item))
+
+def init_header(sink):
+    """
+    results/のcsvを消してheaderを書く.
+    :param sink: ResultsSink
+    """
+    sink.reset()
     # header
-    make_web_header()
-    make_stiffener_header()
-    make_tflange_header()
-    make_cflange_header()
-    rivet_wf_make_all_header()
-    rivet_ws_make_all_header()
-    make_rib_header()
-
-def calc_all(sta):
+    make_web_header(sink)
+    make_stiffener_header(sink)
+    make_tflange_header(sink)
+    make_cflange_header(sink)
+    rivet_wf_make_all_header(sink)
+    rivet_ws_make_all_header(sink)
+    make_rib_header(sink)
+
+
+def calc_all(sta, sink=None, cache=None):
     """csv outputとか諸々
 
+    cacheを与えると,入力(寸法,荷重,材料の表,計算式)が前回と同じbayは保存した行とM.S.の確認(decide_ms)の
+    表示を出すだけにする(リベットの警告とheは今まで通り).
     :param sta: Rib instance
+    :param sink: ResultsSink(Noneならその場でcsvに追記する)
+    :param cache: RunCache
+    """
+    if cache is not None:
+        key = get_bay_key(sta)
+        entry = cache.get(key)
+        if entry is not None:
+            rows, messages = entry
+            sta.could_be_hit()
+            sta.set_he()
+            for table, row in rows:
+                write_row(sink, table, row)
+            for message in messages:
+                print(message)
+            return
+        sink = RecordingSink(sink)
+    result = evaluate(sta)
+    write_csv(result, sink)
+    print_messages(result)
+    if cache is not None:
+        cache.put(key, sink.rows, result.get_ms_messages())
+
+
+def load_config(path):
+    """
+    STA区間の寸法を書いたjsonを読む.
+    {"stations": [{"y_index": 0, "web": [2.03, 3], ...}, ...], "spar_height": {...}}
+    spar_heightは省略でき,書けばgeometry.make_profileに渡す前桁高さの分布にする.
+    :param path:jsonのファイル
+    :return: 辞書
+    """
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def evaluate_station(config, cache=None):
+    """
+    1つのSTA区間を計算する(process poolの中でも呼べるようにcsvの行と表示を返す).
+    :param config:build_stationの引数
+    :param cache:RunCache
+    :return: (Rib instance, (表の名前, 書き出す値のlist)のlist, 表示した文字列)
+    """
+    collector = RowCollector()
+    text = io.StringIO()
+    with redirect_stdout(text):
+        sta = build_station(config)
+        calc_all(sta, collector, cache)
+        print("sta{0} mass".format(sta.y_left), sta.get_total_mass())
+    return sta, collector.rows, text.getvalue()
+
+
+def _init_worker(spar_height):
+    """process poolの各processの前桁高さの分布を親と同じにする."""
+    if spar_height is not None:
+        geometry.set_profile(geometry.make_profile(spar_height))
+
+
+def evaluate_stations(stations, sink=None, jobs=1, cache=None, spar_height=None):
+    """
+    全てのSTA区間を計算し,csvの行と表示をSTA順に書く.
+    :param stations:build_stationの引数のlist
+    :param sink:ResultsSink(Noneならその場でcsvに追記する)
+    :param jobs:processの数(1なら今のprocessで順番に計算する)
+    :param cache:RunCache
+    :param spar_height:前桁高さの分布(geometry.make_profileの引数)
+    :return: Rib instanceのlist(stationsの順)
+    """
+    evaluate = partial(evaluate_station, cache=cache)
+    if jobs == 1:
+        results = map(evaluate, stations)
+    else:
+        executor = ProcessPoolExecutor(jobs, initializer=_init_worker, initargs=(spar_height,))
+        results = executor.map(evaluate, stations)  # 終わった順ではなくstationsの順に返る
+    ribs = []
+    try:
+        for sta, rows, text in results:
+            for table, row in rows:
+                write_row(sink, table, row)
+            print(text, end="")
+            ribs.append(sta)
+    finally:
+        if jobs != 1:
+            executor.shutdown()
+    return ribs
+
+
+def run_config(path, directory=RESULTS_DIRECTORY, jobs=1, cache=None):
+    """
+    1つのjsonの全てのSTA区間と剛性を計算してdirectoryにcsvを書く.
+    :param path:jsonのファイル(load_config)
+    :param directory:csvを置くディレクトリ(なければ作る)
+    :param jobs:processの数
+    :param cache:RunCache
+    :return: Rib instanceのlist
     """
-    sta.web_csv()
-    sta.tflange_csv()
-    sta.cflange_csv()
-    sta.stiffener_csv()
-    sta.rivet_stiffener_csv()
-    sta.rivet_flange_csv()
-    sta.write_rib_row()
-    sta.decide_ms()
-
-
-def make_sta625():
-    sta = Rib(0)
-    sta.add_web(2.03, 3)
-    sta.add_stiffener(2.03, 16, 22)
-    sta.add_compression_flange(7, 30, 25)
-    sta.add_tension_flange(10, 30, 30)
+    config = load_config(path)
+    spar_height = config.get("spar_height")
+    os.makedirs(directory, exist_ok=True)
+    previous = geometry.get_profile()
+    if spar_height is not None:
+        geometry.set_profile(geometry.make_profile(spar_height))
+    try:
+        with BackgroundWriter(ResultsSink(directory)) as sink:
+            init_header(sink)
+            ribs = evaluate_stations(config["stations"], sink, jobs, cache, spar_height)
+            calc_stiffness(ribs, sink, os.path.join(directory, "stiffness.pgf"))
+    finally:
+        if spar_height is not None:
+            geometry.set_profile(previous)
+    return ribs
+
+
+def main(argv=None):
     """
-    sta.add_compression_flange(7, 60, 25)
-    sta.add_tension_flange(8, 60, 30)
+    python main.py                      stations.jsonを計算してresults/に書く
+    python main.py a.json b.json -j 4   それぞれresults/a/,results/b/に書く
     """
-    sta.add_rivet_stiffener(3.175)
-    sta.add_rivet_flange(3.175, 6, 2)
-    calc_all(sta)
-    print("sta625 mass", sta.get_total_mass())
-    print("he ",sta.he)
-    return sta
-
-
-def make_sta1000():
-    sta = Rib(1)
-    sta.add_web(1.6, 6)
-    sta.add_stiffener(1.8, 22, 21)
-    sta.add_compression_flange(8, 27, 20)
-    sta.add_tension_flange(9, 30, 30)
-    sta.add_rivet_stiffener(4.7625)
-    sta.add_rivet_flange(3.175, 6, 2)
-    calc_all(sta)
-    print("sta1000 mass", sta.get_total_mass())
-    return sta
-
-
-def make_sta1500():
-    sta = Rib(2)
-    sta.add_web(1.6, 5)
-    sta.add_stiffener(1.8, 18, 18)
-    sta.add_compression_flange(8, 34, 18)
-    sta.add_tension_flange(8, 34, 25)
-    sta.add_rivet_stiffener(3.96875)
-    sta.add_rivet_flange(3.96875, 6, 2)
-    calc_all(sta)
-    print("sta1500 mass", sta.get_total_mass())
-    return sta
-
-
-def make_sta2000():
-    sta = Rib(3)
-    sta.add_web(1.6, 5)
-    sta.add_stiffener(1.8, 17, 17)
-    sta.add_compression_flange(4, 18, 17)
-    sta.add_tension_flange(5, 23, 25)
-    sta.add_rivet_stiffener(3.96875)
-    sta.add_rivet_flange(3.96875, 6, 1)
-    calc_all(sta)
-    print("sta2000 mass", sta.get_total_mass())
-    return sta
-
-
-def make_sta2500():
-    sta = Rib(4)
-    sta.add_web(1.6, 5)
-    sta.add_stiffener(1.8, 18, 15)
-    sta.add_compression_flange(4, 18, 16)
-    sta.add_tension_flange(4, 18, 21)
-    sta.add_rivet_stiffener(3.96875)
-    sta.add_rivet_flange(3.96875, 6, 1)
-    calc_all(sta)
-    print("sta2500 mass", sta.get_total_mass())
-    return sta
-
-
-def make_sta3000():
-    sta = Rib(5)
-    sta.add_web(1.6, 4)
-    sta.add_stiffener(1.8, 18, 11)
-    sta.add_compression_flange(2.5, 23, 26)
-    sta.add_tension_flange(2.5, 23, 26)
-    sta.add_rivet_stiffener(3.96875)
-    sta.add_rivet_flange(3.96875, 6, 1)
-    calc_all(sta)
-    print("sta3000 mass", sta.get_total_mass())
-    return sta
-
-
-def make_sta3500():
-    sta = Rib(6)
-    sta.add_web(1.6, 3)
-    sta.add_stiffener(1.8, 17, 10)
-    sta.add_compression_flange(2.5, 18, 22)
-    sta.add_tension_flange(2.5, 18, 22)
-    sta.add_rivet_stiffener(3.96875)
-    sta.add_rivet_flange(3.96875, 6, 1)
-    calc_all(sta)
-    print("sta3500 mass", sta.get_total_mass())
-    return sta
-
-
-def make_sta4000():
-    sta = Rib(7)
-    sta.add_web(1.6, 3)
-    sta.add_stiffener(1.8, 15, 6)
-    sta.add_compression_flange(2, 12, 14)
-    sta.add_tension_flange(2, 13, 13)
-    sta.add_rivet_stiffener(3.125)
-    sta.add_rivet_flange(2.38125, 6, 1)
-    calc_all(sta)
-    print("sta4000 mass", sta.get_total_mass())
-    return sta
-
-
-def make_sta4500():
-    sta = Rib(8)
-    sta.add_web(1.6, 2)
-    sta.add_stiffener(1.27, 13, 7)
-    sta.add_compression_flange(1.0, 12, 14)
-    sta.add_tension_flange(1.0, 12, 14)
-    sta.add_rivet_stiffener(3.125)
-    sta.add_rivet_flange(2.38125, 6, 1)
-    calc_all(sta)
-    print("sta4500 mass", sta.get_total_mass())
-    return sta
-
-
-def main():
-    init_header()
-    sta625 = make_sta625()
-    sta1000 = make_sta1000()
-    sta1500 = make_sta1500()
-    sta2000 = make_sta2000()
-    sta2500 = make_sta2500()
-    sta3000 = make_sta3000()
-    sta3500 = make_sta3500()
-    sta4000 = make_sta4000()
-    sta4500 = make_sta4500()
-    calc_stiffness(sta625, sta1000, sta1500, sta2000, sta2500, sta3000, sta3500, sta4000, sta4500)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("configs", nargs="*", default=[DEFAULT_CONFIG], help="STA区間の寸法を書いたjson")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="processの数")
+    parser.add_argument("--no-cache", action="store_true", help="bayごとのcacheを使わない")
+    args = parser.parse_args(argv)
+    cache = None if args.no_cache else RunCache()
+    for path in args.configs:
+        if len(args.configs) == 1:
+            directory = RESULTS_DIRECTORY
+        else:
+            directory = os.path.join(RESULTS_DIRECTORY, os.path.splitext(os.path.basename(path))[0])
+        run_config(path, directory, args.jobs, cache)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,109 @@
+"""Material allowables database."""
+# coding:utf-8
+# Author: Shun Arahata
+import bisect
+import math
+import numpy as np
+from unit_convert import ksi2Mpa, inch2mm, is_scalar
+
+
+class Allowable(object):
+    """
+    板厚の区間ごとに一定の許容応力の表.
+
+    区間の境界の板厚[mm]と区間ごとの値[MPa]を持ち,
+    表の範囲外の区間の値はnanにしておく.
+    配列を渡せばnp.searchsortedでまとめて引く.
+    """
+
+    __slots__ = ("breakpoints", "values", "closed", "_breakpoints", "_values")
+
+    def __init__(self, breakpoints, values, closed=False):
+        """Constructor.
+
+        :param breakpoints:区間の上端の板厚[mm](昇順)
+        :param values:区間ごとの値[MPa] breakpointsより1つ多い
+        :param closed:Trueなら上端を区間に含める(t <= 上端),Falseなら含めない(t < 上端)
+        """
+        self.breakpoints = np.asarray(breakpoints, dtype=float)
+        self.values = np.asarray(values, dtype=float)
+        if len(self.values) != len(self.breakpoints) + 1:
+            raise ValueError("values must have one more element than breakpoints")
+        self.closed = closed
+        self._breakpoints = self.breakpoints.tolist()
+        self._values = self.values.tolist()
+
+    def __call__(self, thickness):
+        """
+        :param thickness:板厚[mm](配列可)
+        :return: 値[MPa] 表の範囲外ならnan
+        """
+        if is_scalar(thickness):
+            # スカラーはnumpyを通さない方が速い
+            if math.isnan(thickness):
+                return math.nan
+            search = bisect.bisect_left if self.closed else bisect.bisect_right
+            return self._values[search(self._breakpoints, thickness)]
+        thickness = np.asarray(thickness, dtype=float)
+        index = np.searchsorted(self.breakpoints, thickness, side="left" if self.closed else "right")
+        return np.where(np.isnan(thickness), np.nan, self.values[index])
+
+    def get_valid_mask(self, thickness):
+        """
+        :param thickness:板厚[mm]の配列
+        :return: 表の範囲内ならTrueの配列
+        """
+        return ~np.isnan(self(np.asarray(thickness, dtype=float)))
+
+
+def _make_allowable(breakpoints_in_inch, values_in_ksi, closed=False):
+    """[inch],[ksi]の表(講義ノートの表の単位)から[mm],[MPa]の表を作る."""
+    return Allowable(inch2mm(np.array(breakpoints_in_inch)), ksi2Mpa(np.array(values_in_ksi, dtype=float)), closed)
+
+
+class Material(object):
+    """材料ごとの許容応力.定義されていないものはNone."""
+
+    __slots__ = ("name", "F_su", "F_cy", "F_tu")
+
+    def __init__(self, name, F_su=None, F_cy=None, F_tu=None):
+        """Constructor.
+
+        :param name:材料名
+        :param F_su:剪断許容応力のAllowable
+        :param F_cy:圧縮降伏応力のAllowable
+        :param F_tu:引張許容応力のAllowable
+        """
+        self.name = name
+        self.F_su = F_su
+        self.F_cy = F_cy
+        self.F_tu = F_tu
+
+
+# web,stiffener(表3)
+SHEET_7075 = Material("7075-T6 sheet",
+                      F_su=_make_allowable([0.011, 0.039, 0.062, 0.187, 0.249],
+                                           [math.nan, 42, 42, 44, 45, math.nan], closed=True),
+                      F_cy=_make_allowable([0.012, 0.040, 0.062, 0.187, 0.249],
+                                           [math.nan, 61, 62, 64, 65, math.nan]))
+# 圧縮側フランジ(p.25の表)
+EXTRUSION_7075 = Material("7075-T6 extrusion",
+                          F_cy=_make_allowable([0.499, 5.000], [68, 69, math.nan]))
+# 引張側フランジ(p.24の表3,cross section 云々は無視)
+EXTRUSION_2024 = Material("2024-T3511 extrusion",
+                          F_tu=_make_allowable([0.249, 0.499, 0.749, 1.499, 2.999, 4.499],
+                                               [57, 60, 60, 65, 70, 70, math.nan]))
+
+
+def main():
+    """Test Function."""
+    thickness = np.array([0.2, 0.5, 1.0, 1.6, 3.2, 6.35, 8, 13, 20, 40, 80, 130])
+    for material in (SHEET_7075, EXTRUSION_7075, EXTRUSION_2024):
+        for name in Material.__slots__[1:]:
+            allowable = getattr(material, name)
+            if allowable is not None:
+                print(material.name, name, np.round(allowable(thickness), 1))
+
+
+if __name__ == '__main__':
+    main()
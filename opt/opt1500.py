@@ -1,14 +1,20 @@
 # -*- coding: utf-8 -*-
 # Author: Hirotaka Kondo
-import os
+import argparse
 import csv
+from functools import partial
 from web import make_web_header
 from stiffener import make_stiffener_header
 from tension_flange import make_tflange_header
 from compression_flange import make_cflange_header
 from rivet_web_stiffener import rivet_ws_make_all_header
 from rivet_web_flange import rivet_wf_make_all_header
-from rib import Rib
+from optimizer import DesignSpace, optimize, print_result
+from kill_stats import load_kill_stats
+from results_sink import ResultsSink
+from result_store import ResultStore
+from design_db import DesignDatabase
+from background_writer import BackgroundWriter
 import numpy as np
 
 """
@@ -33,21 +39,20 @@ STIFFENER_B_LIST2 = np.array([10 + 2 * i for i in range(10)])
 FLANGE_B_LIST2 = np.array([20 + 2 * i for i in range(10)])
 
 
-def init_header():
-    """header 作成"""
+def init_header(sink):
+    """header 作成
+
+    :param sink: ResultsSink
+    """
     # delete
-    directory = 'results/'
-    test = os.listdir(directory)
-    for item in test:
-        if item.endswith(".csv"):
-            os.remove(os.path.join(directory, item))
+    sink.reset()
     # header
-    make_web_header()
-    make_stiffener_header()
-    make_tflange_header()
-    make_cflange_header()
-    rivet_wf_make_all_header()
-    rivet_ws_make_all_header()
+    make_web_header(sink)
+    make_stiffener_header(sink)
+    make_tflange_header(sink)
+    make_cflange_header(sink)
+    rivet_wf_make_all_header(sink)
+    rivet_ws_make_all_header(sink)
 
 
 def mass_csv(mass):
@@ -56,45 +61,73 @@ def mass_csv(mass):
         writer.writerow(mass)
 
 
-def make_sta625():
-    min_mass = 100  # [kg]
-    counter = 0
-    for bf2 in FLANGE_B_LIST2:
-        for bf4 in FLANGE_B_LIST2:
-            for div in DIVISION_LIST:
-                for bs2 in STIFFENER_B_LIST2:
-                    for ft_thickness in FLANGE_THICKNESS_LIST:
-                        for fc_thickness in FLANGE_THICKNESS_LIST:
-                            for bs1 in STIFFENER_B_LIST1:
-                                sta625 = Rib(2)
-                                sta625.add_web(1.60, div)
-                                sta625.add_stiffener(1.80, bs1, bs2)
-                                sta625.add_compression_flange(fc_thickness, 22.5, bf2)
-                                sta625.add_tension_flange(ft_thickness, 22.5, bf4)
-                                sta625.add_rivet_stiffener(3.175)
-                                sta625.add_rivet_flange(3.175, 6, 2)
-                                sta625.set_he()
-                                if (sta625.decide_ms() == True):
-                                    mass = sta625.get_total_mass()  # [kg]
-                                    if mass < min_mass:
-                                        mass_csv([mass])
-                                        counter += 1
-                                        min_mass = mass
-                                        print("counter: {0}\n".format(counter))
-                                        init_header()
-                                        sta625.web_csv()
-                                        sta625.tflange_csv()
-                                        sta625.cflange_csv()
-                                        sta625.stiffener_csv()
-                                        sta625.rivet_stiffener_csv()
-                                        sta625.rivet_flange_csv()
-                                    else:
-                                        counter += 1
-                                        print("counter: {0}\n".format(counter))
-                                else:
-                                    counter += 1
-                                    print("counter: {0}\n".format(counter))
+def write_incumbent(sink, sta625, mass):
+    """暫定解が更新されたときのcsv出力.
+
+    results/のcsvは最後の暫定解だけ残るので,sinkにためておいて最後に1度だけ書き出す.
+    :param sink: ResultsSink
+    :param sta625: Rib instance
+    :param mass: 質量[kg]
+    """
+    mass_csv([mass])
+    init_header(sink)
+    sta625.web_csv(sink)
+    sta625.tflange_csv(sink)
+    sta625.cflange_csv(sink)
+    sta625.stiffener_csv(sink)
+    sta625.rivet_stiffener_csv(sink)
+    sta625.rivet_flange_csv(sink)
+
+
+def make_sta625(time_budget=None, max_evaluations=None, stats_path=None, direct=False, store_path=None, db_path=None,
+                panels=False, joints=False):
+    """候補の中から最軽量の設計を探す.
+
+    :param time_budget: 計算時間の上限[s]
+    :param max_evaluations: 評価回数の上限
+    :param stats_path: M.S.ごとの不成立回数の保存先(前回のsweepで成立しなかった値は暫定解探しで後回しにする)
+    :param direct: Trueならweb厚さ,stiffener,フランジは探索せずM.S.の式から直接決める
+    :param store_path: 評価した全ての候補を書き込むResultStoreのディレクトリ
+    :param db_path: 評価した全ての候補を書き込むDesignDatabaseのファイル(store_pathと同時には使えない)
+    :param panels: Trueならwebとweb hole lossはM.S.が最小のパネルで判定する
+    :param joints: Trueならリベットは候補ごとにjoint_designで成立する最も軽いものにする
+    :return: OptimizeResult
+    """
+    space = DesignSpace(2, 1.60, DIVISION_LIST, 1.80, STIFFENER_B_LIST1, STIFFENER_B_LIST2,
+                        FLANGE_THICKNESS_LIST, 22.5, FLANGE_B_LIST2,
+                        FLANGE_THICKNESS_LIST, 22.5, FLANGE_B_LIST2,
+                        3.175, 3.175, 6, 2)
+    stats = None if stats_path is None else load_kill_stats(stats_path, space.y_index)
+    store = None
+    if store_path is not None:
+        store = BackgroundWriter(ResultStore(store_path))
+    elif db_path is not None:
+        store = BackgroundWriter(DesignDatabase(db_path))
+    try:
+        with ResultsSink() as sink:
+            result = optimize(space, time_budget, max_evaluations, on_improve=partial(write_incumbent, sink),
+                              kill_stats=stats, direct_flanges=direct, direct_web_stiffener=direct, store=store,
+                              panels=panels, direct_joints=joints)
+    finally:
+        if store is not None:
+            store.close()
+    print_result(result)
+    if stats is not None:
+        stats.print_report()
+        stats.save(stats_path)
+    return result
 
 
 if __name__ == '__main__':
-    make_sta625()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--time", type=float, help="計算時間の上限[s]")
+    parser.add_argument("--evals", type=int, help="評価回数の上限")
+    parser.add_argument("--stats", help="M.S.ごとの不成立回数の保存先(json)")
+    parser.add_argument("--direct", action="store_true", help="web厚さ,stiffener,フランジをM.S.の式から直接決める")
+    parser.add_argument("--panels", action="store_true", help="webとweb hole lossを全てのパネルで判定する")
+    parser.add_argument("--joints", action="store_true", help="リベットの鋲径,ピッチ,列数をjoint_designで決める")
+    output = parser.add_mutually_exclusive_group()
+    output.add_argument("--store", help="評価した全ての候補を書き込むディレクトリ(result_store)")
+    output.add_argument("--db", help="評価した全ての候補を書き込むSQLiteのファイル(design_db)")
+    args = parser.parse_args()
+    make_sta625(args.time, args.evals, args.stats, args.direct, args.store, args.db, args.panels, args.joints)
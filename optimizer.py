@@ -0,0 +1,367 @@
+"""Anytime optimizer of rib design."""
+# coding:utf-8
+# Author: Shun Arahata
+import itertools
+import math
+import time
+import numpy as np
+from rib import Rib, DENSITY, MS_NAMES, get_failures
+from feasibility import FeasibilityKernel
+from sizing import size_flanges, size_bay, StiffenerCatalog
+from web import Web
+from stiffener import Stiffener
+from compression_flange import CompressionFlange
+from tension_flange import TensionFlange
+from joint_design import design_joints
+
+# DesignSpaceの候補リストの並び
+DESIGN_VARIABLES = ("web_thickness", "division", "stiffener_thickness", "bs1", "bs2",
+                    "cflange_thickness", "cflange_bottom", "cflange_height",
+                    "tflange_thickness", "tflange_bottom", "tflange_height",
+                    "rivet_stiffener_d", "rivet_flange_d", "pd_ratio", "rivet_n")
+
+
+class DesignSpace(object):
+    """あるSTA区間の設計変数の候補リスト.
+
+    候補の直積が探索空間になる.
+    候補はDESIGN_VARIABLESの順番でself.candidatesに格納する.
+    """
+
+    def __init__(self, y_index, web_thickness, division, stiffener_thickness, bs1, bs2,
+                 cflange_thickness, cflange_bottom, cflange_height,
+                 tflange_thickness, tflange_bottom, tflange_height,
+                 rivet_stiffener_d, rivet_flange_d, pd_ratio, rivet_n):
+        """Constructor.
+
+        :param y_index:リブ左端位置のindex
+        それ以外は各設計変数の候補リスト(スカラーなら固定値).正でない値,1以下のpd_ratioはValueError
+        """
+        self.y_index = y_index
+        values = [web_thickness, division, stiffener_thickness, bs1, bs2,
+                  cflange_thickness, cflange_bottom, cflange_height,
+                  tflange_thickness, tflange_bottom, tflange_height,
+                  rivet_stiffener_d, rivet_flange_d, pd_ratio, rivet_n]
+        self.candidates = [np.atleast_1d(value) for value in values]
+        for name, candidate in zip(DESIGN_VARIABLES, self.candidates):
+            if not np.all(candidate > 0):  # 0や負の寸法はM.S.の計算で0除算などになる
+                raise ValueError("{0} must be positive: {1}".format(name, candidate.tolist()))
+        if not np.all(self.candidates[13] > 1):
+            raise ValueError("pd_ratio must be larger than 1 (p > d): {0}".format(self.candidates[13].tolist()))
+        self.shape = tuple(len(value) for value in self.candidates)
+        self.size = int(np.prod(self.shape))
+
+    def get_values(self, index):
+        """
+        通し番号から設計変数の値を取得.
+        :param index:直積空間の通し番号
+        :return: DESIGN_VARIABLESの順の値のtuple
+        """
+        position = np.unravel_index(index, self.shape)
+        return tuple(candidate[i].item() for candidate, i in zip(self.candidates, position))
+
+    def build_rib(self, index):
+        """
+        通し番号の設計からRibを作る.
+        :param index:直積空間の通し番号
+        :return: set_he済みのRib
+        """
+        (web_t, div, ts, bs1, bs2, ct, cb, ch, tt, tb, th,
+         rivet_stiffener_d, rivet_flange_d, pd_ratio, rivet_n) = self.get_values(index)
+        rib = Rib(self.y_index)
+        rib.add_web(web_t, div)
+        rib.add_stiffener(ts, bs1, bs2)
+        rib.add_compression_flange(ct, cb, ch)
+        rib.add_tension_flange(tt, tb, th)
+        rib.add_rivet_stiffener(rivet_stiffener_d)
+        rib.add_rivet_flange(rivet_flange_d, pd_ratio, rivet_n)
+        rib.set_he()
+        return rib
+
+    def size_flanges_directly(self, target_ms=0):
+        """
+        フランジの候補を,web厚さごとにsizing.size_flangesで求めた断面だけにしたDesignSpaceを作る.
+        フランジのM.S.だけを見て断面積最小の組み合わせを選ぶので,heを通じて効くwebとstiffenerまで含めると
+        最軽量とは限らない(ヒューリスティック).それらのM.S.は探索で確認する.
+        :param target_ms:フランジの目標のM.S.
+        :return: DesignSpace
+        """
+        rib = Rib(self.y_index)
+        cflange_candidates = self.candidates[5:8]
+        tflange_candidates = self.candidates[8:11]
+        sized = [[] for _ in range(6)]
+        for web_t in self.candidates[0].tolist():
+            web = Web(rib.y_left, rib.y_right, self.candidates[1][0], web_t)
+            cflange, tflange, he = size_flanges(rib.hf, rib.mf, web, cflange_candidates, tflange_candidates,
+                                                target_ms)
+            if cflange is None:
+                continue
+            values = (cflange.thickness, cflange.b_bottom, cflange.b_height,
+                      tflange.thickness, tflange.b_bottom, tflange.b_height)
+            for sized_values, value in zip(sized, values):
+                if value not in sized_values:
+                    sized_values.append(value)
+        candidates = list(self.candidates)
+        candidates[5:11] = sized
+        return DesignSpace(self.y_index, *candidates)
+
+    def size_web_stiffener_directly(self, target_ms=0, flanges=False):
+        """
+        web厚さとstiffenerの候補を,分割数ごとに直接求めた最小のものだけにしたDesignSpaceを作る.
+        web,stiffener,フランジはheを通じて互いに依存するので,sizing.size_bayで分割数ごとにまとめて決める.
+        :param target_ms:目標のM.S.
+        :param flanges:Trueならフランジの候補もsize_bayで決めたものだけにする
+        :return: DesignSpace
+        """
+        rib = Rib(self.y_index)
+        catalog = StiffenerCatalog(*self.candidates[2:5])
+        sized = [[] for _ in range(10)]
+        for division in self.candidates[1].tolist():
+            result = size_bay(rib, division, self.candidates[0], catalog, self.candidates[5:8],
+                              self.candidates[8:11], target_ms)
+            if result is None:
+                continue
+            web, stiffener, cflange, tflange = result[:4]
+            values = (web.thickness, stiffener.thickness, stiffener.bs1_bottom, stiffener.bs2_height,
+                      cflange.thickness, cflange.b_bottom, cflange.b_height,
+                      tflange.thickness, tflange.b_bottom, tflange.b_height)
+            for sized_values, value in zip(sized, values):
+                if value not in sized_values:
+                    sized_values.append(value)
+        candidates = list(self.candidates)
+        candidates[0] = sized[0]
+        candidates[2:5] = sized[1:4]
+        if flanges:
+            candidates[5:11] = sized[4:]
+        return DesignSpace(self.y_index, *candidates)
+
+    def fix_joints(self):
+        """
+        リベットの候補を先頭の1つだけにしたDesignSpaceを作る.
+        リベットは質量に含まれないので,探索せずにbuild_ribの後でjoint_design.design_jointsで決めればよい
+        (optimizeのdirect_joints).
+        :return: DesignSpace
+        """
+        candidates = list(self.candidates)
+        candidates[11:15] = [candidate[:1] for candidate in candidates[11:15]]
+        return DesignSpace(self.y_index, *candidates)
+
+    def get_mass_grid(self):
+        """
+        全候補の質量を計算する.
+        質量はM.S.と無関係に寸法だけで決まるので,各部材の体積を
+        部材ごとに計算して足し合わせる(直積を回すより速い)
+        :return: self.shapeの質量[kg]の配列
+        """
+        if self.size == 0:
+            return np.empty(self.shape)
+        rib = Rib(self.y_index)
+        length = rib.width
+        (web_t, div, ts, bs1, bs2, ct, cb, ch, tt, tb, th) = self.candidates[:11]
+        v_web = np.array([Web(rib.y_left, rib.y_right, 1, t).get_volume() for t in web_t])
+        v_stiffener = np.empty((len(div), len(ts), len(bs1), len(bs2)))
+        for i, j, k, l in np.ndindex(v_stiffener.shape):
+            web = Web(rib.y_left, rib.y_right, div[i], web_t[0])
+            v_stiffener[i, j, k, l] = Stiffener(ts[j], bs1[k], bs2[l], web).get_volume()
+        web = Web(rib.y_left, rib.y_right, div[0], web_t[0])
+        v_cflange = np.empty((len(ct), len(cb), len(ch)))
+        for i, j, k in np.ndindex(v_cflange.shape):
+            v_cflange[i, j, k] = CompressionFlange(ct[i], cb[j], ch[k], web).get_volume(length)
+        v_tflange = np.empty((len(tt), len(tb), len(th)))
+        for i, j, k in np.ndindex(v_tflange.shape):
+            v_tflange[i, j, k] = TensionFlange(tt[i], tb[j], th[k], web).get_volume(length)
+        volume = (self._expand(v_web, (0,)) + self._expand(v_stiffener, (1, 2, 3, 4))
+                  + self._expand(v_cflange, (5, 6, 7)) + self._expand(v_tflange, (8, 9, 10)))
+        return np.broadcast_to(volume, self.shape) * DENSITY / 1000  # [kg]
+
+    def _expand(self, array, axes):
+        """axesの軸に沿ったarrayを直積空間の次元に拡張する."""
+        shape = [1] * len(self.shape)
+        for axis in axes:
+            shape[axis] = self.shape[axis]
+        return array.reshape(shape)
+
+
+class OptimizeResult(object):
+    """
+    最適化の結果.
+
+    Attributes:
+        rib:見つかった最軽量の成立するRib(見つからなければNone)
+        mass:そのRibの質量[kg]
+        lower_bound:未評価の候補を含めた最小質量の下界[kg](候補を直接決めて絞ったときはnan)
+        evaluations:M.S.を評価した候補数
+        elapsed:経過時間[s]
+        optimal:最適性が証明されたかどうか
+    """
+
+    def __init__(self, rib, mass, lower_bound, evaluations, elapsed, optimal):
+        self.rib = rib
+        self.mass = mass
+        self.lower_bound = lower_bound
+        self.evaluations = evaluations
+        self.elapsed = elapsed
+        self.optimal = optimal
+
+    def get_gap(self):
+        """
+        暫定解と下界の差.
+        :return: gap[kg],暫定解がなければnan
+        """
+        if self.rib is None:
+            return math.nan
+        return self.mass - self.lower_bound
+
+    def get_relative_gap(self):
+        """暫定解に対するgapの割合."""
+        return self.get_gap() / self.mass
+
+
+def optimize(space, time_budget=None, max_evaluations=None, on_improve=None, kill_stats=None,
+             direct_flanges=False, direct_web_stiffener=False, store=None, panels=False, direct_joints=False):
+    """
+    予算内で最軽量の成立する設計を探す.
+
+    候補は質量の軽い順に並べて評価する(best first).
+    軽い順に評価しているので,未評価の最軽量候補の質量が下界になり,
+    それが暫定解より重くなった時点で最適性が証明される.
+    ただし軽い候補はほとんどM.S.<0なので,それだけだと暫定解がなかなか見つからない.
+    そこで質量順の中で成立/不成立の境目を二分探索する探索(dive)を交互に挟み,
+    早い段階で良い暫定解を見つける.
+    :param space:DesignSpace
+    :param time_budget:計算時間の上限[s] Noneなら無制限
+    :param max_evaluations:評価回数の上限 Noneなら無制限
+    :param on_improve:暫定解が更新されるたびに(rib, mass)で呼ばれる関数
+    :param kill_stats:KillStats 与えると一度も成立しない値のうち,成立しないことが確かめられたものは候補から外し
+    (KillStats.trim),残りはそれを含む候補を暫定解探し(dive)で後回しにし,評価結果を記録する
+    (どちらも下界と最適性はそのまま正しい)
+    記録のために全てのM.S.を計算するので,与えないとき(FeasibilityKernelで打ち切る)より遅い
+    :param direct_flanges:Trueならフランジは候補を探索せずDesignSpace.size_flanges_directlyで決める
+    :param direct_web_stiffener:Trueならweb厚さとstiffenerはDesignSpace.size_web_stiffener_directlyで決める
+    (direct_flangesも与えるとフランジも一緒に決める)
+    direct_*で候補を絞ったときは元の候補に対する最適性を証明できないので,optimalはFalse,lower_boundはnanにする
+    :param store:result_store.ResultStore 与えると評価した全ての候補を書き込む
+    (kill_statsと同じく全てのM.S.を計算するので遅くなる)
+    :param panels:Trueならwebとweb hole lossをM.S.が最小のパネルで判定する(Rib.get_all_ms(panels=True)).
+    direct_web_stiffenerの寸法はSTA最小のパネルで決めるので,足りなければ探索で不成立になる
+    :param direct_joints:Trueならリベットは探索せず,候補ごとにjoint_design.design_jointsで成立する最も軽いものにする
+    (リベットの候補はjoint_designのRIVET_DICT,PD_RATIO_LIST,ROW_COUNT_LIST.見つからなければ不成立で,
+    storeとkill_statsにはそのリベットのM.S.をnanとして記録する)
+    :return: OptimizeResult
+    """
+    start = time.perf_counter()
+    if direct_web_stiffener:
+        space = space.size_web_stiffener_directly(flanges=direct_flanges)
+    elif direct_flanges:
+        space = space.size_flanges_directly()
+    if direct_joints:
+        space = space.fix_joints()
+    if kill_stats is not None:
+        space = kill_stats.trim(space, panels)[0]
+    mass = space.get_mass_grid().ravel()
+    order = np.argsort(mass, kind="stable")
+    if kill_stats is not None:
+        # diveは成立しそうな候補(質量順の何番目か)だけを二分探索する
+        dive_ranks = np.flatnonzero(~kill_stats.get_suspect_mask(space).ravel()[order])
+    else:
+        dive_ranks = np.arange(space.size)
+    kernel = FeasibilityKernel(panels=panels)
+    evaluated = set()
+    best_rib, best_mass = None, math.inf
+    evaluations = 0
+    head = 0  # 質量順でこれより前は評価済み
+    dive_lo, dive_hi = 0, len(dive_ranks) - 1  # dive_ranksの位置
+
+    def out_of_budget():
+        if max_evaluations is not None and evaluations >= max_evaluations:
+            return True
+        return time_budget is not None and time.perf_counter() - start >= time_budget
+
+    for turn in itertools.count():
+        while head < space.size and order[head] in evaluated:
+            head += 1
+        if head == space.size or mass[order[head]] >= best_mass:
+            break
+        if out_of_budget():
+            break
+        dive_lo = max(dive_lo, int(np.searchsorted(dive_ranks, head)))
+        if turn % 2 == 1 and dive_lo <= dive_hi:
+            position = (dive_lo + dive_hi) // 2
+            rank = dive_ranks[position]
+        else:
+            rank = head
+        index = order[rank]
+        rib = space.build_rib(index)
+        missing = design_joints(rib) if direct_joints else []  # 見つからなかったリベットは候補の先頭のまま
+        evaluations += 1
+        evaluated.add(index)
+        if kill_stats is not None or store is not None:
+            ms_list = rib.get_all_ms(panels)
+            for name in missing:  # 仮のリベットのM.S.は記録せず,nan(不成立)にする
+                ms_list[MS_NAMES.index(name)] = math.nan
+                ms_list[MS_NAMES.index(name + " web hole loss")] = math.nan
+            failures = get_failures(ms_list)
+            if kill_stats is not None:
+                kill_stats.record(space.get_values(index), failures)
+            if store is not None:
+                store.append(rib, ms_list, mass[index])
+            feasible = not failures
+        else:
+            feasible = not missing and kernel.is_feasible(rib)
+        if rank != head:
+            if feasible:
+                dive_hi = position - 1
+            else:
+                dive_lo = position + 1
+        if feasible and mass[index] < best_mass:
+            best_rib, best_mass = rib, mass[index]
+            if on_improve is not None:
+                on_improve(rib, best_mass)
+
+    if direct_flanges or direct_web_stiffener or direct_joints:
+        # 絞った候補の中での最適でしかないので,元の候補に対する最適性と下界はわからない
+        optimal = False
+        lower_bound = math.nan
+    elif head == space.size:
+        optimal = True
+        lower_bound = best_mass
+    else:
+        optimal = mass[order[head]] >= best_mass
+        lower_bound = min(best_mass, mass[order[head]])
+    return OptimizeResult(best_rib, best_mass, lower_bound, evaluations,
+                          time.perf_counter() - start, optimal)
+
+
+def print_result(result):
+    """結果の表示."""
+    if result.rib is None:
+        print("no feasible design found ({0} evaluations, {1:.1f} s)".format(result.evaluations, result.elapsed))
+        return
+    if math.isnan(result.lower_bound):
+        print("mass {0:.4f} kg, no lower bound, {1} evaluations, {2:.1f} s".format(
+            result.mass, result.evaluations, result.elapsed))
+        return
+    print("mass {0:.4f} kg, lower bound {1:.4f} kg, gap {2:.2%}, {3} evaluations, {4:.1f} s{5}".format(
+        result.mass, result.lower_bound, result.get_relative_gap(), result.evaluations, result.elapsed,
+        " (optimal)" if result.optimal else ""))
+
+
+def main():
+    """Test Function."""
+    space = DesignSpace(3, 1.60, 5, 1.80, [13 + i for i in range(10)], [10 + 2 * i for i in range(10)],
+                        [4 + i for i in range(5)], 22.5, [14 + 2 * i for i in range(10)],
+                        [4 + i for i in range(5)], 22.5, [14 + 2 * i for i in range(10)],
+                        3.175, 3.175, 6, 2)
+    result = optimize(space, time_budget=30)
+    print_result(result)
+    # 重いフランジでheを稼いでwebを薄くする方が軽くなる例(全探索の最適解は1.0185 kg)
+    space = DesignSpace(4, [0.81, 1.02, 1.27, 1.60, 1.80, 2.03, 2.29], [2, 3, 4, 5, 6], [1.27, 1.60, 1.80, 2.03],
+                        [13 + 2 * i for i in range(5)], [10 + 4 * i for i in range(5)],
+                        [2 + i for i in range(7)], 22.5, [14 + 4 * i for i in range(5)],
+                        [2 + i for i in range(7)], 22.5, [14 + 4 * i for i in range(5)],
+                        3.96875, 3.96875, 6, 2)
+    print_result(optimize(space, direct_flanges=True, direct_web_stiffener=True))
+
+
+if __name__ == '__main__':
+    main()
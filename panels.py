@@ -0,0 +1,144 @@
+"""Analysis of every web panel between stiffeners."""
+# coding:utf-8
+# Author: Shun Arahata
+from collections import namedtuple
+import numpy as np
+from rib import LEFT_ARRAY, SF_LIST
+from geometry import get_hf
+from material import SHEET_7075
+from buckling import get_shear_buckling_k
+
+TIP_STA = 5000  # 翼端のSTA[mm](sandm.HALF_SPAN),剪断力は0
+# 剪断力を線形補間するSTAと値
+LOAD_STA = np.array(LEFT_ARRAY + [TIP_STA], dtype=float)
+LOAD_SF = np.array(SF_LIST + [0], dtype=float)
+
+
+class PanelAnalysis(namedtuple("PanelAnalysis", ["edges", "height", "width", "he", "q_max", "fs", "fscr", "fsu",
+                                                   "ms"])):
+    """
+    stiffenerで区切られたwebのパネルごとの強度計算の結果.
+
+    edgesはパネルの境界(両端を含む)で,それ以外はパネルごとの配列.
+    height:パネルの高さ(両端の大きい方)[mm], width:パネルの幅[mm], he:両端の小さい方[mm],
+    q_max:剪断流(両端の大きい方)[N/m], fs,fscr,fsu:[MPa], ms:M.S.
+    """
+
+    __slots__ = ()
+
+    def get_critical(self):
+        """:return: M.S.が最小のパネルの番号(nanは不成立とみなして優先する)"""
+        return int(np.argmin(np.where(np.isnan(self.ms), -np.inf, self.ms)))
+
+    def get_critical_ms(self):
+        """:return: 最小のM.S."""
+        return self.ms[self.get_critical()].item()
+
+
+def analyze_panels(rib, edges=None):
+    """
+    webの全てのパネルを計算する.
+
+    Web.get_msはSTA最小のパネルだけを,STA最小の高さと荷重で計算するが,
+    ここではパネルの両端の前桁高さ,he,剪断流を求めてパネルごとに危ない方の値で計算する.
+    フランジの図心はbayの中で一定なので he = hf - (Rib.hf - Rib.he) とする.
+    :param rib:webとフランジを追加してset_he済みのRib
+    :param edges:stiffenerの位置(両端を含む,昇順)[mm] Noneならweb.divisionで等分
+    :return: PanelAnalysis
+    """
+    web = rib.web
+    if edges is None:
+        edges = web.y_left + web.width_b * np.arange(web.division + 1)  # np.linspaceより速い
+    edges = np.asarray(edges, dtype=float)
+    hf = get_hf(edges)
+    he = hf - (rib.hf - rib.he)
+    sf = np.interp(edges, LOAD_STA, LOAD_SF)
+    q = sf / he * 1000  # Web.get_qmaxと同じ[N/m]
+    q_max = np.maximum(q[:-1], q[1:])
+    height = np.maximum(hf[:-1], hf[1:])
+    width = np.diff(edges)
+    fs = q_max / web.thickness * 1000 / (10 ** 6)  # Web.get_shear_forceと同じ[MPa]
+    fscr = get_shear_buckling_k(height / width) * web.E * (web.thickness / width) ** 2
+    fsu = np.full_like(fs, SHEET_7075.F_su(web.thickness))
+    ms = np.minimum(fsu, fscr) / fs - 1
+    return PanelAnalysis(edges, height, width, np.minimum(he[:-1], he[1:]), q_max, fs, fscr, fsu, ms)
+
+
+def get_critical_stress(rib):
+    """
+    M.S.が最小のパネルのf_sとmin(F_su, F_scr).
+    web hole lossのf_sjはf_sのp/(p-d)倍なので,hole lossもこのパネルで決まる.
+    :param rib:webとフランジを追加してset_he済みのRib
+    :return: (f_s[MPa], min(F_su, F_scr)[MPa])
+    """
+    analysis = analyze_panels(rib)
+    i = analysis.get_critical()
+    return analysis.fs[i].item(), min(analysis.fsu[i], analysis.fscr[i]).item()
+
+
+def get_critical_ms(rib):
+    """
+    webとweb hole lossのM.S.をM.S.が最小のパネルで計算する(Rib.get_all_ms(panels=True)).
+    :param rib:全ての部品を追加してset_he済みのRib
+    :return: (web, rivet stiffener web hole loss, rivet flange web hole loss)のM.S.
+    """
+    fs, allowable = get_critical_stress(rib)
+    hole_loss = tuple(allowable / (fs * rivet.rivet_pitch / (rivet.rivet_pitch - rivet.D)) - 1
+                      for rivet in (rib.rivet_stiffener, rib.rivet_flange))
+    return (allowable / fs - 1,) + hole_loss
+
+
+def main():
+    """Test Function."""
+    from rib import Rib
+    sta = Rib(3)
+    sta.add_web(1.27, 5)
+    sta.add_stiffener(1.8, 17, 17)
+    sta.add_compression_flange(4, 18, 17)
+    sta.add_tension_flange(5, 23, 25)
+    sta.set_he()
+    analysis = analyze_panels(sta)
+    print("Web.get_ms", sta.web.get_ms(sta.sf, sta.he))
+    print("panel ms", np.round(analysis.ms, 4), "critical", analysis.get_critical())
+    import timeit
+    print("{0:.1f} us".format(timeit.timeit(lambda: analyze_panels(sta), number=1000) * 1000))
+    check_outboard_critical()
+
+
+def check_outboard_critical():
+    """
+    前桁高さがbayの右端で急に低くなると,右端のパネルで決まることを確かめる.
+    STA最小のパネルだけ見るRib.get_all_ms()は成立,全てのパネルを見るget_all_ms(panels=True)と
+    FeasibilityKernel(panels=True)はweb hole lossで不成立になる.
+    """
+    import geometry
+    from rib import Rib, get_failures
+    from feasibility import FeasibilityKernel
+    previous = geometry.get_profile()
+    geometry.set_profile(geometry.make_profile({"type": "tabulated", "sta": [625, 2000, 2400, 2500, 5000],
+                                                "height": [320, 260, 255, 150, 130]}))
+    try:
+        sta = Rib(3)
+        sta.add_web(1.6, 5)
+        sta.add_stiffener(1.8, 17, 17)
+        sta.add_compression_flange(4, 18, 17)
+        sta.add_tension_flange(5, 23, 25)
+        sta.add_rivet_stiffener(3.96875)
+        sta.add_rivet_flange(3.96875, 6, 1)
+        sta.set_he()
+        analysis = analyze_panels(sta)
+        ms_list = sta.get_all_ms()
+        panel_ms_list = sta.get_all_ms(panels=True)
+        print("outboard kink: panel ms", np.round(analysis.ms, 4), "critical", analysis.get_critical())
+        print("  failures", get_failures(ms_list), "-> with panels", get_failures(panel_ms_list))
+        assert analysis.get_critical() == len(analysis.ms) - 1
+        assert panel_ms_list[0] == analysis.get_critical_ms() < ms_list[0]
+        assert not get_failures(ms_list) and FeasibilityKernel().is_feasible(sta)
+        assert get_failures(panel_ms_list) == ["rivet stiffener web hole loss", "rivet flange web hole loss"]
+        assert not FeasibilityKernel(panels=True).is_feasible(sta)
+    finally:
+        geometry.set_profile(previous)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+"""Columnar binary store of every evaluated design."""
+# coding:utf-8
+# Author: Shun Arahata
+import ast
+import os
+import numpy as np
+from rib import MS_NAMES
+from design_record import RECORD_DTYPE, get_design_values
+
+# M.S.の列の名前(MS_NAMESの順)
+MS_COLUMNS = tuple("ms_" + name.replace(" ", "_") for name in MS_NAMES)
+# 1評価あたり1行.設計変数はDesignRecordsと同じ型
+STORE_DTYPE = np.dtype(RECORD_DTYPE.descr[:-2] + [(name, np.float64) for name in MS_COLUMNS]
+                       + [("he", np.float64), ("mass", np.float64)])
+BLOCK_SIZE = 65536  # この行数たまるごとにファイルに追記する
+NPY_MAGIC = b"\x93NUMPY\x01\x00"
+HEADER_SIZE = 128  # .npyのheaderの長さ(行数が増えても書き直せるように固定)
+
+
+def _make_header(dtype, count):
+    """
+    長さHEADER_SIZEの.npy(version 1.0)のheader.
+    :param dtype:列のdtype
+    :param count:行数
+    """
+    header = "{{'descr': {0!r}, 'fortran_order': False, 'shape': ({1},), }}".format(dtype.str, count)
+    length = HEADER_SIZE - len(NPY_MAGIC) - 2
+    header = header.ljust(length - 1) + "\n"
+    return NPY_MAGIC + length.to_bytes(2, "little") + header.encode("latin1")
+
+
+def _read_count(path, dtype):
+    """既存の列のファイルの行数(headerとファイルの大きさが食い違えば壊れているのでValueError)."""
+    with open(path, "rb") as f:
+        head = f.read(HEADER_SIZE)
+    if len(head) != HEADER_SIZE or not head.startswith(NPY_MAGIC):
+        raise ValueError("{0} is not a column of ResultStore".format(path))
+    header = ast.literal_eval(head[len(NPY_MAGIC) + 2:].decode("latin1"))
+    count = header["shape"][0]
+    if np.dtype(header["descr"]) != dtype or os.path.getsize(path) != HEADER_SIZE + count * dtype.itemsize:
+        raise ValueError("{0} does not match STORE_DTYPE".format(path))
+    return count
+
+
+class ResultStore(object):
+    """
+    評価した全ての候補の設計変数,8つのM.S.,he,質量を列ごとの.npyに追記するもの.
+
+    行はBLOCK_SIZEごとにまとめて各列のファイルの末尾に書き,headerの行数を書き直す.
+    どの列も普通の.npyなのでopen_storeでmemory mapして読めば,RAMに載らない量でも扱える.
+    同じディレクトリを開き直せば続きに追記する(y_indexの列でSTA区間を区別する).
+    with文で使えば抜けるときに書き出す.
+    """
+
+    def __init__(self, directory, block_size=BLOCK_SIZE):
+        """Constructor.
+
+        :param directory:列のファイルを置くディレクトリ(なければ作る)
+        :param block_size:まとめて書き出す行数
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        counts = set()
+        for name in STORE_DTYPE.names:
+            path = self._get_path(name)
+            if os.path.exists(path):
+                counts.add(_read_count(path, STORE_DTYPE[name]))
+            else:
+                with open(path, "wb") as f:
+                    f.write(_make_header(STORE_DTYPE[name], 0))
+                counts.add(0)
+        if len(counts) != 1:
+            raise ValueError("columns in {0} have different lengths".format(directory))
+        self.count = counts.pop()  # ファイルに書いた行数
+        self._block = np.zeros(block_size, dtype=STORE_DTYPE)
+        self._pending = 0  # _blockにためている行数
+
+    def __len__(self):
+        return self.count + self._pending
+
+    def _get_path(self, name):
+        return os.path.join(self.directory, name + ".npy")
+
+    def append(self, rib, ms_list, mass):
+        """
+        評価した候補を1行追加する.
+        :param rib:全ての部品を追加してset_he済みのRib
+        :param ms_list:rib.get_all_ms()
+        :param mass:質量[kg]
+        """
+        self._block[self._pending] = (rib.y_index,) + get_design_values(rib) + tuple(ms_list) + (rib.he, mass)
+        self._pending += 1
+        if self._pending == len(self._block):
+            self.flush()
+
+    def flush(self):
+        """ためている行を各列のファイルの末尾に書き,headerの行数を更新する."""
+        if self._pending == 0:
+            return
+        count = self.count + self._pending
+        for name in STORE_DTYPE.names:
+            column = self._block[name][:self._pending]
+            with open(self._get_path(name), "r+b") as f:
+                f.seek(0, os.SEEK_END)
+                f.write(np.ascontiguousarray(column).tobytes())
+                f.seek(0)
+                f.write(_make_header(column.dtype, count))
+        self.count = count
+        self._pending = 0
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+
+def open_store(directory):
+    """
+    ResultStoreの列をmemory mapして開く(読み込み専用).
+    :param directory:ResultStoreのディレクトリ
+    :return: 列の名前 -> np.memmap の辞書
+    """
+    columns = {name: np.load(os.path.join(directory, name + ".npy"), mmap_mode="r") for name in STORE_DTYPE.names}
+    if len({len(column) for column in columns.values()}) != 1:
+        raise ValueError("columns in {0} have different lengths".format(directory))
+    return columns
+
+
+def get_feasible_mask(columns, start=0, stop=None):
+    """
+    rib.get_failuresと同じ判定(stiffenerのnanは成立とみなす)をstart:stopの行についてまとめて行う.
+    大きいstoreは範囲を区切って呼べばその分しか読まない.
+    :param columns:open_storeの返り値
+    :return: 成立ならTrueのbool配列
+    """
+    feasible = None
+    for name in MS_COLUMNS:
+        ms = np.asarray(columns[name][start:stop])
+        ok = ms >= 0
+        if name == "ms_stiffener":
+            ok |= np.isnan(ms)
+        feasible = ok if feasible is None else feasible & ok
+    return feasible
+
+
+def main():
+    """Test Function."""
+    import tempfile
+    import time
+    from optimizer import DesignSpace, optimize, print_result
+    space = DesignSpace(3, 1.60, 5, 1.80, [13 + i for i in range(10)], [10 + 2 * i for i in range(10)],
+                        [4 + i for i in range(5)], 22.5, [14 + 2 * i for i in range(10)],
+                        [4 + i for i in range(5)], 22.5, [14 + 2 * i for i in range(10)],
+                        3.175, 3.175, 6, 2)
+    directory = tempfile.mkdtemp()
+    start = time.perf_counter()
+    with ResultStore(directory) as store:
+        print_result(optimize(space, store=store))
+    print("{0} rows, {1:.1f} s".format(len(store), time.perf_counter() - start))
+    columns = open_store(directory)
+    feasible = get_feasible_mask(columns)
+    mass = np.where(feasible, columns["mass"], np.inf)
+    print("feasible", int(feasible.sum()), "lightest {0:.4f} kg".format(mass.min()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""Buffered csv output of the results tables."""
+# coding:utf-8
+# Author: Shun Arahata
+import csv
+import os
+from unit_convert import round_sig
+
+RESULTS_DIRECTORY = 'results/'
+
+
+def format_row(row, rounded):
+    """
+    :param row:値のlist
+    :param rounded:Trueなら全ての値を有効数字3桁にする.
+        列ごとの有効数字のlistなら列ごとにround_sigする(Noneの列はそのまま).
+    :return: 書き出す値のlist
+    """
+    if rounded is True:
+        return [round_sig(x) for x in row]
+    if rounded:
+        return [x if sig is None else round_sig(x, sig) for x, sig in zip(row, rounded)]
+    return row
+
+
+def write_row(sink, table, row, rounded=False):
+    """
+    表に1行書く.
+    sinkがNoneなら今まで通りその場でresults/のcsvに追記する.
+    :param sink:ResultsSinkまたはNone
+    :param table:csvのファイル名(例えば'web.csv')
+    :param row:値のlist
+    :param rounded:Trueなら書き出すときに全ての値をround_sigする(format_row)
+    """
+    if sink is not None:
+        sink.writerow(table, row, rounded)
+        return
+    with open(os.path.join(RESULTS_DIRECTORY, table), 'a', encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(format_row(row, rounded))
+
+
+class ResultsSink(object):
+    """
+    results/のcsvをまとめて書き出すもの.
+
+    表(csvファイル)ごとにファイルを1度だけ開いて開いたままにし,
+    行は値のままためておいてflushのときにまとめてround_sigしてwriterowsする.
+    with文で使えば抜けるときにflushしてファイルを閉じる.
+    """
+
+    def __init__(self, directory=RESULTS_DIRECTORY, encoding="utf-8"):
+        """Constructor.
+
+        :param directory:csvを置くディレクトリ
+        :param encoding:csvの文字コード
+        """
+        self.directory = directory
+        self.encoding = encoding
+        self._files = {}  # 表の名前 -> 開いているファイル
+        self._pending = {}  # 表の名前 -> まだ書いていない(row, rounded)のlist
+
+    def writerow(self, table, row, rounded=False):
+        """
+        :param table:csvのファイル名
+        :param row:値のlist(書き出すまで変更しないこと)
+        :param rounded:Trueなら書き出すときに全ての値をround_sigする(format_row)
+        """
+        self._pending.setdefault(table, []).append((row, rounded))
+
+    def reset(self, tables=None):
+        """
+        ディレクトリのcsvを全て消したのと同じにする(ためている行も捨てる).
+        開いているファイルは閉じずに空にする.
+        :param tables:与えるとその表(csvのファイル名のlist)だけを消す
+        """
+        if tables is None:
+            tables = [item for item in os.listdir(self.directory) if item.endswith(".csv")] + list(self._files)
+        for table in tables:
+            self._pending.pop(table, None)
+            f = self._files.get(table)
+            if f is not None:
+                f.seek(0)
+                f.truncate()
+            elif os.path.exists(os.path.join(self.directory, table)):
+                os.remove(os.path.join(self.directory, table))
+
+    def _open(self, table):
+        f = self._files.get(table)
+        if f is None:
+            f = open(os.path.join(self.directory, table), 'a', encoding=self.encoding)
+            self._files[table] = f
+        return f
+
+    def flush(self):
+        """ためている行を全て書き出す."""
+        for table, rows in self._pending.items():
+            if not rows:
+                continue
+            writer = csv.writer(self._open(table))
+            writer.writerows([format_row(row, rounded) for row, rounded in rows])
+            self._files[table].flush()
+        self._pending.clear()
+
+    def close(self):
+        """書き出してファイルを閉じる."""
+        self.flush()
+        for f in self._files.values():
+            f.close()
+        self._files.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+
+class RowCollector(object):
+    """
+    sinkに渡された行を覚えておくだけのもの(process poolの中で使う).
+
+    行はround_sigしたものを覚えるので,replayで本物のsinkに渡すときには丸め直さない.
+    """
+
+    def __init__(self):
+        self.rows = []  # (表の名前, 書き出す値のlist)のlist
+
+    def writerow(self, table, row, rounded=False):
+        self.rows.append((table, format_row(row, rounded)))
+
+    def replay(self, sink):
+        """
+        覚えた行を順番にsinkに書く.
+        :param sink:ResultsSinkまたはNone
+        """
+        for table, row in self.rows:
+            write_row(sink, table, row)
@@ -7,8 +7,8 @@ from compression_flange import CompressionFlange
 from tension_flange import TensionFlange
 from rivet_web_flange import RivetWebFlange
 from rivet_web_stiffener import RivetWebStiffener
-from unit_convert import get_hf, round_sig
-import csv
+from unit_convert import get_hf
+from results_sink import write_row
 import math
 
 # from sandm import get_sf, get_mf
@@ -19,6 +19,14 @@ LEFT_ARRAY = [625, 1000, 1500, 2000, 2500, 3000, 3500, 4000, 4500]
 RIB_WIDTH = [375, 500, 500, 500, 500, 500, 500, 500, 500]
 SF_LIST = [38540, 35357, 29988, 24251, 18745, 13756, 9233, 5262, 1952]  # だれか全部追加して
 MF_LIST = [74012, 60233, 44117, 30306, 19505, 11503, 5757, 2151, 389]  # だれか全部追加して
+DENSITY = 3.0  # 密度[g/cm^3]
+STIFFENER_RIVET_RATIO = 4  # stiffenerリベットに必要な bs1,bf2 の D に対する比
+FLANGE_RIVET_RATIO = {1: 2 + 2, 2: 2 + 3 + 2}  # 列数ごとのフランジリベットに必要な bf1/D (縁距離+千鳥間隔)
+# rib.csvの列ごとの有効数字(質量だけround_sigする)
+RIB_ROW_SIG = (None,) * 17 + (3,)
+# Rib.get_all_msで計算するM.S.の名前
+MS_NAMES = ("web", "stiffener", "cflange", "tflange", "rivet stiffener", "rivet stiffener web hole loss",
+            "rivet flange", "rivet flange web hole loss")
 
 
 class Rib(object):
@@ -26,7 +34,7 @@ class Rib(object):
 
     分割数からのスティフナー間隔の計算やheの計算を主に受け持つ
     キーワード変数によるコンストラクタ
-    csv のwriterオブジェクトを受け取るものを追加する
+    csv出力はResultsSinkを受け取る(Noneならその場でresults/に追記する)
 
     Attributes:
         y_left:リブ左端座標
@@ -36,11 +44,15 @@ class Rib(object):
 
     """
 
+    __slots__ = ("y_index", "y_left", "width", "y_right", "hf", "sf", "mf", "web", "stiffener", "cflange", "tflange",
+                 "rivet_stiffener", "rivet_flange", "he")
+
     def __init__(self, y_index):
         """Constructor.
 
         :param y_index:リブ左端位置のindex
         """
+        self.y_index = y_index
         self.y_left = LEFT_ARRAY[y_index]
         self.width = RIB_WIDTH[y_index]
         self.y_right = self.y_left + self.width
@@ -98,25 +110,35 @@ class Rib(object):
 
     def could_be_hit(self):
         """リベットを打てるかどうか.printによる警告"""
-        if self.stiffener.bs1_bottom < 4 * self.rivet_stiffener.D:
-            print("ERROR Rivet: stiffener bs1 too small")
+        for message in self.get_rivet_warnings():
+            print(message)
+
+    def get_rivet_warnings(self):
+        """
+        リベットを打てるかどうか(printはしない).
+        :return: 警告の文字列のlist
+        """
+        warnings = []
+        if math.isnan(self.rivet_stiffener.rivet_pitch):
+            warnings.append("web stiffener rivet error")
 
-        if self.cflange.b_height < 4 * self.rivet_stiffener.D:
-            print("WARING Rivet: cflange height bf2 may be too small")
+        if self.stiffener.bs1_bottom < STIFFENER_RIVET_RATIO * self.rivet_stiffener.D:
+            warnings.append("ERROR Rivet: stiffener bs1 too small")
 
-        if self.tflange.b_height < 4 * self.rivet_stiffener.D:
-            print("WARING Rivet: tflange height bf2 may be too small")
+        if self.cflange.b_height < STIFFENER_RIVET_RATIO * self.rivet_stiffener.D:
+            warnings.append("WARING Rivet: cflange height bf2 may be too small")
 
-        if self.rivet_flange.N == 2:
-            ratio = 2+3+2 # 縁距離+千鳥間隔
-        elif self.rivet_flange.N == 1:
-            ratio = 2+2
+        if self.tflange.b_height < STIFFENER_RIVET_RATIO * self.rivet_stiffener.D:
+            warnings.append("WARING Rivet: tflange height bf2 may be too small")
+
+        ratio = FLANGE_RIVET_RATIO[self.rivet_flange.N]
 
         if self.tflange.b_bottom < ratio * self.rivet_flange.D + self.tflange.thickness/2:
-            print("WARING Rivet: tflange bottom bf1 may be too small")
+            warnings.append("WARING Rivet: tflange bottom bf1 may be too small")
 
         if self.cflange.b_bottom < ratio * self.rivet_flange.D + self.cflange.thickness/2:
-            print("WARING Rivet: cflange bottom bf1 may be too small")
+            warnings.append("WARING Rivet: cflange bottom bf1 may be too small")
+        return warnings
 
     def get_total_mass(self):
         """
@@ -129,93 +151,147 @@ class Rib(object):
         v3 = self.cflange.get_volume(length_rib2rib)
         v4 = self.tflange.get_volume(length_rib2rib)
         # print(v1, v2, v3, v4)
-        return (v1 + v2 + v3 + v4) * 3.0 / 1000  # {kg]
+        return (v1 + v2 + v3 + v4) * DENSITY / 1000  # {kg]
+
+    def get_all_ms(self, panels=False):
+        """
+        全てのM.S.を計算する.
+        :param panels:Trueならwebと2つのweb hole lossはSTA最小のパネルではなく,
+            全てのパネルのうちM.S.が最小のもので計算する(panels.get_critical_ms)
+        :return: MS_NAMESの順のM.S.のlist
+        """
+        if panels:
+            from panels import get_critical_ms  # panelsはribを読み込むのでここで読む
+            web_ms, stiffener_hole_ms, flange_hole_ms = get_critical_ms(self)
+            return [web_ms,
+                    self.stiffener.get_ms(self.he),
+                    self.cflange.get_ms(self.mf, self.he),
+                    self.tflange.get_ms(self.mf, self.he),
+                    self.rivet_stiffener.get_ms(),
+                    stiffener_hole_ms,
+                    self.rivet_flange.get_ms(self.sf, self.he),
+                    flange_hole_ms]
+        return [self.web.get_ms(self.sf, self.he),
+                self.stiffener.get_ms(self.he),
+                self.cflange.get_ms(self.mf, self.he),
+                self.tflange.get_ms(self.mf, self.he),
+                self.rivet_stiffener.get_ms(),
+                self.rivet_stiffener.get_web_hole_loss(self.sf, self.he),
+                self.rivet_flange.get_ms(self.sf, self.he),
+                self.rivet_flange.get_web_hole_loss(self.sf, self.he)]
 
     def decide_ms(self):
         """
         全てのM.S.を計算して,それが全て正ならTrueを返す
         :return:
         """
-        ms1 = self.web.get_ms(self.sf, self.he)
-        if ms1 < 0:
-            print("Error :web ms")
-        ms2 = self.stiffener.get_ms(self.he)
-        if ms2 < 0:
-            print("Error :stiffener ms")
-        ms3 = self.cflange.get_ms(self.mf, self.he)
-        if ms3 < 0:
-            print("Error :cflange ms")
-        ms4 = self.tflange.get_ms(self.mf, self.he)
-        if ms4 < 0:
-            print("Error :tflange ms")
-        ms5 = self.rivet_stiffener.get_ms()
-        if ms5 < 0:
-            print("Error :rivet stiffener ms")
-        ms6 = self.rivet_stiffener.get_web_hole_loss(self.sf, self.he)
-        if ms6 < 0:
-            print("Error :rivet stiffener web hole loss ms")
-        ms7 = self.rivet_flange.get_ms(self.sf, self.he)
-        if ms7 < 0:
-            print("Error :rivet flange ms")
-        ms8 = self.rivet_flange.get_web_hole_loss(self.sf, self.he)
-        if ms8 < 0:
-            print("Error :rivet flange web hole loss ms")
-        # print(ms1, ms2, ms3, ms4, ms5, ms6, ms7, ms8)
-        if (math.isnan(ms2)):  # ms2==nanは,stiffenerがそもそもないときに起こる場合がほとんどなので...
-            if ms1 >= 0 and ms3 >= 0 and ms4 >= 0 and ms5 >= 0 and ms6 >= 0 and ms7 >= 0 and ms8 >= 0:
-                return True
-        elif ms1 >= 0 and ms2 >= 0 and ms3 >= 0 and ms4 >= 0 and ms5 >= 0 and ms6 >= 0 and ms7 >= 0 and ms8 >= 0:
-            return True
-        else:
-            print("WARNING: MS<0")
-            return False
-
-
-    def web_csv(self):
+        ms_list = self.get_all_ms()
+        for message in get_ms_messages(ms_list):
+            print(message)
+        # print(ms_list)
+        return not get_failures(ms_list)
+
+    def web_csv(self, sink=None):
         """
         Csv output.
+        :param sink:ResultsSink
         """
         self.could_be_hit()
         self.set_he()
-        self.web.make_row(self.sf, self.he)
+        self.web.make_row(self.sf, self.he, sink)
+
+    def stiffener_csv(self, sink=None):
+        self.stiffener.make_row(self.he, sink)
 
-    def stiffener_csv(self):
-        self.stiffener.make_row(self.he)
+    def cflange_csv(self, sink=None):
+        self.cflange.make_row(self.mf, self.he, sink)
 
-    def cflange_csv(self):
-        self.cflange.make_row(self.mf, self.he)
+    def tflange_csv(self, sink=None):
+        self.tflange.make_row(self.mf, self.he, sink)
 
-    def tflange_csv(self):
-        self.tflange.make_row(self.mf, self.he)
+    def rivet_stiffener_csv(self, sink=None):
+        self.rivet_stiffener.write_all_row(self.sf, self.he, sink)
 
-    def rivet_stiffener_csv(self):
-        self.rivet_stiffener.write_all_row(self.sf, self.he)
+    def rivet_flange_csv(self, sink=None):
+        self.rivet_flange.write_all_row(self.sf, self.he, sink)
 
-    def rivet_flange_csv(self):
-        self.rivet_flange.write_all_row(self.sf, self.he)
+    def write_rib_row(self, sink=None):
+        """
+        表の中身.
+        :param sink:ResultsSink
+        """
+        write_row(sink, *self.get_rib_row())
 
-    def write_rib_row(self):
-        """表の中身."""
+    def get_rib_row(self):
+        """
+        表の中身(ファイルには書かない).
+        :return: (表の名前, 値のlist, rounded)
+        """
         value = [self.y_left, self.y_right, self.web.thickness, self.web.division,
                  self.stiffener.thickness, self.stiffener.bs1_bottom, self.stiffener.bs2_height,
                  self.cflange.thickness, self.cflange.b_bottom, self.cflange.b_height,
                  self.tflange.thickness, self.tflange.b_bottom, self.tflange.b_height,
                  self.rivet_stiffener.D, self.rivet_flange.D, self.rivet_flange.pd_ratio,
-                 self.rivet_flange.N, round_sig(self.get_total_mass())]
-        with open('results/rib.csv', 'a', encoding="utf-8") as f:
-            writer = csv.writer(f)
-            writer.writerow(value)
+                 self.rivet_flange.N, self.get_total_mass()]
+        return 'rib.csv', value, RIB_ROW_SIG
+
+    def get_rows(self):
+        """
+        main.pyで各csvに書く行を全て計算する(ファイルには書かない.set_he済みであること).
+        :return: (表の名前, 値のlist, rounded)のlist
+        """
+        return ([self.web.get_row(self.sf, self.he),
+                 self.tflange.get_row(self.mf, self.he),
+                 self.cflange.get_row(self.mf, self.he),
+                 self.stiffener.get_row(self.he)]
+                + self.rivet_stiffener.get_rows(self.sf, self.he)
+                + self.rivet_flange.get_rows(self.sf, self.he)
+                + [self.get_rib_row()])
+
+
+def get_failures(ms_list):
+    """
+    成立していないM.S.の名前を返す.
+    stiffenerのM.S.がnanになるのはstiffenerがそもそもないときがほとんどなので成立とみなす
+    :param ms_list: Rib.get_all_msの返り値
+    :return: M.S.<0(またはnan)の項目のMS_NAMESのlist
+    """
+    failures = []
+    for name, ms in zip(MS_NAMES, ms_list):
+        if name == "stiffener" and math.isnan(ms):
+            continue
+        if not ms >= 0:
+            failures.append(name)
+    return failures
 
 
-def make_rib_header():
-    """リブに囲まれたSTA区間の諸元についての表のheaderを作成する."""
+def get_ms_messages(ms_list):
+    """
+    decide_msで表示するM.S.の確認の文字列.
+    :param ms_list: Rib.get_all_msの返り値
+    :return: 文字列のlist
+    """
+    messages = []
+    for name, ms in zip(MS_NAMES, ms_list):
+        if ms < 0:
+            messages.append("Error :{0} ms".format(name))
+        elif math.isnan(ms) and name != "stiffener":
+            messages.append("Error :{0} ms is nan".format(name))
+    if get_failures(ms_list) and not math.isnan(ms_list[1]):
+        messages.append("WARNING: MS<0")
+    return messages
+
+
+def make_rib_header(sink=None):
+    """
+    リブに囲まれたSTA区間の諸元についての表のheaderを作成する.
+    :param sink:ResultsSink
+    """
     header = ["左端STA[mm]", "右端STA[mm]", "ウェブ厚さ", "分割数", "stiffener厚さts", "同bs1", "同bs2",
               "上(圧縮側)フランジ$t_f$", "bf1", "bf2", "下(引張側)フランジ$t_f$", "bf1", "bf2",
               "Rivet(stiffener) D", "Rivet(flange) D",
               "同P/D", "同列数", "質量"]
-    with open('results/rib.csv', 'a', encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow(header)
+    write_row(sink, 'rib.csv', header)
 
 
 def main():
@@ -3,18 +3,21 @@
 # Author: Shun Arahata
 import numpy as np
 from unit_convert import ksi2Mpa
+from flyweight import Frozen
 
 
-class Rivet(object):
+class Rivet(Frozen):
     """ Rivet Base Class."""
 
+    __slots__ = ("D",)
+    F_su = ksi2Mpa(30)  # とりあえずAD鋲を仮定
+
     def __init__(self, D):
         """Constructor.
 
         :param D:リベットの鋲径(直径mm)
         """
         self.D = D
-        self.F_su = ksi2Mpa(30)  # とりあえずAD鋲を仮定
 
     """
     def getAD8(self,thickness):
@@ -2,15 +2,23 @@
 # coding:utf-8
 # Author: Shun Arahata,Hirotaka Kondo
 
-import csv
-from unit_convert import ksi2Mpa, round_sig
+from results_sink import write_row
+from unit_convert import ksi2Mpa
 from rivet import Rivet
 from web import Web
 
+RIVET_F_SU = ksi2Mpa(30)  # AD鋲のF_su[MPa]
+# csvの列ごとの有効数字(Noneはそのまま)
+SHEAR_ROW_SIG = (None,) * 5 + (4, None, None, 3)
+WEB_HOLE_ROW_SIG = (None,) * 3 + (3,) * 6
+
 
 class RivetWebFlange(Rivet):
     """ウェブフランジ結合のリベット."""
 
+    __slots__ = ("pd_ratio", "rivet_pitch", "N", "web")
+    F_su = RIVET_F_SU  # AD
+
     def __init__(self, D, pd_ratio, N, web):
         """Constructor.
 
@@ -20,7 +28,6 @@ class RivetWebFlange(Rivet):
         :param web:リベットによってフランジと結合されるwebのクラス
         """
         super().__init__(D)
-        self.F_su = ksi2Mpa(30)  # AD
         self.pd_ratio = pd_ratio
         self.rivet_pitch = D * pd_ratio
         self.N = N
@@ -64,76 +71,93 @@ class RivetWebFlange(Rivet):
         ms = self.web.get_web_hole_loss_ms(self.rivet_pitch, self.D, sf, he)
         return ms
 
-    def make_row_shear(self, writer, sf, he):
+    def make_row_shear(self, sink, sf, he):
         """
         Make CSV Row for shear.
-        :param writer:csv.writer()で取得されるもの
+        :param sink:ResultsSink(Noneならその場でcsvに追記する)
         :param sf:前桁の分担荷重[N]
         :param he:桁フランジ断面重心距離[mm]
         """
+        write_row(sink, *self.get_row_shear(sf, he))
+
+    def get_row_shear(self, sf, he):
+        """
+        shearの表の1行(ファイルには書かない).
+        :param sf:前桁の分担荷重[N]
+        :param he:桁フランジ断面重心距離[mm]
+        :return: (表の名前, 値のlist, rounded)
+        """
         p_allow = self.get_p_allow()
         ps = self.get_shear_force(sf, he)
         ms = self.get_ms(sf, he)
         value = [self.web.y_left, self.web.y_right, int(sf / he * 1000), self.N, self.D,
-                 round_sig(self.rivet_pitch, sig = 4), int(ps), int(p_allow), round_sig(ms)]
-        writer.writerow(value)
+                 self.rivet_pitch, int(ps), int(p_allow), ms]
+        return 'rivet_web_flange_shear.csv', value, SHEAR_ROW_SIG
 
-    def make_row_web_hole(self, writer, sf, he):
+    def make_row_web_hole(self, sink, sf, he):
         """
         Make CSV Row for web hole loss.
-        :param writer:
+        :param sink:ResultsSink(Noneならその場でcsvに追記する)
         :param sf: 前桁の分担荷重[N]
         :param he: 桁フランジ断面重心距離[mm]
         :return:
         """
+        write_row(sink, *self.get_row_web_hole(sf, he))
+
+    def get_row_web_hole(self, sf, he):
+        """
+        web hole lossの表の1行(ファイルには書かない).
+        :param sf: 前桁の分担荷重[N]
+        :param he: 桁フランジ断面重心距離[mm]
+        :return: (表の名前, 値のlist, rounded)
+        """
         fs = self.web.get_shear_force(sf, he)
         fsj = self.web.get_fsj(self.rivet_pitch, self.D, sf, he)
         fsu = self.web.get_fsu()
         ms = self.web.get_web_hole_loss_ms(self.rivet_pitch, self.D, sf, he)
         f_scr = self.web.get_buckling_shear_force()
-        value = [self.web.y_left, self.web.y_right, self.D,
-                 round_sig(self.rivet_pitch), round_sig(fs), round_sig(fsj), round_sig(fsu), round_sig(f_scr),
-                 round_sig(ms)]
-        writer.writerow(value)
+        value = [self.web.y_left, self.web.y_right, self.D, self.rivet_pitch, fs, fsj, fsu, f_scr, ms]
+        return 'rivet_web_flange_web_hole.csv', value, WEB_HOLE_ROW_SIG
 
-    def write_all_row(self, sf, he):
+    def write_all_row(self, sf, he, sink=None):
         """
         :param sf: 前桁の分担荷重[N]
         :param he: 桁フランジ断面重心距離[mm]
+        :param sink:ResultsSink(Noneならその場でcsvに追記する)
         :return:
         """
-        with open('results/rivet_web_flange_shear.csv', 'a', encoding="utf-8") as f:
-            writer = csv.writer(f)
-            self.make_row_shear(writer, sf, he)
-        with open('results/rivet_web_flange_web_hole.csv', 'a', encoding="utf-8") as f:
-            writer = csv.writer(f)
-            self.make_row_web_hole(writer, sf, he)
+        for row in self.get_rows(sf, he):
+            write_row(sink, *row)
+
+    def get_rows(self, sf, he):
+        """
+        :param sf: 前桁の分担荷重[N]
+        :param he: 桁フランジ断面重心距離[mm]
+        :return: write_all_rowで書く(表の名前, 値のlist, rounded)のlist
+        """
+        return [self.get_row_shear(sf, he), self.get_row_web_hole(sf, he)]
 
 
-def _make_header_shear(writer):
+def _make_header_shear(sink):
     """Make Header of CSV shear M.S.
-    :param writer:csv.writer()で取得されるもの
+    :param sink:ResultsSinkまたはNone
     """
     header = ["左端STA[mm]", "右端STA[mm]", "$q_{max}$[N/m]", "N", "D[mm]", "p[mm]", "Ps[N]", "$P_{allow}$[N]", "M.S."]
-    writer.writerow(header)
+    write_row(sink, 'rivet_web_flange_shear.csv', header)
 
 
-def _make_header_web_hole(writer):
+def _make_header_web_hole(sink):
     """Make Header of CSV web hole loss.
-    :param writer:csv.writer()で取得されるもの
+    :param sink:ResultsSinkまたはNone
     """
     header = ["左端STA[mm]", "右端STA[mm]", "D[mm]", "p[mm]", "$f_s$[MPa]", "$f_{sj}$[MPa]", "$F_{su}$[MPa]",
               "$f_{scr}$[MPa]", "M.S."]
-    writer.writerow(header)
+    write_row(sink, 'rivet_web_flange_web_hole.csv', header)
 
 
-def rivet_wf_make_all_header():
-    with open('results/rivet_web_flange_shear.csv', 'a', encoding="utf-8") as f:
-        writer = csv.writer(f)
-        _make_header_shear(writer)
-    with open('results/rivet_web_flange_web_hole.csv', 'a', encoding="utf-8") as f:
-        writer = csv.writer(f)
-        _make_header_web_hole(writer)
+def rivet_wf_make_all_header(sink=None):
+    _make_header_shear(sink)
+    _make_header_web_hole(sink)
 
 
 def main():
@@ -1,19 +1,28 @@
 """Implementation of Rivet between Web and Stiffener."""
 # coding:utf-8
 # Author:Shun Arahata,Hirotaka Kondo
-from scipy import interpolate
 import numpy as np
 import math
-from unit_convert import ksi2Mpa, round_sig
+from unit_convert import ksi2Mpa, is_scalar, interp_scalar
 from rivet import Rivet
 from stiffener import Stiffener
 from web import Web
-import csv
+from results_sink import write_row
+
+# 講義ノート2p.3のグラフ(鋲間座屈)
+FIR_P_PER_T = np.array([9, 12, 16, 20, 23, 28, 30, 33, 35, 40, 48, 60, 80])  # p/t
+FIR_KSI = np.array([68, 64, 60, 56, 50, 45, 40, 32, 30, 23, 16, 10, 6])  # Fir[ksi]
+PITCH_STEPS = 100  # リベットピッチを6Dから4Dまで何段階で探すか
+RIVET_LOAD_K = 172  # [MPa](p.13経験式)
+RIVET_F_SU = ksi2Mpa(41)  # DD鋲のF_su[MPa]
 
 
 class RivetWebStiffener(Rivet):
     """ウェブとスティフナーを結合するリベット."""
 
+    __slots__ = ("stiffener", "web", "rivet_pitch")
+    F_su = RIVET_F_SU  # DD鋲を利用する(originalはAD鋲)
+
     def __init__(self, D, stiffener, web):
         """Constructor.
 
@@ -25,7 +34,6 @@ class RivetWebStiffener(Rivet):
         self.stiffener = stiffener
         self.web = web
         self.rivet_pitch = self.decide_rivet_pitch()
-        self.F_su = ksi2Mpa(41)  # DD鋲を利用する(originalはAD鋲)
 
     """
     def get_steep_of_inter_rivet_buckling(self):
@@ -86,28 +94,14 @@ class RivetWebStiffener(Rivet):
     def get_inter_rivet_buckling(self):
         """
         講義ノート2p.3のグラフを線形補間して作成
-        :return: Fir
+        :return: Fir[MPa] グラフの範囲外ならnan
         """
-        x = [9, 12, 16, 20, 23, 28, 30, 33, 35, 40, 48, 60, 80]
-        y = [68, 64, 60, 56, 50, 45, 40, 32, 30, 23, 16, 10, 6]
-        f = interpolate.interp1d(x, y)
-        fir_in_ksi = f(self.rivet_pitch / self.web.thickness)
-        fir_in_mpa = ksi2Mpa(fir_in_ksi)
-        return fir_in_mpa
+        return _get_fir(self.rivet_pitch, self.web.thickness)
 
     def decide_rivet_pitch(self):
-        """"リベットピッチ幅を決める"""
+        """"リベットピッチ幅を決める(決まらなければnan.警告はRib.get_rivet_warnings)"""
         fcc = self.stiffener.get_clippling_stress()
-        # print("fcc", fcc)
-        for rivet_spacing in np.linspace(6 * self.D, 4 * self.D, 100):
-            self.rivet_pitch = rivet_spacing
-            fir = self.get_inter_rivet_buckling()
-            # print(fir, fcc)
-            if fir > fcc:
-                return rivet_spacing
-
-        print("web stiffener rivet error")
-        return math.nan
+        return solve_rivet_pitch(self.D, self.web.thickness, fcc)
 
     def get_rivet_load(self):
         """
@@ -116,8 +110,7 @@ class RivetWebStiffener(Rivet):
         area = self.stiffener.get_area()
         p_2 = self.rivet_pitch
         d_c = self.web.width_b  # スティフナーピッチ
-        k = 172  # [MPa](p.13経験式)
-        p_f = (k * area / d_c) * p_2
+        p_f = (RIVET_LOAD_K * area / d_c) * p_2
         return p_f
 
     def get_ms(self):
@@ -127,33 +120,44 @@ class RivetWebStiffener(Rivet):
         ms = self.get_p_allow() / self.get_rivet_load() - 1
         return ms
 
-    def make_row_shear(self, writer):
+    def make_row_shear(self, sink):
         """
         CSVのrow出力.
-        :param writer:csv.writer()で取得されるもの
+        :param sink:ResultsSink(Noneならその場でcsvに追記する)
+        """
+        write_row(sink, *self.get_row_shear())
+
+    def get_row_shear(self):
+        """
+        shearの表の1行(ファイルには書かない).
+        :return: (表の名前, 値のlist, rounded)
         """
-        k = 172  # [MPa](p.13経験式)
+        k = RIVET_LOAD_K
         area = self.stiffener.get_area()
         ms = self.get_ms()
         pf = self.get_rivet_load()
         p_allow = self.get_p_allow()
         value = [self.web.y_left, self.web.y_right, k, area, self.web.width_b, self.D, self.rivet_pitch,
                  pf, p_allow, ms]
-        round_value = map(lambda x: round_sig(x), value)
-        writer.writerow(round_value)
+        return 'rivet_web_stiffener_shear.csv', value, True
 
-    def make_row_buckling(self, writer):
+    def make_row_buckling(self, sink):
         """
-        :param writer: csv.writer()で取得されるもの
+        :param sink:ResultsSink(Noneならその場でcsvに追記する)
         :return:
         """
+        write_row(sink, *self.get_row_buckling())
+
+    def get_row_buckling(self):
+        """
+        bucklingの表の1行(ファイルには書かない).
+        :return: (表の名前, 値のlist, rounded)
+        """
         fir = self.get_inter_rivet_buckling()
         fcc = self.stiffener.get_clippling_stress()
         value = [self.web.y_left, self.web.y_right, self.stiffener.bs1_bottom, self.stiffener.thickness, fcc, fir,
                  self.rivet_pitch]
-        round_value =  map(lambda x: round_sig(x), value)
-        # print("type:", type(value), type(round_value))
-        writer.writerow(round_value)
+        return 'rivet_web_stiffener_buckling.csv', value, True
 
     def get_web_hole_loss(self, sf, he):
         """
@@ -164,79 +168,176 @@ class RivetWebStiffener(Rivet):
         ms = self.web.get_web_hole_loss_ms(self.rivet_pitch, self.D, sf, he)
         return ms
 
-    def make_row_web_hole(self, writer, sf, he):
+    def make_row_web_hole(self, sink, sf, he):
         """
-        :param writer: csv.writer()で取得されるもの
+        :param sink:ResultsSink(Noneならその場でcsvに追記する)
         :param sf:前桁荷重負担分[N]
         :param he:フランジ間断面重心距離[mm]
         :return:
         """
+        write_row(sink, *self.get_row_web_hole(sf, he))
+
+    def get_row_web_hole(self, sf, he):
+        """
+        web hole lossの表の1行(ファイルには書かない).
+        :param sf:前桁荷重負担分[N]
+        :param he:フランジ間断面重心距離[mm]
+        :return: (表の名前, 値のlist, rounded)
+        """
         fs = self.web.get_shear_force(sf, he)
         fsu = self.web.get_fsu()
         fsj = self.web.get_fsj(self.rivet_pitch, self.D, sf, he)
         ms = self.web.get_web_hole_loss_ms(self.rivet_pitch, self.D, sf, he)
         f_scr = self.web.get_buckling_shear_force()
         value = [self.web.y_left, self.web.y_right, self.rivet_pitch, self.D, fs, fsj, fsu, f_scr, ms]
-        round_value = map(lambda x: round_sig(x), value)
-        writer.writerow(round_value)
+        return 'rivet_web_stiffener_web_hole.csv', value, True
 
-    def write_all_row(self, sf, he):
+    def write_all_row(self, sf, he, sink=None):
         """
         :param sf:前桁荷重負担分[N]
         :param he:フランジ間断面重心距離[mm]
+        :param sink:ResultsSink(Noneならその場でcsvに追記する)
         :return:
         """
-        with open('results/rivet_web_stiffener_shear.csv', 'a', encoding="utf-8") as shear:
-            shear_writer = csv.writer(shear)
-            self.make_row_shear(shear_writer)
-        with open('results/rivet_web_stiffener_buckling.csv', 'a', encoding="utf-8") as buckling:
-            buckling_writer = csv.writer(buckling)
-            self.make_row_buckling(buckling_writer)
-        with open('results/rivet_web_stiffener_web_hole.csv', 'a', encoding="utf-8") as holeloss:
-            holeloss_writer = csv.writer(holeloss)
-            self.make_row_web_hole(holeloss_writer, sf, he)
+        for row in self.get_rows(sf, he):
+            write_row(sink, *row)
+
+    def get_rows(self, sf, he):
+        """
+        :param sf:前桁荷重負担分[N]
+        :param he:フランジ間断面重心距離[mm]
+        :return: write_all_rowで書く(表の名前, 値のlist, rounded)のlist
+        """
+        return [self.get_row_shear(), self.get_row_buckling(), self.get_row_web_hole(sf, he)]
 
 
-def _make_header_shear(writer):
+def _get_fir(pitch, web_thickness):
+    """
+    鋲間座屈応力Fir.
+    :param pitch:リベットピッチ[mm]
+    :param web_thickness:web厚さ[mm]
+    :return: Fir[MPa] グラフの範囲外ならnan
+    """
+    if is_scalar(pitch) and is_scalar(web_thickness):
+        p_per_t = pitch / web_thickness
+        if not _FIR_P_PER_T[0] <= p_per_t <= _FIR_P_PER_T[-1]:  # nanのpitchもここで弾く
+            return math.nan
+        return ksi2Mpa(interp_scalar(p_per_t, _FIR_P_PER_T, _FIR_KSI))
+    p_per_t = np.asarray(pitch) / web_thickness
+    fir_in_ksi = np.interp(p_per_t, FIR_P_PER_T, FIR_KSI)
+    inside = (p_per_t >= FIR_P_PER_T[0]) & (p_per_t <= FIR_P_PER_T[-1])
+    return np.where(inside, ksi2Mpa(fir_in_ksi), np.nan)
+
+
+def solve_rivet_pitch(D, web_thickness, fcc):
+    """
+    Fir > Fcc となる最大のリベットピッチ.
+
+    np.linspace(6D, 4D, PITCH_STEPS) を大きい方から順に調べて最初に Fir > Fcc となるものを返す.
+    Firはp/tについて単調減少な折れ線なので,Fir = Fcc となるp/tを逆補間で求め,
+    それより小さい最初の格子点を直接計算する(境界の丸め誤差だけ前後の格子点で確認する).
+    配列を渡せばまとめて計算する.
+    :param D:リベットの鋲径[mm]
+    :param web_thickness:web厚さ[mm]
+    :param fcc:stiffenerのクリップリング応力[MPa]
+    :return: リベットピッチ[mm] 見つからなければnan
+    """
+    if is_scalar(D) and is_scalar(web_thickness) and is_scalar(fcc):
+        return _solve_rivet_pitch_scalar(float(D), float(web_thickness), float(fcc))
+    D, web_thickness, fcc = np.broadcast_arrays(*[np.asarray(v, dtype=float) for v in (D, web_thickness, fcc)])
+    start = 6 * D
+    step = (4 * D - start) / (PITCH_STEPS - 1)
+    last = PITCH_STEPS - 1
+
+    def grid(i):
+        return np.where(i >= last, 4 * D, i * step + start)  # np.linspaceと同じ値
+
+    def exceeds(i):
+        inside = (i >= 0) & (i <= last)
+        fir = _get_fir(grid(np.clip(i, 0, last)), web_thickness)
+        with np.errstate(invalid="ignore"):
+            return inside & (fir > fcc)
+
+    # Fir = Fcc となる p/t (グラフの範囲で頭打ち)
+    fir_mpa = ksi2Mpa(FIR_KSI)
+    critical = np.interp(fcc, fir_mpa[::-1], FIR_P_PER_T[::-1])
+    limit = np.minimum(critical, FIR_P_PER_T[-1]) * web_thickness
+    with np.errstate(invalid="ignore"):
+        index = np.clip(np.ceil((limit - start) / step), 0, last).astype(int)
+    index = np.where(np.isnan(limit), last, index)
+    for _ in range(2):
+        index = np.where(exceeds(index - 1), index - 1, index)
+    for _ in range(2):
+        index = np.where(~exceeds(index) & (index < last), index + 1, index)
+    return np.where(exceeds(index), grid(index), np.nan)
+
+
+_FIR_P_PER_T = FIR_P_PER_T.tolist()
+_FIR_KSI = FIR_KSI.tolist()
+_FIR_MPA_ASCENDING = ksi2Mpa(FIR_KSI[::-1]).tolist()
+_FIR_P_PER_T_DESCENDING = FIR_P_PER_T[::-1].tolist()
+
+
+def _solve_rivet_pitch_scalar(D, web_thickness, fcc):
+    """solve_rivet_pitchのスカラー版(numpyの呼び出しが遅いので分けている)."""
+    if math.isnan(fcc):
+        return math.nan
+    start = 6 * D
+    step = (4 * D - start) / (PITCH_STEPS - 1)
+    last = PITCH_STEPS - 1
+
+    def grid(i):
+        return 4 * D if i >= last else i * step + start
+
+    def exceeds(i):
+        return 0 <= i <= last and _get_fir(grid(i), web_thickness) > fcc
+
+    critical = interp_scalar(fcc, _FIR_MPA_ASCENDING, _FIR_P_PER_T_DESCENDING)
+    limit = min(critical, _FIR_P_PER_T[-1]) * web_thickness
+    index = min(max(math.ceil((limit - start) / step), 0), last)
+    for _ in range(2):
+        if exceeds(index - 1):
+            index -= 1
+    for _ in range(2):
+        if not exceeds(index) and index < last:
+            index += 1
+    return grid(index) if exceeds(index) else math.nan
+
+
+def _make_header_shear(sink):
     """
     CSV header shear.
-    :param writer:csv.writer()で取得されるもの
+    :param sink:ResultsSinkまたはNone
     """
     header = ["左端STA[mm]", "右端STA[mm]", "K[MPa]", "As[${mm}^2$]", "dc[mm]", "D[mm]", "p[mm]",
               "$P_f$[N]", "$P_{allow}$[N]", "M.S."]
-    writer.writerow(header)
+    write_row(sink, 'rivet_web_stiffener_shear.csv', header)
 
 
-def _make_header_buckling(writer):
+def _make_header_buckling(sink):
     """
     CSV header shear.
-    :param writer:csv.writer()で取得されるもの
+    :param sink:ResultsSinkまたはNone
     """
     header = ["左端STA[mm]", "右端STA[mm]", "b bottom s1[mm]", "ts[mm]", "$F_{cc}$[MPa]", "$F_{ir}$[MPa]",
               "p[mm]"]
-    writer.writerow(header)
+    write_row(sink, 'rivet_web_stiffener_buckling.csv', header)
 
 
-def _make_header_web_hole(writer):
+def _make_header_web_hole(sink):
     """
     CSV header web hole.
-    :param writer:csv.writer()で取得されるもの
+    :param sink:ResultsSinkまたはNone
     """
     header = ["左端STA[mm]", "右端STA[mm]", "p[mm]", "D[mm]", "$f_s$[MPa]", "$f_{sj}$[MPa]", "$F_{su}$[MPa]",
               "$f_{scr}$[MPa]", "M.S."]
-    writer.writerow(header)
-
-
-def rivet_ws_make_all_header():
-    with open('results/rivet_web_stiffener_shear.csv', 'a', encoding="utf-8") as shear:
-        shear_writer = csv.writer(shear)
-        _make_header_shear(shear_writer)
-    with open('results/rivet_web_stiffener_buckling.csv', 'a', encoding="utf-8") as buckling:
-        buckling_writer = csv.writer(buckling)
-        _make_header_buckling(buckling_writer)
-    with open('results/rivet_web_stiffener_web_hole.csv', 'a', encoding="utf-8") as holeloss:
-        holeloss_writer = csv.writer(holeloss)
-        _make_header_web_hole(holeloss_writer)
+    write_row(sink, 'rivet_web_stiffener_web_hole.csv', header)
+
+
+def rivet_ws_make_all_header(sink=None):
+    _make_header_shear(sink)
+    _make_header_buckling(sink)
+    _make_header_web_hole(sink)
 
 
 def main():
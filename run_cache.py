@@ -0,0 +1,115 @@
+"""Content-hash cache of the csv rows of each bay."""
+# coding:utf-8
+# Author: Shun Arahata
+import hashlib
+import importlib.util
+import json
+import os
+import geometry
+from material import SHEET_7075, EXTRUSION_7075, EXTRUSION_2024
+from design_record import get_design_values
+from results_sink import write_row, format_row
+
+CACHE_DIRECTORY = 'results/cache/'
+# 計算式の入っているmodule.どれかのソースが変われば全てのbayを計算し直す
+SOURCE_MODULES = ("rib", "web", "stiffener", "flange", "compression_flange", "tension_flange", "rivet",
+                  "rivet_web_flange", "rivet_web_stiffener", "material", "crippling", "buckling", "geometry",
+                  "unit_convert", "results_sink", "run_cache", "evaluation", "joint_design")
+MATERIALS = (SHEET_7075, EXTRUSION_7075, EXTRUSION_2024)
+
+_static_digest = None
+
+
+def get_static_digest():
+    """:return: SOURCE_MODULESのソースと材料の表のhash(プロセスで1回だけ計算する)"""
+    global _static_digest
+    if _static_digest is None:
+        digest = hashlib.sha256()
+        for name in SOURCE_MODULES:
+            with open(importlib.util.find_spec(name).origin, "rb") as f:
+                digest.update(f.read())
+        digest.update(json.dumps(get_material_tables()).encode("utf-8"))
+        _static_digest = digest.hexdigest()
+    return _static_digest
+
+
+def get_material_tables():
+    """:return: 許容応力の表(jsonにできる形)"""
+    tables = []
+    for material in MATERIALS:
+        for name in ("F_su", "F_cy", "F_tu"):
+            allowable = getattr(material, name)
+            if allowable is not None:
+                tables.append([material.name, name, allowable.breakpoints.tolist(), allowable.values.tolist(),
+                               allowable.closed])
+    return tables
+
+
+def get_bay_key(rib):
+    """
+    bayの入力(寸法,荷重,前桁高さ,材料の表,計算式のソース)のhash.
+    :param rib:全ての部品を追加したRib
+    :return: 16進数の文字列
+    """
+    inputs = [rib.y_index, rib.y_left, rib.width, float(rib.hf), rib.sf, rib.mf, get_design_values(rib),
+              geometry.get_profile().to_dict(), get_static_digest()]
+    # 1と1.0はcsvの表記が変わるので区別したまま(json)hashする
+    return hashlib.sha256(json.dumps(inputs).encode("utf-8")).hexdigest()
+
+
+class RecordingSink(object):
+    """
+    sinkに渡す行を覚えておくもの(sinkがNoneなら今まで通りその場で追記する).
+    行はround_sigしたものを覚えるので,cacheから書くときには丸め直さなくてよい.
+    """
+
+    def __init__(self, sink):
+        self.sink = sink
+        self.rows = []
+
+    def writerow(self, table, row, rounded=False):
+        row = format_row(row, rounded)
+        self.rows.append((table, row))
+        write_row(self.sink, table, row)
+
+
+class RunCache(object):
+    """
+    bayごとのcsvの行とM.S.の確認の表示を入力のhashをkeyにしてjsonで保存するもの.
+
+    入力が同じbayは保存した行と表示をそのまま出し,計算し直さない.
+    """
+
+    def __init__(self, directory=CACHE_DIRECTORY):
+        """Constructor.
+
+        :param directory:保存先(なければ作る)
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _get_path(self, key):
+        return os.path.join(self.directory, key + ".json")
+
+    def get(self, key):
+        """
+        :param key:get_bay_keyの値
+        :return: ((表の名前, 書き出す値のlist)のlist, M.S.の確認の文字列のlist),なければNone
+        """
+        try:
+            with open(self._get_path(key), encoding="utf-8") as f:
+                entry = json.load(f)
+            return entry["rows"], entry["messages"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def put(self, key, rows, messages):
+        """
+        :param key:get_bay_keyの値
+        :param rows:RecordingSink.rows
+        :param messages:rib.get_ms_messagesの返り値
+        """
+        path = self._get_path(key)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"rows": rows, "messages": messages}, f)
+        os.replace(path + ".tmp", path)  # 途中で止まっても壊れたファイルを残さない
@@ -1,11 +1,11 @@
 """SとMを計算"""
 # -*- coding: utf-8 -*-
 # Author: Hirotaka Kondo
+import argparse
 import numpy as np
 from scipy import interpolate
 from scipy.integrate import quad
 import csv
-import matplotlib.pyplot as plt
 
 C_L = 1.4  # 最大揚力係数
 C_ROOT = 2.13 * 1000  # rootのchord長[mm]
@@ -224,6 +224,7 @@ def _make_table():
 
 
 def plot_sm():
+    import matplotlib.pyplot as plt  # グラフを描くときだけ読み込む
     y_list = np.array([i for i in range(625, 5001)])
     s, m, s_rep, m_rep, y_rep = [], [], [], [], []
     for i in y_list:
@@ -247,9 +248,32 @@ def plot_sm():
     plt.show()
 
 
+def main(argv=None):
+    """
+    python sandm.py [STA ...]   指定したSTAのS,Sf,M,Mfを表示する
+    python sandm.py --graph     STA625からSTA5000まで1刻みの値をsm_graph.csvに書く
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("sta", nargs="*", type=float, default=[625, 1000, 1500, 2000, 2500, 3000, 3500, 4000, 4500],
+                        help="STA[mm]")
+    parser.add_argument("--limit-div", type=int, default=50, help="quadの分割数の上限")
+    parser.add_argument("--graph", action="store_true", help="1刻みの値をsm_graph.csvに書く")
+    parser.add_argument("--plot", action="store_true", help="SとMのグラフを表示する")
+    args = parser.parse_args(argv)
+    if args.graph:
+        _get_csv()
+    if args.plot:
+        plot_sm()
+    print("STA[mm], S[N], Sf[N], M[N*m], Mf[N*m]")
+    for y in args.sta:
+        print("{0:g}, {1:.1f}, {2:.1f}, {3:.1f}, {4:.1f}".format(
+            y, get_s(y, args.limit_div), get_sf(y, args.limit_div), get_m(y, args.limit_div),
+            get_mf(y, args.limit_div)))
+
+
 if __name__ == "__main__":
+    main()
     # _make_table()
-    _get_csv()
     # for i in range(625, 5000):
     # print("M at STA{0} is {1} [N*m]".format(i, get_m(i, 1)))
     # plot_sm()
@@ -0,0 +1,225 @@
+"""Direct sizing of components from the M.S. equations."""
+# coding:utf-8
+# Author: Shun Arahata
+import itertools
+import math
+import numpy as np
+from web import Web
+from stiffener import Stiffener, get_inertia_u_fraction
+from compression_flange import CompressionFlange
+from tension_flange import TensionFlange
+from material import SHEET_7075
+
+
+def _flange_area(thickness, b_bottom, b_height):
+    """Flange.get_volumeの断面積[mm^2](質量の比較用)."""
+    return (b_height + b_bottom + thickness / 2) * thickness - thickness ** 2
+
+
+class StiffenerCatalog(object):
+    """
+    断面二次モーメント順に並べたstiffener断面の候補.
+
+    I >= I_U を満たす中で断面積(=質量)最小のものを二分探索で引けるように,
+    I の昇順に並べ,後ろからの断面積の最小値の位置を持っておく.
+    """
+
+    def __init__(self, thicknesses, bs1_bottoms, bs2_heights):
+        """Constructor.
+
+        :param thicknesses:stiffener厚さの候補[mm]
+        :param bs1_bottoms:stiffener bottom長さの候補[mm]
+        :param bs2_heights:stiffener 高さの候補[mm]
+        """
+        sections = [(t, b1, b2) for t in np.asarray(thicknesses).tolist()
+                    for b1 in np.asarray(bs1_bottoms).tolist() for b2 in np.asarray(bs2_heights).tolist()]
+        stiffeners = [Stiffener(t, b1, b2, None) for t, b1, b2 in sections]
+        inertia = np.array([stiffener.get_inertia() for stiffener in stiffeners])
+        area = np.array([stiffener.get_area() for stiffener in stiffeners])
+        order = np.argsort(inertia, kind="stable")
+        self.sections = [sections[i] for i in order]
+        self.inertia = inertia[order]
+        self.area = area[order]
+        # cheapest[i]: i番目以降で断面積が最小の位置
+        self.cheapest = np.empty(len(order), dtype=int)
+        best = len(order) - 1
+        for i in range(len(order) - 1, -1, -1):
+            if self.area[i] < self.area[best]:
+                best = i
+            self.cheapest[i] = best
+
+    def get_cheapest(self, required_inertia):
+        """
+        :param required_inertia:必要な断面二次モーメント[mm^4] nanなら制約なし
+        :return: (厚さ, bs1, bs2),なければNone
+        """
+        if math.isnan(required_inertia):
+            position = 0
+        else:
+            position = np.searchsorted(self.inertia, required_inertia)
+        if position >= len(self.sections):
+            return None
+        return self.sections[self.cheapest[position]]
+
+
+def size_stiffener(web, he, catalog, target_ms=0):
+    """
+    stiffenerの最軽量の断面を候補から直接求める.
+    :param web:stiffenerが属するwebのクラス
+    :param he:桁フランジ断面重心距離[mm]
+    :param catalog:StiffenerCatalog
+    :param target_ms:目標のM.S.
+    :return: Stiffener,成立する候補がなければNone
+    """
+    required = he * web.thickness ** 3 * get_inertia_u_fraction(he / web.width_b) * (1 + target_ms)  # I_U
+    section = catalog.get_cheapest(required)
+    if section is None:
+        return None
+    stiffener = Stiffener(*section, web)
+    if stiffener.get_ms(he) < target_ms:  # 境界での丸め誤差
+        position = np.searchsorted(catalog.inertia, required, side="right")
+        if position >= len(catalog.sections):
+            return None
+        stiffener = Stiffener(*catalog.sections[catalog.cheapest[position]], web)
+    return stiffener
+
+
+def get_flange_pairs(hf, mf, web, cflange_candidates, tflange_candidates, target_ms=0):
+    """
+    上下フランジの全ての組み合わせについてheとフランジのM.S.を調べる.
+
+    heは上下フランジの図心で決まり,フランジのM.S.はheとweb厚さで決まるので,
+    組み合わせごとに(行列で)まとめて計算する.
+    :param hf:前桁高さ[mm]
+    :param mf:前桁分担曲げモーメント[N*m]
+    :param web:webのクラス
+    :param cflange_candidates:圧縮側フランジの(厚さ,底長さ,高さ)の候補[mm]
+    :param tflange_candidates:引張側フランジの(厚さ,底長さ,高さ)の候補[mm]
+    :param target_ms:目標のM.S.
+    :return: (CompressionFlangeのlist, TensionFlangeのlist, heの行列, フランジ断面積の和の行列, 成立するかの行列)
+    行列の[i, j]はi番目の圧縮側とj番目の引張側の組み合わせ
+    """
+    cflanges = [CompressionFlange(*section, web) for section in itertools.product(
+        *(np.asarray(candidate).tolist() for candidate in cflange_candidates))]
+    tflanges = [TensionFlange(*section, web) for section in itertools.product(
+        *(np.asarray(candidate).tolist() for candidate in tflange_candidates))]
+    c_gravity = np.array([flange.get_center_of_gravity() for flange in cflanges])
+    t_gravity = np.array([flange.get_center_of_gravity() for flange in tflanges])
+    he = hf - (t_gravity[np.newaxis, :] + c_gravity[:, np.newaxis])  # Rib.set_heと同じ順で足す
+    feasible = np.ones(he.shape, dtype=bool)
+    with np.errstate(invalid="ignore"):
+        for i, flange in enumerate(cflanges):
+            feasible[i, :] &= flange.get_ms(mf, he[i, :]) >= target_ms
+        for j, flange in enumerate(tflanges):
+            feasible[:, j] &= flange.get_ms(mf, he[:, j]) >= target_ms
+    c_area = np.array([_flange_area(flange.thickness, flange.b_bottom, flange.b_height) for flange in cflanges])
+    t_area = np.array([_flange_area(flange.thickness, flange.b_bottom, flange.b_height) for flange in tflanges])
+    area = c_area[:, np.newaxis] + t_area[np.newaxis, :]
+    return cflanges, tflanges, he, area, feasible
+
+
+def size_flanges(hf, mf, web, cflange_candidates, tflange_candidates, target_ms=0):
+    """
+    フランジのM.S.を満たす中で,上下フランジの断面積の和が最小の組み合わせを直接求める.
+
+    heは上下フランジの図心で決まるので,全ての組み合わせのheでM.S.を調べる.
+    web(とstiffener)のM.S.もheで変わるが,ここでは見ないので,
+    Rib全体として最軽量になるとは限らない(全体で決めるときはsize_bay).
+    :param hf:前桁高さ[mm]
+    :param mf:前桁分担曲げモーメント[N*m]
+    :param web:webのクラス
+    :param cflange_candidates:圧縮側フランジの(厚さ,底長さ,高さ)の候補[mm]
+    :param tflange_candidates:引張側フランジの(厚さ,底長さ,高さ)の候補[mm]
+    :param target_ms:目標のM.S.
+    :return: (CompressionFlange, TensionFlange, he),成立する候補がなければ(None, None, nan)
+    """
+    cflanges, tflanges, he, area, feasible = get_flange_pairs(hf, mf, web, cflange_candidates,
+                                                              tflange_candidates, target_ms)
+    area = np.where(feasible, area, np.inf)
+    i, j = np.unravel_index(np.argmin(area), area.shape)
+    if not feasible[i, j]:
+        return None, None, np.nan
+    return cflanges[i], tflanges[j], he[i, j].item()
+
+
+def size_bay(rib, division, web_thicknesses, catalog, cflange_candidates, tflange_candidates, target_ms=0):
+    """
+    ある分割数でweb,stiffener,フランジの質量の和が最小になるものを直接求める.
+
+    heが大きいほどwebとフランジは楽になるがstiffenerの必要なIは大きくなるので,
+    最軽量のフランジが全体の最軽量とは限らない(重いフランジでheを稼いでwebを薄くする方が軽いことがある).
+    そこでweb厚さごとに上下フランジの全ての組み合わせのheを計算し,
+    そのheでwebが成立するか,必要なstiffenerはどれかを行列でまとめて調べて,合計質量が最小のものを選ぶ.
+    リベットのM.S.は見ないので,リベットも含めた成立は探索で確認する.
+    :param rib:Rib(位置と荷重だけ使う)
+    :param division:分割数
+    :param web_thicknesses:web厚さの候補[mm]
+    :param catalog:StiffenerCatalog
+    :param cflange_candidates:圧縮側フランジの(厚さ,底長さ,高さ)の候補[mm]
+    :param tflange_candidates:引張側フランジの(厚さ,底長さ,高さ)の候補[mm]
+    :param target_ms:目標のM.S.
+    :return: (Web, Stiffener, CompressionFlange, TensionFlange, he),成立しなければNone
+    """
+    thicknesses = np.asarray(web_thicknesses)
+    thicknesses = thicknesses[SHEET_7075.F_su.get_valid_mask(thicknesses)]
+    best, best_volume = None, np.inf
+    for thickness in thicknesses.tolist():
+        web = Web(rib.y_left, rib.y_right, division, thickness)
+        cflanges, tflanges, he, area, feasible = get_flange_pairs(rib.hf, rib.mf, web, cflange_candidates,
+                                                                  tflange_candidates, target_ms)
+        with np.errstate(invalid="ignore"):
+            feasible &= web.get_ms(rib.sf, he) >= target_ms
+            required = he * thickness ** 3 * get_inertia_u_fraction(he / web.width_b) * (1 + target_ms)
+        # StiffenerCatalog.get_cheapestと同じくnanは制約なし
+        positions = np.searchsorted(catalog.inertia, np.where(np.isnan(required), -np.inf, required))
+        feasible &= positions < len(catalog.sections)
+        cheapest = catalog.cheapest[np.minimum(positions, len(catalog.sections) - 1)]
+        # stiffenerの体積は断面積に比例する
+        stiffener_length = Stiffener(*catalog.sections[0], web).get_volume() / catalog.area[0]
+        volume = (web.get_volume() + catalog.area[cheapest] * stiffener_length + area * rib.width / 1000)
+        volume = np.where(feasible, volume, np.inf).ravel()
+        while True:
+            k = int(np.argmin(volume))
+            if not volume[k] < best_volume:
+                break
+            i, j = divmod(k, len(tflanges))
+            stiffener = size_stiffener(web, he[i, j].item(), catalog, target_ms)  # 境界での丸め誤差の確認
+            if stiffener is None:
+                volume[k] = np.inf
+                continue
+            actual = (web.get_volume() + stiffener.get_volume() + cflanges[i].get_volume(rib.width)
+                      + tflanges[j].get_volume(rib.width))
+            if actual > volume[k]:
+                volume[k] = actual
+                continue
+            best, best_volume = (web, stiffener, cflanges[i], tflanges[j], he[i, j].item()), volume[k]
+            break
+    return best
+
+
+def main():
+    """Test Function."""
+    from rib import Rib
+    sta = Rib(3)
+    sta.add_web(1.6, 5)
+    thicknesses = [4 + i for i in range(5)]
+    b_list = [14 + 2 * i for i in range(10)]
+    candidates = (thicknesses, [22.5], b_list)
+    cflange, tflange, he = size_flanges(sta.hf, sta.mf, sta.web, candidates, candidates)
+    print("cflange", cflange.thickness, cflange.b_bottom, cflange.b_height, cflange.get_ms(sta.mf, he))
+    print("tflange", tflange.thickness, tflange.b_bottom, tflange.b_height, tflange.get_ms(sta.mf, he))
+    print("he", he)
+    catalog = StiffenerCatalog([1.27, 1.60, 1.80, 2.03], [13 + i for i in range(10)], [10 + 2 * i for i in range(10)])
+    for division in range(2, 8):
+        sized = size_bay(sta, division, [0.81, 1.02, 1.27, 1.60, 1.80, 2.03], catalog,
+                         candidates, candidates)
+        if sized is None:
+            print(division, "no feasible design")
+            continue
+        web, stiffener, cflange, tflange, he = sized
+        print(division, "web", web.thickness, "stiffener", stiffener.thickness, stiffener.bs1_bottom,
+              stiffener.bs2_height, "he", he)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,277 @@
+"""Local HTTP/JSON sizing service with warm caches."""
+# coding:utf-8
+# Author: Shun Arahata
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+HOST = '127.0.0.1'  # 外からは繋がせない
+PORT = 8765
+CHUNK_SIZE = 64  # 1つのworkerにまとめて渡す設計の数
+RESULT_CACHE_SIZE = 4096  # workerごとに覚えておく結果の数
+MAX_BODY_SIZE = 64 * 1024 * 1024  # [byte]
+
+
+def _warm_up():
+    """
+    workerの初期化.計算に使うmoduleを読み込み,stations.jsonを1度計算して
+    前桁高さのcacheや部品のflyweightを作っておく.
+    """
+    from main import DEFAULT_CONFIG, load_config
+    from evaluation import evaluate_rib
+    for config in load_config(DEFAULT_CONFIG)["stations"]:
+        evaluate_rib(config)
+
+
+def _format_error(error):
+    """:return: 結果のlistに入れるerrorの辞書"""
+    return {"error": "{0}: {1}".format(type(error).__name__, error)}
+
+
+@lru_cache(maxsize=RESULT_CACHE_SIZE)
+def _evaluate_key(key):
+    """
+    同じ設計は計算し直さない(keyは設計のjson).
+    入力の誤りは{"error": ...}にして,同じrequestの他の設計は計算を続ける.
+    """
+    from evaluation import evaluate_rib, json_safe, INPUT_ERRORS
+    try:
+        return json_safe(evaluate_rib(json.loads(key)).to_dict())
+    except INPUT_ERRORS as error:
+        return _format_error(error)
+
+
+def evaluate_chunk(keys):
+    """
+    workerの中で設計をまとめて計算する.
+    :param keys:設計(evaluation.build_stationの引数)のjson文字列のlist
+    :return: RibResult.to_dict()(入力の誤りなら{"error": ...})のlist
+    """
+    return [_evaluate_key(key) for key in keys]
+
+
+def run_optimize_job(job):
+    """
+    workerの中で最適化を1つ行う.
+    :param job:{"space": DesignSpaceの引数の辞書, "time": 計算時間の上限[s], "evals": 評価回数の上限,
+        "direct": Trueならweb厚さ,stiffener,フランジをM.S.の式から直接決める,
+        "joints": Trueならリベットをjoint_designで決める}
+    :return: 結果の辞書(成立する設計がなければ"result"はNone,入力の誤りなら{"error": ...})
+    """
+    from optimizer import DesignSpace, optimize
+    from evaluation import evaluate, json_safe, INPUT_ERRORS
+    try:
+        space = DesignSpace(**job["space"])
+        direct = job.get("direct", False)
+        result = optimize(space, job.get("time"), job.get("evals"), direct_flanges=direct,
+                          direct_web_stiffener=direct, direct_joints=job.get("joints", False))
+    except INPUT_ERRORS as error:
+        return _format_error(error)
+    return json_safe({"mass": result.mass if result.rib is not None else None,
+                      "lower_bound": float(result.lower_bound), "evaluations": result.evaluations,
+                      "elapsed": result.elapsed, "optimal": result.optimal,
+                      "result": None if result.rib is None else evaluate(result.rib).to_dict()})
+
+
+class SizingService(object):
+    """
+    設計の計算と最適化をprocess poolで行うもの.
+
+    workerは起動時に_warm_upで計算の準備をし,計算した結果はworkerごとにRESULT_CACHE_SIZE個まで覚えておく.
+    いくつものthreadから同時に呼んでよい.
+    """
+
+    def __init__(self, jobs=None):
+        """Constructor.
+
+        :param jobs:workerの数(Noneならcpuの数)
+        """
+        self.jobs = jobs or os.cpu_count()
+        self.executor = ProcessPoolExecutor(self.jobs, initializer=_warm_up)
+
+    def evaluate(self, designs):
+        """
+        :param designs:設計(evaluation.build_stationの引数)のlist
+        :return: RibResult.to_dict()(入力の誤りなら{"error": ...})のlist(designsの順)
+        """
+        keys = [json.dumps(design, sort_keys=True) for design in designs]
+        chunks = [keys[i:i + CHUNK_SIZE] for i in range(0, len(keys), CHUNK_SIZE)]
+        return [result for chunk in self.executor.map(evaluate_chunk, chunks) for result in chunk]
+
+    def optimize(self, jobs):
+        """
+        :param jobs:run_optimize_jobの引数のlist
+        :return: 結果の辞書のlist(jobsの順)
+        """
+        return list(self.executor.map(run_optimize_job, jobs))
+
+    def close(self):
+        self.executor.shutdown()
+
+
+class SizingHandler(BaseHTTPRequestHandler):
+    """
+    GET  /health    {"status": "ok", "jobs": workerの数}
+    POST /evaluate  {"designs": [設計, ...]} -> {"results": [RibResult.to_dict(), ...], "elapsed": [s]}
+    POST /optimize  {"jobs": [run_optimize_jobの引数, ...]} -> {"results": [...], "elapsed": [s]}
+    誤った設計やjobは,resultsのその位置が{"error": ...}になる(他はそのまま計算する).
+    requestの形が誤っていれば400,それ以外の計算中の例外は500で,どちらも{"error": ...}を返す.
+    """
+
+    protocol_version = "HTTP/1.1"  # keep-aliveで繋ぎ直さずに何度も呼べるように
+
+    def _send(self, status, payload):
+        body = json.dumps(payload, allow_nan=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send(200, {"status": "ok", "jobs": self.server.service.jobs})
+        else:
+            self._send(404, {"error": "not found: {0}".format(self.path)})
+
+    def do_POST(self):
+        routes = {"/evaluate": ("designs", self.server.service.evaluate),
+                  "/optimize": ("jobs", self.server.service.optimize)}
+        if self.path not in routes:
+            self._send(404, {"error": "not found: {0}".format(self.path)})
+            return
+        name, method = routes[self.path]
+        length = int(self.headers.get("Content-Length", 0))
+        if length > MAX_BODY_SIZE:
+            self._send(413, {"error": "request body is too large"})
+            return
+        start = time.perf_counter()
+        try:
+            items = json.loads(self.rfile.read(length).decode("utf-8"))[name]
+            if not isinstance(items, list):
+                raise TypeError("'{0}' must be a list".format(name))
+            results = method(items)
+        except (ValueError, KeyError, TypeError, IndexError) as error:  # requestの形の誤り
+            self._send(400, _format_error(error))
+            return
+        except Exception as error:  # workerが落ちたときなど.接続を切らずにerrorを返す
+            self._send(500, _format_error(error))
+            return
+        self._send(200, {"results": results, "elapsed": time.perf_counter() - start})
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def make_server(host=HOST, port=PORT, jobs=None, verbose=False):
+    """
+    :param host:待ち受けるアドレス
+    :param port:port番号(0なら空いているもの.server.server_address[1]でわかる)
+    :param jobs:workerの数
+    :param verbose:Trueならrequestごとにlogを出す
+    :return: ThreadingHTTPServer(serve_foreverで開始,shutdownとserver_closeとservice.closeで終了)
+    """
+    server = ThreadingHTTPServer((host, port), SizingHandler)
+    server.service = SizingService(jobs)
+    server.verbose = verbose
+    return server
+
+
+def post(url, payload, timeout=None):
+    """
+    serviceを呼ぶ.
+    :param url:例えば'http://127.0.0.1:8765/evaluate'
+    :param payload:送る辞書
+    :return: 返ってきた辞書
+    """
+    request = Request(url, json.dumps(payload).encode("utf-8"), {"Content-Type": "application/json"})
+    with urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read().decode("utf-8"))
+
+
+def self_test(jobs=2):
+    """portを自動で選んでserverを立て,stations.jsonを送って直接計算した結果と比べる(networkは使わない)."""
+    from concurrent.futures import ThreadPoolExecutor
+    from main import DEFAULT_CONFIG, load_config
+    from evaluation import evaluate_rib, json_safe
+    server = make_server(port=0, jobs=jobs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = "http://{0}:{1}".format(*server.server_address)
+    try:
+        stations = load_config(DEFAULT_CONFIG)["stations"]
+        expected = [json_safe(evaluate_rib(config).to_dict()) for config in stations]
+        for label in ("cold", "warm"):
+            start = time.perf_counter()
+            results = post(url + "/evaluate", {"designs": stations})["results"]
+            print("{0} /evaluate {1} designs {2:.1f} ms, same as evaluate_rib: {3}".format(
+                label, len(stations), (time.perf_counter() - start) * 1000, results == expected))
+        start = time.perf_counter()
+        with ThreadPoolExecutor(8) as pool:
+            responses = list(pool.map(lambda _: post(url + "/evaluate", {"designs": stations}), range(32)))
+        print("32 concurrent requests {0:.1f} ms, all same: {1}".format(
+            (time.perf_counter() - start) * 1000, all(r["results"] == expected for r in responses)))
+        job = {"space": {"y_index": 3, "web_thickness": 1.6, "division": 5, "stiffener_thickness": 1.8,
+                         "bs1": list(range(13, 23)), "bs2": list(range(10, 30, 2)),
+                         "cflange_thickness": list(range(4, 9)), "cflange_bottom": 22.5,
+                         "cflange_height": list(range(14, 34, 2)),
+                         "tflange_thickness": list(range(4, 9)), "tflange_bottom": 22.5,
+                         "tflange_height": list(range(14, 34, 2)),
+                         "rivet_stiffener_d": 3.175, "rivet_flange_d": 3.175, "pd_ratio": 6, "rivet_n": 2},
+               "direct": True}
+        result = post(url + "/optimize", {"jobs": [job]})["results"][0]
+        print("/optimize mass {0:.4f} kg, {1} evaluations".format(result["mass"], result["evaluations"]))
+        # 誤った設計はその位置だけerrorになる
+        bad = [dict(stations[0], web=[1.6, 0]), dict(stations[0], rivet_flange=[3.96875, 6, 0]),
+               dict(stations[0], compression_flange=[0, 18, 17]), dict(stations[0], rivet_flange=[3.96875, 1, 1])]
+        results = post(url + "/evaluate", {"designs": bad + stations[:1]})["results"]
+        print("bad designs:", [result.get("error") for result in results[:-1]],
+              "others same:", results[-1] == expected[0])
+        bad_job = dict(job, space=dict(job["space"], web_thickness=[0, 1.6]))
+        print("bad job:", post(url + "/optimize", {"jobs": [bad_job]})["results"][0].get("error"))
+        try:
+            post(url + "/evaluate", {"designs": {}})
+        except HTTPError as error:
+            print("bad request:", error.code, json.loads(error.read().decode("utf-8")))
+    finally:
+        server.shutdown()
+        server.server_close()
+        server.service.close()
+
+
+def main(argv=None):
+    """
+    python sizing_server.py [--port 8765] [--jobs 4]
+    python sizing_server.py --self-test
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("-j", "--jobs", type=int, help="workerの数(省略するとcpuの数)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="requestごとにlogを出す")
+    parser.add_argument("--self-test", action="store_true", help="serverを立てて自分で呼んでみる")
+    args = parser.parse_args(argv)
+    if args.self_test:
+        self_test(args.jobs or 2)
+        return
+    server = make_server(args.host, args.port, args.jobs, args.verbose)
+    print("serving on http://{0}:{1} with {2} workers".format(args.host, server.server_address[1],
+                                                                server.service.jobs))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.service.close()
+
+
+if __name__ == '__main__':
+    main()
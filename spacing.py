@@ -0,0 +1,331 @@
+"""Non-uniform stiffener spacing."""
+# coding:utf-8
+# Author: Shun Arahata
+import math
+import time
+from collections import namedtuple
+import numpy as np
+from rib import DENSITY
+from web import Web
+from material import SHEET_7075
+from buckling import get_shear_buckling_k
+from stiffener import get_inertia_u_fraction
+from rivet_web_stiffener import RIVET_LOAD_K, solve_rivet_pitch
+from panels import LOAD_STA, LOAD_SF
+from unit_convert import interp_scalar
+from results_sink import write_row
+import geometry
+
+SPACING_TOLERANCE = 0.01  # stiffener位置の精度[mm]
+MS_TOLERANCE = 1e-4  # 揃えるM.S.の精度
+# web厚さ[mm]の候補(opt/*.pyのWEB_THICKNESS_LIST)
+WEB_THICKNESS_LIST = [0.41, 0.51, 0.64, 0.81, 1.02, 1.27, 1.60, 1.80, 2.03, 2.29, 2.54, 3.18]
+
+_LOAD_STA = LOAD_STA.tolist()
+_LOAD_SF = LOAD_SF.tolist()
+
+# csvの列ごとの有効数字(Noneはそのまま)
+SPACING_ROW_SIG = (None, None, None, 4, None, None, 4, 3, None)
+
+# thickness:web厚さ[mm], division:パネル数, edges:stiffener位置(両端を含む)[mm], mass:web+stiffener[kg]
+SpacingResult = namedtuple("SpacingResult", ["thickness", "division", "edges", "mass"])
+
+
+class _Bay(object):
+    """1つのbayのパネルのM.S.をスカラーで計算する(panels.analyze_panelsと同じ式)."""
+
+    __slots__ = ("y_left", "y_right", "thickness", "fsu", "cg_offset", "hf")
+
+    def __init__(self, rib, thickness):
+        """Constructor.
+
+        :param rib:フランジを追加してset_he済みのRib
+        :param thickness:web厚さ[mm]
+        """
+        self.y_left = rib.y_left
+        self.y_right = rib.y_right
+        self.thickness = thickness
+        self.fsu = SHEET_7075.F_su(thickness)
+        self.cg_offset = float(rib.hf - rib.he)
+        self.hf = geometry.get_profile()  # 二分探索のSTAは毎回違うのでキャッシュを通さない
+
+    def get_q(self, x):
+        """STA xでの剪断流[N/mm]."""
+        return interp_scalar(x, _LOAD_STA, _LOAD_SF) / (self.hf(x) - self.cg_offset)
+
+    def get_fs(self, x):
+        """STA xでのf_s[MPa]."""
+        return self.get_q(x) * 1000 / self.thickness * 1000 / (10 ** 6)
+
+    def get_panel_ms(self, x0, x1):
+        """
+        :param x0:パネルの左端[mm]
+        :param x1:パネルの右端[mm]
+        :return: パネルのM.S.
+        """
+        height = max(self.hf(x0), self.hf(x1))
+        width = x1 - x0
+        fscr = get_shear_buckling_k(height / width) * Web.E * (self.thickness / width) ** 2
+        return min(self.fsu, fscr) / max(self.get_fs(x0), self.get_fs(x1)) - 1
+
+    def get_widest_panel(self, x0, target_ms):
+        """
+        x0から始まるM.S. >= target_msのパネルの右端の最大値を二分探索する.
+        :return: 右端[mm],幅をSPACING_TOLERANCEまで狭めても成立しなければNone
+        """
+        if self.get_panel_ms(x0, self.y_right) >= target_ms:
+            return self.y_right
+        lo, hi = x0 + SPACING_TOLERANCE, self.y_right
+        if not self.get_panel_ms(x0, lo) >= target_ms:
+            return None
+        while hi - lo > SPACING_TOLERANCE:
+            mid = (lo + hi) / 2
+            if self.get_panel_ms(x0, mid) >= target_ms:
+                lo = mid
+            else:
+                hi = mid
+        return lo
+
+    def place(self, target_ms, max_count):
+        """
+        左から順にM.S. >= target_msとなる一番広いパネルを並べる.
+        :param target_ms:目標のM.S.
+        :param max_count:パネル数の上限
+        :return: stiffener位置(両端を含む)のlist,max_count枚で足りなければNone
+        """
+        edges = [self.y_left]
+        while edges[-1] < self.y_right:
+            if len(edges) > max_count:
+                return None
+            right = self.get_widest_panel(edges[-1], target_ms)
+            if right is None:
+                return None
+            edges.append(right)
+        return edges
+
+
+def get_uniform_edges(rib, division):
+    """:return: 等分したときのstiffener位置(両端を含む)[mm]"""
+    return rib.y_left + (rib.y_right - rib.y_left) / division * np.arange(division + 1)
+
+
+def equalize_spacing(rib, division, thickness):
+    """
+    パネルのM.S.の最小値が最大になるようにstiffenerを置く.
+
+    目標のM.S.を二分探索し,左から一番広いパネルを並べてdivision枚に収まるかを調べる.
+    収まる限界ではどのパネルもほぼ同じM.S.になる(最後のパネルだけ余裕が残る).
+    :param rib:フランジを追加してset_he済みのRib
+    :param division:パネル数
+    :param thickness:web厚さ[mm]
+    :return: stiffener位置(両端を含む)[mm]の配列,等分より良くならなければ等分
+    """
+    bay = _Bay(rib, thickness)
+    best = get_uniform_edges(rib, division).tolist()
+    lo = min(bay.get_panel_ms(x0, x1) for x0, x1 in zip(best[:-1], best[1:]))
+    hi = bay.fsu / bay.get_fs(rib.y_left) - 1  # 左端を含むパネルはF_suで頭打ち
+    if math.isnan(lo) or math.isnan(hi):
+        return np.array(best)
+    while hi - lo > MS_TOLERANCE:
+        mid = (lo + hi) / 2
+        edges = bay.place(mid, division)
+        if edges is None:
+            hi = mid
+        else:
+            lo, best = mid, edges
+    while len(best) - 1 < division:
+        # 余ったstiffenerは一番広いパネルの真ん中に置く(M.S.は下がらない)
+        i = int(np.argmax(np.diff(best)))
+        best.insert(i + 1, (best[i] + best[i + 1]) / 2)
+    return np.array(best)
+
+
+def get_panel_ms(rib, edges, thickness):
+    """:return: パネルごとのM.S.の配列"""
+    bay = _Bay(rib, thickness)
+    return np.array([bay.get_panel_ms(x0, x1) for x0, x1 in zip(edges[:-1], edges[1:])])
+
+
+def get_stiffener_ms(rib, edges, thickness):
+    """
+    stiffenerごとのM.S.(Stiffener.get_msと同じ式,heはstiffener位置,deは両隣のパネルの広い方).
+    :return: M.S.の配列(stiffenerがなければ空)
+    """
+    edges = np.asarray(edges, dtype=float)
+    widths = np.diff(edges)
+    he = geometry.get_hf(edges[1:-1]) - float(rib.hf - rib.he)
+    de = np.maximum(widths[:-1], widths[1:])
+    inertia_u = he * thickness ** 3 * get_inertia_u_fraction(he / de)
+    return rib.stiffener.get_inertia() / inertia_u - 1
+
+
+def get_mass(rib, edges, thickness):
+    """
+    webとstiffenerの質量(Web.get_volume,Stiffener.get_volumeと同じ).
+    stiffenerの高さは置いた位置の前桁高さにする.
+    :return: [kg]
+    """
+    web_volume = Web(rib.y_left, rib.y_right, 1, thickness).get_volume()
+    heights = geometry.get_hf(np.asarray(edges[1:-1], dtype=float))
+    stiffener_volume = rib.stiffener.get_area() * heights.sum() / 1000
+    return (web_volume + stiffener_volume) * DENSITY / 1000
+
+
+def get_rivet_holes(rib, thickness):
+    """
+    webに穴をあけるリベットのピッチと鋲径(stiffenerのピッチはweb厚さで変わるので解き直す).
+    :return: ((ピッチ[mm], 鋲径[mm]) stiffener, (ピッチ[mm], 鋲径[mm]) フランジ)
+    """
+    stiffener_d = rib.rivet_stiffener.D
+    pitch = solve_rivet_pitch(stiffener_d, thickness, rib.stiffener.get_clippling_stress())
+    return (pitch, stiffener_d), (rib.rivet_flange.rivet_pitch, rib.rivet_flange.D)
+
+
+def get_hole_loss_ms(rib, edges, thickness):
+    """
+    パネルごとのweb hole lossのM.S.(Web.get_web_hole_loss_msと同じ式をパネルの値で計算する).
+    f_sjはf_sのp/(p-d)倍なので,M.S.+1はパネルのM.S.+1の(p-d)/p倍になる.
+    :return: (stiffenerのリベット, フランジのリベット)の順にパネルごとのM.S.を並べた配列(2行)
+    """
+    panel_ms = get_panel_ms(rib, edges, thickness)
+    return np.array([(panel_ms + 1) * (p - d) / p - 1 for p, d in get_rivet_holes(rib, thickness)])
+
+
+def get_rivet_ms(rib, edges, thickness):
+    """
+    リベットのM.S.(RivetWebStiffener.get_ms,RivetWebFlange.get_msと同じ式).
+    stiffenerのリベット荷重はstiffenerピッチに反比例するので両隣のパネルの狭い方で,
+    フランジのリベットはbayの中で一番大きい剪断流で計算する.
+    :return: stiffenerのリベットのM.S.の配列(stiffenerがなければbay全体を1パネルとした1つ)とフランジのリベットのM.S.
+    """
+    (stiffener_pitch, _), (flange_pitch, _) = get_rivet_holes(rib, thickness)
+    widths = np.diff(np.asarray(edges, dtype=float))
+    d_c = np.minimum(widths[:-1], widths[1:]) if len(widths) > 1 else widths
+    rivet_load = RIVET_LOAD_K * rib.stiffener.get_area() / d_c * stiffener_pitch
+    stiffener_ms = rib.rivet_stiffener.get_p_allow() / rivet_load - 1
+    bay = _Bay(rib, thickness)
+    q_max = max(bay.get_q(x) for x in edges)
+    flange_ms = rib.rivet_flange.get_p_allow() / (q_max * flange_pitch / rib.rivet_flange.N) - 1
+    return stiffener_ms, flange_ms
+
+
+def is_feasible(rib, edges, thickness):
+    """
+    web,stiffener,web hole loss,リベットのM.S.が全て正か
+    (stiffenerのnanはrib.get_failuresと同じく成立とみなす.リベットピッチが決まらなければnanで不成立).
+    """
+    if not np.all(get_panel_ms(rib, edges, thickness) >= 0):
+        return False
+    stiffener_ms = get_stiffener_ms(rib, edges, thickness)
+    if not np.all((stiffener_ms >= 0) | np.isnan(stiffener_ms)):
+        return False
+    if not np.all(get_hole_loss_ms(rib, edges, thickness) >= 0):
+        return False
+    stiffener_rivet_ms, flange_rivet_ms = get_rivet_ms(rib, edges, thickness)
+    return bool(np.all(stiffener_rivet_ms >= 0) and flange_rivet_ms >= 0)
+
+
+def size_spacing(rib, divisions, thicknesses=WEB_THICKNESS_LIST, uniform=False, time_budget=None):
+    """
+    web厚さ,パネル数,stiffener位置の最軽量の組み合わせを求める.
+
+    stiffenerの断面,フランジ,リベットはribのものを使う.
+    厚さごとに少ないパネル数から調べ,成立した時点で次の厚さに移る.
+    :param rib:stiffener,フランジ,リベットを追加してset_he済みのRib
+    :param divisions:パネル数の候補
+    :param thicknesses:web厚さの候補[mm]
+    :param uniform:Trueなら等分(今までの設計),Falseなら等分とequalize_spacingの軽い方
+    :param time_budget:計算時間の上限[s](超えたらそれまでの最良を返す)
+    :return: SpacingResult,成立しなければNone
+    """
+    start = time.perf_counter()
+    best = None
+    for thickness in sorted(thicknesses):
+        if best is not None and get_mass(rib, [rib.y_left, rib.y_right], thickness) >= best.mass:
+            break  # web だけで重い
+        for division in sorted(divisions):
+            if time_budget is not None and time.perf_counter() - start > time_budget:
+                return best
+            candidates = [get_uniform_edges(rib, division)]
+            if not uniform:
+                candidates.append(equalize_spacing(rib, division, thickness))  # 等分の方が軽いこともある
+            feasible = [edges for edges in candidates if is_feasible(rib, edges, thickness)]
+            for edges in feasible:
+                mass = get_mass(rib, edges, thickness)
+                if best is None or mass < best.mass:
+                    best = SpacingResult(thickness, division, edges, mass)
+            if feasible:
+                break
+    return best
+
+
+def compare_spacing(rib, divisions, thicknesses=WEB_THICKNESS_LIST, time_budget=None):
+    """
+    等分と不等間隔の最軽量のweb+stiffenerを比べる.
+    :return: (等分のSpacingResult, 不等間隔のSpacingResult, 減った質量[kg])
+    """
+    uniform = size_spacing(rib, divisions, thicknesses, uniform=True, time_budget=time_budget)
+    nonuniform = size_spacing(rib, divisions, thicknesses, uniform=False, time_budget=time_budget)
+    if uniform is None or nonuniform is None:
+        return uniform, nonuniform, math.nan
+    return uniform, nonuniform, uniform.mass - nonuniform.mass
+
+
+def make_spacing_header(sink=None):
+    """
+    Make csv header.
+    :param sink:ResultsSink(Noneならその場でcsvに追記する)
+    """
+    header = ["STA[mm]", "等分 t[mm]", "等分 パネル数", "等分 質量[kg]", "不等間隔 t[mm]", "不等間隔 パネル数",
+              "不等間隔 質量[kg]", "減った質量[kg]", "stiffener位置[mm]"]
+    write_row(sink, 'spacing.csv', header)
+
+
+def make_spacing_row(rib, divisions, thicknesses=WEB_THICKNESS_LIST, time_budget=None, sink=None):
+    """
+    等分と不等間隔の最軽量のweb+stiffenerを比べてcsvに1行書く.
+    :param rib:stiffener,フランジ,リベットを追加してset_he済みのRib
+    :param divisions:パネル数の候補
+    :param thicknesses:web厚さの候補[mm]
+    :param time_budget:等分と不等間隔それぞれの計算時間の上限[s]
+    :param sink:ResultsSink(Noneならその場でcsvに追記する)
+    :return: compare_spacingの返り値
+    """
+    uniform, nonuniform, saved = compare_spacing(rib, divisions, thicknesses, time_budget)
+    row = [rib.y_left]
+    for result in (uniform, nonuniform):
+        row += [None, None, math.nan] if result is None else [result.thickness, result.division, result.mass]
+    edges = "" if nonuniform is None else " ".join("{0:.1f}".format(x) for x in nonuniform.edges)
+    row += [saved, edges]
+    write_row(sink, 'spacing.csv', row, SPACING_ROW_SIG)
+    return uniform, nonuniform, saved
+
+
+def main():
+    """Test Function."""
+    from rib import Rib
+    designs = [(0, 2.03, 16, 22, 7, 30, 25, 10, 30, 30, 3.175, 3.175, 2),
+               (3, 1.8, 17, 17, 4, 18, 17, 5, 23, 25, 3.96875, 3.96875, 1),
+               (6, 1.27, 13, 10, 4, 22.5, 14, 4, 22.5, 14, 3.96875, 3.96875, 1)]
+    for y_index, ts, bs1, bs2, ct, cb, ch, tt, tb, th, rivet_stiffener_d, rivet_flange_d, rivet_n in designs:
+        sta = Rib(y_index)
+        sta.add_web(1.6, 1)
+        sta.add_stiffener(ts, bs1, bs2)
+        sta.add_compression_flange(ct, cb, ch)
+        sta.add_tension_flange(tt, tb, th)
+        sta.add_rivet_stiffener(rivet_stiffener_d)
+        sta.add_rivet_flange(rivet_flange_d, 6, rivet_n)
+        sta.set_he()
+        start = time.perf_counter()
+        uniform, nonuniform, saved = compare_spacing(sta, range(1, 16))
+        print("STA{0} uniform t={1} n={2} {3:.4f} kg, non-uniform t={4} n={5} {6:.4f} kg, saved {7:.4f} kg "
+              "({8:.2f} s)".format(sta.y_left, uniform.thickness, uniform.division, uniform.mass,
+                                   nonuniform.thickness, nonuniform.division, nonuniform.mass, saved,
+                                   time.perf_counter() - start))
+        print("  edges", np.round(nonuniform.edges, 1))
+        print("  min web hole loss ms", np.round(get_hole_loss_ms(sta, nonuniform.edges, nonuniform.thickness).min(),
+                                                  4))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,17 +1,43 @@
 """stiffener implementation"""
 # coding:utf-8
 # Author: Shun Arahata
-from scipy import interpolate
 import numpy as np
 import math
-from unit_convert import ksi2Mpa, mm2inch, mpa2Ksi, get_hf, round_sig
+from unit_convert import ksi2Mpa, get_hf, is_scalar, interp_scalar
 from web import Web
-import csv
+from results_sink import write_row
+from flyweight import Frozen
+from material import SHEET_7075
+from crippling import get_x_of_graph, get_crippling_stress
 
+# p11の表 I_U/(he t^3) (横軸 he/de)
+INERTIA_U_HE_PER_DE = np.array([0, 1.0, 1.5, 2.0, 2.5, 3.0, 3.5, 4.0])
+INERTIA_U_FRACTION = np.array([0, 0.1, 0.6, 1.5, 2.5, 3.7, 4.8, 6.2])
+_INERTIA_U_HE_PER_DE = INERTIA_U_HE_PER_DE.tolist()
+_INERTIA_U_FRACTION = INERTIA_U_FRACTION.tolist()
 
-class Stiffener(object):
+
+def get_inertia_u_fraction(he_per_de):
+    """
+    必要な断面二次モーメントの係数 I_U/(he t^3).
+    :param he_per_de:he/de(配列可)
+    :return: 係数 グラフより大きければnan
+    """
+    if is_scalar(he_per_de):
+        if not he_per_de <= INERTIA_U_HE_PER_DE[-1]:
+            return math.nan  # too large to get Inertia U
+        return interp_scalar(he_per_de, _INERTIA_U_HE_PER_DE, _INERTIA_U_FRACTION)
+    he_per_de = np.asarray(he_per_de, dtype=float)
+    fraction = np.interp(he_per_de, INERTIA_U_HE_PER_DE, INERTIA_U_FRACTION)
+    return np.where(he_per_de <= INERTIA_U_HE_PER_DE[-1], fraction, np.nan)
+
+
+class Stiffener(Frozen):
     """Stiffener class."""
 
+    __slots__ = ("thickness", "bs1_bottom", "bs2_height", "web")
+    E = ksi2Mpa(10.3 * 10 ** 3)
+
     def __init__(self, thickness, bs1_bottom, bs2_height, web):
         """Constructor.
 
@@ -23,7 +49,6 @@ class Stiffener(object):
         self.thickness = thickness
         self.bs1_bottom = bs1_bottom
         self.bs2_height = bs2_height
-        self.E = ksi2Mpa(10.3 * 10 ** 3)
         self.web = web
 
     def get_inertia(self):
@@ -56,18 +81,7 @@ class Stiffener(object):
             print("too small to get Inertia U in stiffener.py")
             return math.nan
         """
-        if x_value <= 4.0:
-            x = np.array([0, 1.0, 1.5, 2.0, 2.5, 3.0, 3.5, 4.0])
-            y = np.array([0, 0.1, 0.6, 1.5, 2.5, 3.7, 4.8, 6.2])
-            f = interpolate.interp1d(x, y, kind='linear')
-            fraction = f(x_value)
-            denominator = he * t ** 3
-            inertia_necessary = denominator * fraction
-            return inertia_necessary
-
-        else:
-            print("too large to get Inertia U in stiffener.py")
-            return math.nan
+        return he * t ** 3 * get_inertia_u_fraction(x_value)  # グラフより大きければnan
 
     def get_ms(self, he):
         """ MS (I>IU)
@@ -76,34 +90,12 @@ class Stiffener(object):
         return self.get_inertia() / self.get_inertia_u(he) - 1
 
     def get_fcy(self):
-        """ F_cy of 7075."""
-        thickness_in_inch = mm2inch(self.thickness)
-
-        if thickness_in_inch < 0.012:
-            print("stiffener thickness too small")
-            return math.nan
-
-        elif thickness_in_inch < 0.040:
-            return ksi2Mpa(61)
-
-        elif thickness_in_inch < 0.062:
-            return ksi2Mpa(62)  # 上と同じ
-
-        elif thickness_in_inch < 0.187:
-            return ksi2Mpa(64)
-
-        elif thickness_in_inch < 0.249:
-            return ksi2Mpa(65)
-        else:
-            print("too large in getFcy in stiffener py")
-            return math.nan
+        """ F_cy of 7075.(表の範囲外ならnan)"""
+        return SHEET_7075.F_cy(self.thickness)
 
     def get_x_of_graph(self):
         """Get X of Graph 7075(in page 12)."""
-
-        b_per_t = self.bs1_bottom / self.thickness  # b/t
-        x_value = np.sqrt(self.get_fcy() / self.E) * b_per_t
-        return x_value
+        return get_x_of_graph(self.get_fcy(), self.E, self.bs1_bottom / self.thickness)
 
     def get_clippling_stress(self):
         """
@@ -111,37 +103,27 @@ class Stiffener(object):
         フランジと同じ
         :return Fcc:Fcc[MPa]
         """
-        right_axis = self.get_x_of_graph()
-
-        if right_axis < 0.1:
-            return math.nan
-        elif right_axis < 0.1 * 5 ** (27 / 33):
-            # 一定部分
-            left_axis = 0.5 * 2 ** (2.2 / 1.5)
-        elif right_axis < 10:
-            left_axis = 10 ** (-0.20761) * right_axis ** (-0.78427)
-        else:
-            return math.nan
-        lower = mpa2Ksi(self.get_fcy())  # 分母
-        upper = left_axis * lower
-        Fcc = ksi2Mpa(upper)
+        return get_crippling_stress(self.get_fcy(), self.E, self.bs1_bottom / self.thickness)
 
-        return Fcc
+    def make_row(self, he, sink=None):
+        """
+        :param he:桁フランジ断面重心距離
+        :param sink:ResultsSink(Noneならその場でcsvに追記する)
+        """
+        write_row(sink, *self.get_row(he))
 
-    def make_row(self, he):
+    def get_row(self, he):
         """
-        :param writer:csv.writer()で取得されるもの
+        csvの1行(ファイルには書かない).
         :param he:桁フランジ断面重心距離
+        :return: (表の名前, 値のlist, rounded)
         """
         I_U = self.get_inertia_u(he)
         I = self.get_inertia()
         ms = self.get_ms(he)
         value = [self.web.y_left, self.web.y_right, self.web.thickness, self.web.width_b, he, self.thickness,
                  self.bs1_bottom, self.bs2_height, I, I_U, ms]
-        with open('results/stiffener.csv', 'a', encoding="utf-8") as f:
-            writer = csv.writer(f)
-            round_value = map(lambda x: round_sig(x), value)
-            writer.writerow(round_value)
+        return 'stiffener.csv', value, True
 
     def get_volume(self):
         """
@@ -154,16 +136,14 @@ class Stiffener(object):
         return area * height * (self.web.division - 1) / 1000  # [cm^3]
 
 
-def make_stiffener_header():
+def make_stiffener_header(sink=None):
     """
     Make csv header.
 
     """
     header = ["左端STA[mm]", "右端STA[mm]", "web thickness[mm]", "スティフナー間隔de[mm]", "he[mm]", "スティフナー厚さts[mm]",
               "bs1 bottom[mm]", "bs2 height[mm]", "I[${mm}^4$]", "$I_U$[${mm}^4$]", "M.S."]
-    with open('results/stiffener.csv', 'a', encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow(header)
+    write_row(sink, 'stiffener.csv', header)
 
 
 def main():
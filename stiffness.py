@@ -5,13 +5,11 @@ main関数内の変数を自分の値に変えて実行するだけ.
 # !/usr/bin/env python3
 # -*- coding: utf-8 -*-
 # Author: Hirotaka Kondo, Shun Arahata
+import argparse
 from rib import Rib
 from unit_convert import ksi2Mpa, get_hf
-import csv
-import matplotlib.pyplot as plt
-from scipy import interpolate
 import numpy as np
-from unit_convert import round_sig
+from results_sink import write_row, ResultsSink
 
 
 def cal_web_I(web_t, height):
@@ -33,21 +31,23 @@ def cal_flange_I(flange_area, he):
     return flange_area * (he / 2) ** 2
 
 
-def make_header_stiffness():
-    """Make csv header."""
+def make_header_stiffness(sink=None):
+    """Make csv header.
+
+    :param sink: ResultsSink(Noneならその場でcsvに追記する)
+    """
     header1 = ["", "", "ウェブ", "", "", "圧縮側フランジ", "", "", "引張側フランジ", "", "", "合計"]
     header2 = ["STA", "$h_e$[mm]", "ウェブ厚さ[mm]", "I[$mm^4$]", "EI[$Nm^2$]", "有効断面積[$mm^2$]", "I[$mm^4$]", "EI[$Nm^2$]",
                "有効断面積[$mm^2$]", "I[$mm^4$]", "EI[$Nm^2$]", "EI[$Nm^2$]"]
-    with open('results/stiffness.csv', 'a', encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow(header1)
-        writer.writerow(header2)
+    write_row(sink, 'stiffness.csv', header1)
+    write_row(sink, 'stiffness.csv', header2)
 
 
-def make_stiffness_row(sta):
+def make_stiffness_row(sta, sink=None):
     """csv行出力
 
     :param sta: Rib instance
+    :param sink: ResultsSink(Noneならその場でcsvに追記する)
     :return: EI_w + EI_c + EI_t
     """
     web_t = sta.web.thickness
@@ -63,10 +63,7 @@ def make_stiffness_row(sta):
     EI_t = E * I_t / 10 ** 6  # [N*m^2]
     value = [sta.y_left, he, web_t, I_w, EI_w, area_c, I_c,
              EI_c, area_t, I_t, EI_t, EI_w + EI_c + EI_t]
-    round_value = map(lambda x: round_sig(x), value)
-    with open('results/stiffness.csv', 'a', encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow(round_value)
+    write_row(sink, 'stiffness.csv', value, rounded=True)
 
     return EI_w + EI_c + EI_t
 
@@ -89,13 +86,18 @@ def cal_EI_sta5000(sta4500):
     return E * (I_w + I_c + I_t) / 10 ** 6  # [N*m^2]
 
 
-def make_plot(sta_EI_list):
+def make_plot(sta_EI_list, path='results/stiffness.pgf'):
     """
     EIのグラフ作成用
     :param sta_EI_list:
+    :param path: 保存先
     :return:
     """
+    # グラフを描くときだけmatplotlibとscipyを読み込む
+    import matplotlib.pyplot as plt
+    from scipy import interpolate
     LEFT_ARRAY = np.array([625, 1000, 1500, 2000, 2500, 3000, 3500, 4000, 4500, 5000])
+    plt.figure()  # 何度呼んでも前のグラフに重ねない
     plt.xlabel("STA")
     plt.ylabel("EI[$N\cdot$$m^2$]")
     plt.xlim(625, 5000)
@@ -107,7 +109,10 @@ def make_plot(sta_EI_list):
     sy = sp(sx)
     plt.plot(LEFT_ARRAY, sta_EI_list, "ko")
     plt.plot(sx, sy, "black")
-    plt.savefig('results/stiffness.pgf')
+    try:
+        plt.savefig(path)
+    finally:
+        plt.close()
     # pgfについては
     # <http://sbillaudelle.de/2015/02/23/seamlessly-embedding-matplotlib-output-into-latex.html>
     # 参照
@@ -133,34 +138,44 @@ def cal_ave(sta_EI_list):
     return EI_ave
 
 
-def calc_stiffness(sta625, sta1000, sta1500, sta2000, sta2500, sta3000, sta3500, sta4000, sta4500):
+def calc_stiffness(stations, sink=None, plot_path='results/stiffness.pgf'):
     """外部からのinterfaceを提供.
 
-    :param sta625: Rib instance
-    :param sta1000: Rib instance
-    :param sta1500: Rib instance
-    :param sta2000: Rib instance
-    :param sta2500: Rib instance
-    :param sta3000: Rib instance
-    :param sta3500: Rib instance
-    :param sta4000: Rib instance
-    :param sta4500: Rib instance
+    :param stations: STA625からSTA4500までの9個のRib instanceのlist(STA順)
+    :param sink: ResultsSink(Noneならその場でcsvに追記する)
+    :param plot_path: グラフの保存先(Noneならグラフは描かない)
+    :return: STA625からSTA5000までのEI[N*m^2]のlist
     """
-
-    make_header_stiffness()
-    sta_EI_list = []
-    sta_EI_list.append(make_stiffness_row(sta625))
-    sta_EI_list.append(make_stiffness_row(sta1000))
-    sta_EI_list.append(make_stiffness_row(sta1500))
-    sta_EI_list.append(make_stiffness_row(sta2000))
-    sta_EI_list.append(make_stiffness_row(sta2500))
-    sta_EI_list.append(make_stiffness_row(sta3000))
-    sta_EI_list.append(make_stiffness_row(sta3500))
-    sta_EI_list.append(make_stiffness_row(sta4000))
-    sta_EI_list.append(make_stiffness_row(sta4500))
-    sta_EI_list.append(cal_EI_sta5000(sta4500))  # STA5000
+    make_header_stiffness(sink)
+    sta_EI_list = [make_stiffness_row(sta, sink) for sta in stations]
+    sta_EI_list.append(cal_EI_sta5000(stations[-1]))  # STA5000
     cal_ave(sta_EI_list)
-    make_plot(sta_EI_list)
+    if plot_path is not None:
+        make_plot(sta_EI_list, plot_path)
+    return sta_EI_list
+
+
+def main(argv=None):
+    """
+    python stiffness.py [stations.json] [--plot results/stiffness.pgf]
+    jsonの寸法(main.load_config)からEIを計算してresults/stiffness.csvに書き直す.
+    """
+    from main import DEFAULT_CONFIG, load_config
+    from evaluation import build_station
+    parser = argparse.ArgumentParser()
+    parser.add_argument("config", nargs="?", default=DEFAULT_CONFIG, help="STA区間の寸法を書いたjson")
+    parser.add_argument("--plot", help="EIのグラフの保存先(省略するとグラフは描かない)")
+    args = parser.parse_args(argv)
+    stations = []
+    for config in load_config(args.config)["stations"]:
+        sta = build_station(config)
+        sta.set_he()
+        stations.append(sta)
+    with ResultsSink() as sink:
+        sink.reset(["stiffness.csv"])  # 追記しない
+        ei_list = calc_stiffness(stations, sink, args.plot)
+    for sta, ei in zip([sta.y_left for sta in stations] + [5000], ei_list):
+        print("STA{0} EI {1}[N*m^2]".format(sta, ei))
 
 
 if __name__ == "__main__":
@@ -1,9 +1,11 @@
 """ unit conver functions　and other functions."""
 # coding:utf-8
 # Author: Shun Arahata
+import bisect
 import numpy as np
-from scipy import interpolate
-from math import log10, floor
+from math import log10, floor, nan
+import geometry
+
 
 def ksi2Mpa(ksi):
     return ksi * 6.89475908677537
@@ -28,20 +30,41 @@ def lbs2N(lbs):
 def get_hf(sta):
     """前桁高さ取得関数.
     
+    前桁高さはgeometryで設定したものを使う(geometry.get_hf).
     :param sta: staの値
     :return hf: 前桁高さ
     """
-    x = np.array([625, 5000])
-    y = np.array([320, 130])
-    f = interpolate.interp1d(x, y, kind='linear')
-    hf = f(sta)
-    return hf
+    return geometry.get_hf(sta)
+
+
+def is_scalar(x):
+    """np.ndim(x) == 0 と同じ(np.ndimは1回数μsかかるので,スカラーの速い経路の判定に使う)."""
+    if isinstance(x, (float, int)):
+        return True
+    if isinstance(x, np.ndarray):
+        return x.ndim == 0
+    return not isinstance(x, (list, tuple))
+
+
+def interp_scalar(x, xp, fp):
+    """np.interpと同じ式のスカラー版(xp,fpはlist,xpは昇順.xがnanならnan)."""
+    if x != x:  # nan
+        return nan
+    if x <= xp[0]:
+        return fp[0]
+    if x >= xp[-1]:
+        return fp[-1]
+    j = bisect.bisect_right(xp, x) - 1
+    return (fp[j + 1] - fp[j]) / (xp[j + 1] - xp[j]) * (x - xp[j]) + fp[j]
 
 
 def round_sig(x, sig=3):
     """有効数字.
     https://stackoverflow.com/questions/3410976/how-to-round-a-number-to-significant-figures-in-python
+    nanと0は桁が決まらないのでそのまま返す.
     """
+    if x == 0 or x != x:
+        return x
     return round(x, sig - int(floor(log10(abs(x)))) - 1)
 
 
@@ -1,14 +1,16 @@
 """web implementation."""
 # coding:utf-8
 # Author: Hirotaka Kondo
-from scipy import interpolate
-import math
 import numpy as np
-from unit_convert import ksi2Mpa, mm2inch, get_hf, round_sig
-import csv
+from unit_convert import ksi2Mpa, get_hf
+import geometry
+from results_sink import write_row
+from flyweight import Frozen
+from material import SHEET_7075
+from buckling import get_shear_buckling_k
 
 
-class Web(object):
+class Web(Frozen):
     """
     web class.
     仮定として,Webのせん断座屈を計算するとき,Webは
@@ -17,8 +19,12 @@ class Web(object):
     (szmtさんがそうしてるっていう理由だけ)
     またテーパーしてるwebの強度計算については,
     大きい方の寸法を用いて長方形近似して強度計算をしている.
+    同じ寸法のWebは共有され,作ったあとは変更できない.
     """
 
+    __slots__ = ("y_left", "y_right", "division", "thickness", "height_a", "width_b")
+    E = ksi2Mpa(10.3 * 1000)  # 表3-3より読み取る [MPa]
+
     def __init__(self, y_left, y_right, division, thickness):
         """
         heightとwidthのうち長い方をaとするがアルゴリズム的に問題なし
@@ -36,7 +42,6 @@ class Web(object):
         self.thickness = thickness
         self.height_a = get_hf(y_left)  # この高さはwebのSTAが一番小さい側の値
         self.width_b = (y_right - y_left) / division
-        self.E = ksi2Mpa(10.3 * 1000)  # 表3-3より読み取る [MPa]
 
     def get_qmax(self, sf, he):
         """
@@ -61,21 +66,8 @@ class Web(object):
         return q_max / self.thickness * 1000 / (10 ** 6)  # 単位を[MPa]に
 
     def get_k(self):
-        """ウェブ初期剪断座屈応力fscrを求める."""
-        x_axis = self.height_a / self.width_b
-        if x_axis < 1:
-            x_axis = 1 / x_axis  # 2通りあるa/bのうち大きい方を計算
-
-        if x_axis < 12:
-            x = np.array([0.9, 1, 1.2, 1.5, 2, 3, 4, 5, 8, 12])
-            y = np.array([11, 8, 7, 6.2, 5.8, 5.3, 5.1, 5, 4.8, 4.8])
-            f = interpolate.interp1d(x, y, kind='linear')
-            k = f(x_axis)
-            return k
-        else:
-            print("x_axis", x_axis)
-            print("x_axis is too large :na in getK in web.py")
-            return math.nan
+        """ウェブ初期剪断座屈応力fscrを求める.(グラフより先は漸近式で延長するのでnanにならない)"""
+        return get_shear_buckling_k(self.height_a / self.width_b)
 
     def get_buckling_shear_force(self):
         """
@@ -87,23 +79,9 @@ class Web(object):
     def get_fsu(self):
         """
         表3のF_suの値を読み取る.
-        :return:F_su[Mpa]
-        """
-        thickness_in_inch = mm2inch(self.thickness)
-        if thickness_in_inch <= 0.011:
-            print("too small:nan in getFsu in web.py")
-            return math.nan
-        elif thickness_in_inch <= 0.039:
-            return ksi2Mpa(42)
-        elif thickness_in_inch <= 0.062:
-            return ksi2Mpa(42)
-        elif thickness_in_inch <= 0.187:
-            return ksi2Mpa(44)
-        elif thickness_in_inch <= 0.249:
-            return ksi2Mpa(45)
-        else:
-            print("too large :nan in getFsu in web.py")
-            return math.nan
+        :return:F_su[Mpa] 表の範囲外ならnan
+        """
+        return SHEET_7075.F_su(self.thickness)
 
     def get_ms(self, sf, he):
         """
@@ -142,12 +120,21 @@ class Web(object):
         ms = min(f_su, f_scr) / self.get_fsj(p, d, sf, he) - 1
         return ms
 
-    def make_row(self, sf, he):
+    def make_row(self, sf, he, sink=None):
         """
         Csv output.
-        :param writer:csv.writer()で取得されるもの
         :param sf:前桁の分担荷重[N]
         :param he:桁フランジ断面重心距離[mm]
+        :param sink:ResultsSink(Noneならその場でcsvに追記する)
+        """
+        write_row(sink, *self.get_row(sf, he))
+
+    def get_row(self, sf, he):
+        """
+        csvの1行(ファイルには書かない).
+        :param sf:前桁の分担荷重[N]
+        :param he:桁フランジ断面重心距離[mm]
+        :return: (表の名前, 値のlist, rounded)
         """
         fs = self.get_shear_force(sf, he)
         q_max = self.get_qmax(sf, he)
@@ -156,10 +143,7 @@ class Web(object):
         ms = self.get_ms(sf, he)
         value = np.array([self.y_left, self.y_right, self.division, self.width_b, self.thickness,
                  self.height_a, q_max, fscr, fsu, fs, ms]).tolist()
-        round_value = map(lambda x: round_sig(x), value)
-        with open('results/web.csv', 'a', encoding="utf-8") as f:
-            writer = csv.writer(f)
-            writer.writerow(round_value)
+        return 'web.csv', value, True
 
     def get_volume(self):
         """
@@ -174,13 +158,15 @@ class Web(object):
         return v / 10 / 10 / 10  # 単位を[cm^3]に
 
 
-def make_web_header():
-    with open('results/web.csv', 'a', encoding="utf-8") as f:
-        writer = csv.writer(f)
-        header = ["左端STA[mm]", "右端STA[mm]", "分割数", "間隔de[mm]", "web厚さ[mm]",
-                  "STA最小におけるweb高さ[mm]", "$q_{max}$[N/m]", "$F_{scr}$[MPa]", "$F_{su}$[MPa]", "$f_{s}$[MPa]",
-                  "M.S."]
-        writer.writerow(header)
+# height_aは作ったときの前桁高さなので,前桁高さが変わったら作り直す
+geometry.on_profile_change(Web.clear_instances)
+
+
+def make_web_header(sink=None):
+    header = ["左端STA[mm]", "右端STA[mm]", "分割数", "間隔de[mm]", "web厚さ[mm]",
+              "STA最小におけるweb高さ[mm]", "$q_{max}$[N/m]", "$F_{scr}$[MPa]", "$F_{su}$[MPa]", "$f_{s}$[MPa]",
+              "M.S."]
+    write_row(sink, 'web.csv', header)
 
 
 def main():